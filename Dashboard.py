@@ -3,14 +3,47 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import folium
 from folium.plugins import MarkerCluster
-from streamlit_folium import folium_static
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit_folium import st_folium
+from branca.colormap import LinearColormap
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
 import warnings
+from collections import Counter, OrderedDict
+from urllib.parse import urlencode
 warnings.filterwarnings('ignore')
 
+import analytics
+import api
+import data_layer
+import exports
+import boundaries
+import price_index
+import profiling
+import quantile_sketch
+import reference_data
+import scenarios
+import view_specs
+from artifact_cache import ArtifactCache
+from price_index import PriceIndexEngine
+from quantile_sketch import QuantileSketchCube
+from session_budget import SessionBudgetRegistry
+from shared_snapshot import SharedSnapshotDirectory, shared_builder
+from similarity import SimilarityIndex, build_feature_matrix
+from spatial_index import SpatialIndex
+
 # Configuration de la page
 st.set_page_config(
     page_title="Dashboard Logements - Île de la Réunion",
@@ -78,362 +111,476 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+logger = logging.getLogger(__name__)
+
+# Intervalle de reconstruction automatique des données en arrière-plan
+REFRESH_INTERVAL_SECONDS = 15 * 60
+# Fréquence à laquelle une session en rafraîchissement automatique interroge la version
+VERSION_POLL_SECONDS = 10
+
+# Nombre maximal de fiches communes conservées en cache (toutes versions confondues)
+COMMUNE_DETAIL_CACHE_SIZE = 64
+# Nombre de communes les plus consultées précalculées à chaque nouvelle version
+COMMUNE_DETAIL_PREWARM = 5
+
+# Zoom initial de la carte choroplèthe (le niveau de détail des contours en dépend)
+CHOROPLETH_DEFAULT_ZOOM = 10
+# Indicateurs de current_data proposés sur la carte choroplèthe
+CHOROPLETH_INDICATORS = {
+    'prix_m2_moyen': 'Prix moyen au m² (€)',
+    'taux_vacance': 'Taux de vacance (%)',
+    'logements_sociaux_pourcentage': 'Logements sociaux (%)',
+}
+
+# Nombre maximal de communes superposées dans la vue de comparaison
+COMPARISON_MAX_COMMUNES = 8
+
+# Nombre de points maximal envoyé au navigateur pour une série temporelle
+SERIES_POINT_BUDGET = 500
+
+# Port de l'API locale démarrée avec le dashboard (désactivée si non défini)
+API_PORT = os.environ.get('LOGEMENTS_API_PORT')
+
+# Répertoire en mémoire partagée de l'instantané commun à plusieurs processus (désactivé si non défini)
+SHARED_SNAPSHOT_DIR = os.environ.get('LOGEMENTS_SHARED_DIR')
+
+# Cache disque des artefacts calculés (agrégats, fiches, carte), conservé entre redémarrages
+ARTIFACT_CACHE_DIR = os.environ.get('LOGEMENTS_CACHE_DIR', os.path.join('.cache', 'artifacts'))
+
+# Jeton d'administration (?admin=<jeton>) donnant accès au profilage à la demande (désactivé si non défini)
+PROFILING_TOKEN = os.environ.get('LOGEMENTS_PROFILING_TOKEN')
+# Répertoire des captures de profilage
+PROFILE_DIR = os.environ.get('LOGEMENTS_PROFILE_DIR', os.path.join('.cache', 'profiles'))
+# Nombre de captures proposées au téléchargement
+PROFILE_LIST_SIZE = 5
+
+# Répertoire des jeux de données réels ; une source absente retombe sur les données intégrées
+DATA_DIR = os.environ.get('LOGEMENTS_DATA_DIR', 'data')
+# Sources indépendantes chargées en parallèle (fichier <nom>.parquet ou <nom>.csv)
+DATA_SOURCES = ['communes', 'transactions', 'loyers', 'permis', 'population']
+# Nombre maximal de sources lues simultanément
+LOADER_MAX_WORKERS = 4
+
+
+def read_data_source(data_dir, name):
+    """Lit une source de données (jeu Parquet partitionné, Parquet ou CSV), None si elle n'est pas fournie"""
+    dataset_path = os.path.join(data_dir, name)
+    if os.path.isdir(dataset_path):
+        return pd.read_parquet(dataset_path)
+    parquet_path = os.path.join(data_dir, f"{name}.parquet")
+    csv_path = os.path.join(data_dir, f"{name}.csv")
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path)
+    if os.path.exists(csv_path):
+        return pd.read_csv(csv_path)
+    return None
+
+
+def load_data_sources(data_dir=DATA_DIR, max_workers=LOADER_MAX_WORKERS):
+    """Charge les sources en parallèle dans un pool borné et mesure la durée de chacune"""
+    def timed_read(name):
+        debut = time.perf_counter()
+        frame = read_data_source(data_dir, name)
+        return frame, time.perf_counter() - debut
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source-loader') as executor:
+        futures = {name: executor.submit(timed_read, name) for name in DATA_SOURCES}
+        results = {name: future.result() for name, future in futures.items()}
+    
+    sources = {name: frame for name, (frame, _) in results.items()}
+    timings = {name: duree for name, (_, duree) in results.items()}
+    return sources, timings
+
+
+def display_map_html(html, width, height):
+    """Affiche une carte Folium déjà rendue en HTML"""
+    components.html(html, width=width, height=height + 10)
+
+
+def display_interactive_map(m, key, zoom, center):
+    """Affiche une carte Folium et renvoie le zoom et le centre choisis par l'utilisateur"""
+    return st_folium(m, key=key, width=1000, height=500, zoom=zoom, center=center,
+                     returned_objects=['zoom', 'center'])
+
+
+def frame_fingerprint(*frames):
+    """Empreinte du contenu d'un ou plusieurs DataFrames"""
+    empreinte = hashlib.sha1()
+    for df in frames:
+        empreinte.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return empreinte.hexdigest()[:12]
+
+
+def compute_monthly_payments(montant, taux_annuel, duree_ans):
+    """Mensualités d'un prêt à taux fixe, vectorisées sur des scalaires ou tableaux numpy"""
+    montant = np.asarray(montant, dtype=float)
+    taux_mensuel = np.asarray(taux_annuel, dtype=float) / 100 / 12
+    nb_mensualites = np.asarray(duree_ans, dtype=float) * 12
+    facteur = (1 + taux_mensuel) ** nb_mensualites
+    # Taux nul : remboursement linéaire du capital
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(taux_mensuel > 0,
+                        montant * taux_mensuel * facteur / (facteur - 1),
+                        montant / nb_mensualites)
+
+
+def lttb_indices(x, y, budget):
+    """Indices conservés par l'algorithme LTTB (Largest-Triangle-Three-Buckets)"""
+    n = len(y)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Le premier et le dernier point sont conservés, le reste est découpé en budget - 2 seaux
+    bornes = np.linspace(1, n - 1, budget - 1).astype(int)
+    indices = np.empty(budget, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    
+    for i in range(budget - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        # Point moyen du seau suivant (ou dernier point pour le dernier seau)
+        if i + 2 < len(bornes):
+            x_suivant = x[fin:bornes[i + 2]].mean()
+            y_suivant = y[fin:bornes[i + 2]].mean()
+        else:
+            x_suivant, y_suivant = x[-1], y[-1]
+        a = indices[i]
+        # Point du seau formant le plus grand triangle avec le point retenu précédent
+        aires = np.abs((x[a] - x_suivant) * (y[debut:fin] - y[a])
+                       - (x[a] - x[debut:fin]) * (y_suivant - y[a]))
+        indices[i + 1] = debut + int(np.argmax(aires))
+    
+    return indices
+
+
+def downsample_series(df, x, y, budget=SERIES_POINT_BUDGET, group=None):
+    """Réduit chaque série au-delà du budget de points en préservant sa forme (LTTB)"""
+    if df.empty or (group is None and len(df) <= budget):
+        return df
+    
+    groupes = [df] if group is None else [g for _, g in df.groupby(group, sort=False, observed=True)]
+    reduits = []
+    for serie in groupes:
+        serie = serie.sort_values(x)
+        x_valeurs = serie[x].values
+        if np.issubdtype(x_valeurs.dtype, np.datetime64):
+            x_valeurs = x_valeurs.astype('datetime64[ns]').astype(np.int64)
+        reduits.append(serie.iloc[lttb_indices(x_valeurs, serie[y].values, budget)])
+    return pd.concat(reduits)
+
+
+class DataSnapshot:
+    """Instantané immuable des données, partagé par toutes les sessions"""
+    def __init__(self, version, communes_data, historical_data, current_data, microregion_data, fingerprint,
+                 load_timings=None, trends=None, spatial_index=None, similarity_index=None,
+                 price_quantiles=None, key_metrics=None, scenario_engine=None):
+        self.version = version
+        self.communes_data = communes_data
+        self.historical_data = historical_data
+        self.current_data = current_data
+        self.microregion_data = microregion_data
+        self.fingerprint = fingerprint
+        self.load_timings = load_timings or {}
+        self.trends = trends or {}
+        self.spatial_index = spatial_index
+        self.similarity_index = similarity_index
+        self.price_quantiles = price_quantiles or {}
+        self.key_metrics = key_metrics or {}
+        self.scenario_engine = scenario_engine
+        self.created_at = datetime.now()
+
+
+class SnapshotStore:
+    """Reconstruit les données hors du chemin des requêtes et publie des instantanés versionnés"""
+    def __init__(self, builder, refresh_interval=REFRESH_INTERVAL_SECONDS):
+        self._builder = builder
+        self._refresh_interval = refresh_interval
+        self._refresh_requested = threading.Event()
+        self.last_error = None
+        self._listeners = []
+        # Premier instantané construit au démarrage, les suivants en arrière-plan
+        self._snapshot = builder(1)
+        self._thread = threading.Thread(target=self._run, name='snapshot-refresher', daemon=True)
+        self._thread.start()
+    
+    @property
+    def version(self):
+        """Compteur de version de l'instantané publié"""
+        return self._snapshot.version
+    
+    def current(self):
+        """Retourne l'instantané publié (lecture atomique d'une référence)"""
+        return self._snapshot
+    
+    def subscribe(self, callback):
+        """Appelle callback(snapshot) pour l'instantané courant puis à chaque publication"""
+        self._listeners.append(callback)
+        callback(self._snapshot)
+    
+    def request_refresh(self):
+        """Demande une reconstruction sans bloquer l'appelant"""
+        self._refresh_requested.set()
+    
+    def _run(self):
+        while True:
+            self._refresh_requested.wait(timeout=self._refresh_interval)
+            self._refresh_requested.clear()
+            try:
+                snapshot = self._builder(self._snapshot.version + 1)
+            except Exception as exc:
+                # On conserve l'instantané précédent en cas d'échec
+                self.last_error = exc
+                logger.exception("Échec de la reconstruction des données")
+                continue
+            # Remplacement atomique : les sessions en cours gardent leur référence
+            self._snapshot = snapshot
+            self.last_error = None
+            for callback in self._listeners:
+                try:
+                    callback(snapshot)
+                except Exception:
+                    logger.exception("Échec d'un abonné à la publication des données")
+
+
+class CommuneDetailCache:
+    """Cache LRU borné des fiches communes, indexé par commune et version des données"""
+    def __init__(self, max_size=COMMUNE_DETAIL_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.view_counts = Counter()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, commune, version, builder, variant=None):
+        """Retourne la fiche en cache, ou la calcule avec builder(commune) et la conserve"""
+        key = (commune, version, variant)
+        with self._lock:
+            self.view_counts[commune] += 1
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+        detail = builder(commune)
+        self._store(key, detail)
+        return detail
+    
+    def prewarm(self, commune, version, builder, variant=None):
+        """Calcule une fiche à l'avance, sans la compter comme une consultation"""
+        key = (commune, version, variant)
+        with self._lock:
+            if key in self._entries:
+                return
+        self._store(key, builder(commune))
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def top_communes(self, n):
+        """Communes les plus consultées"""
+        with self._lock:
+            return [commune for commune, _ in self.view_counts.most_common(n)]
+    
+    def _store(self, key, detail):
+        with self._lock:
+            self._entries[key] = detail
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
 class ReunionHousingDashboard:
-    def __init__(self):
-        self.communes_data = self.define_communes_data()
+    def __init__(self, snapshot=None, store=None, version=1, price_index_engine=None, quantile_sketches=None,
+                 artifact_cache=None, queries=None):
+        self.store = store
+        self.controls = {}
+        self.instrumentation_slot = None
+        self.profiling_slot = None
+        self.profiler = None
+        self.last_capture = None
+        # Résultats du plan des vues (clé, résultats), calculés au premier graphique de l'exécution
+        self._view_results = None
+        self.artifact_cache = artifact_cache
+        # Requêtes regroupées entre sessions ; sans couche partagée, calculées sur place
+        self.queries = queries or data_layer.DataLayer(max_workers=0)
+        # Moteur d'indices et sketches conservés d'une version à l'autre pour n'ingérer que les nouveautés
+        self.price_index_engine = price_index_engine or PriceIndexEngine()
+        self.quantile_sketches = quantile_sketches or QuantileSketchCube()
+        self.price_quantiles = {}
+        if snapshot is None:
+            snapshot = store.current() if store is not None else self.build_snapshot(version)
+        self.snapshot = snapshot
+        self.communes_data = snapshot.communes_data
+        self.historical_data = snapshot.historical_data
+        self.current_data = snapshot.current_data
+        self.microregion_data = snapshot.microregion_data
+        self.trends = snapshot.trends
+        self.spatial_index = snapshot.spatial_index
+        self.similarity_index = snapshot.similarity_index
+        self.price_quantiles = snapshot.price_quantiles
+        self.key_metrics = snapshot.key_metrics
+        self.scenario_engine = snapshot.scenario_engine
+    
+    def build_snapshot(self, version):
+        """Construit un nouvel instantané des données"""
+        debut = time.perf_counter()
+        sources, timings = load_data_sources()
+        
+        # Jointure des sources chargées en parallèle
+        debut_jointure = time.perf_counter()
+        self.communes_data = self.join_communes_sources(sources)
         self.historical_data = self.initialize_historical_data()
+        if sources['transactions'] is not None:
+            self.historical_data = self.join_transactions(self.historical_data, sources['transactions'])
+        timings['jointure'] = time.perf_counter() - debut_jointure
+        
+        # Indices de prix à qualité constante par micro-région
+        if sources['transactions'] is not None:
+            # Les agrégats dépendent des transactions et du rattachement des communes aux micro-régions
+            empreinte_transactions = frame_fingerprint(
+                sources['transactions'], pd.DataFrame(self.communes_data)[['nom', 'micro_region']])
+            debut_indices = time.perf_counter()
+            # Le moteur est mis en cache avec son résultat : relu du disque, il reprend l'état correspondant
+            # (la prochaine mise à jour incrémentale part de ces indices)
+            indices, moteur = self.cached_artifact(
+                'indices_prix', empreinte_transactions, None,
+                lambda: (self.compute_price_index(sources['transactions']), self.price_index_engine),
+                code=price_index)
+            self.price_index_engine.restore(moteur)
+            self.historical_data = self.historical_data.merge(indices, on=['date', 'micro_region'], how='left')
+            timings['indices_prix'] = time.perf_counter() - debut_indices
+            
+            # Médianes et percentiles lus dans les sketches commune × mois
+            debut_quantiles = time.perf_counter()
+            self.price_quantiles, sketches = self.cached_artifact(
+                'quantiles_prix', empreinte_transactions, None,
+                lambda: (self.compute_price_quantiles(sources['transactions']), self.quantile_sketches),
+                code=quantile_sketch)
+            self.quantile_sketches.restore(sketches)
+            timings['quantiles_prix'] = time.perf_counter() - debut_quantiles
+        
+        # Tendances calculées sur l'historique, une fois par version des données
+        debut_analyses = time.perf_counter()
+        self.trends = self.cached_artifact('tendances', frame_fingerprint(self.historical_data), None,
+                                           lambda: analytics.compute_analytics(self.historical_data),
+                                           code=analytics)
+        self.apply_computed_trends()
+        # Signalement des variations anormales et des lignes invalides dans l'historique
+        self.historical_data = self.historical_data.join(analytics.anomaly_flags(self.historical_data, self.trends))
+        timings['analyses'] = time.perf_counter() - debut_analyses
+        
         self.current_data = self.initialize_current_data()
         self.microregion_data = self.initialize_microregion_data()
+        snapshot = self.assemble_snapshot(version, self.data_fingerprint(), timings)
+        timings['total'] = time.perf_counter() - debut
+        return snapshot
+    
+    def assemble_snapshot(self, version, fingerprint, timings):
+        """Construit les index dérivés des tables chargées et l'instantané correspondant"""
+        # Index spatial des communes (même ordre que current_data)
+        self.spatial_index = SpatialIndex(self.current_data['lat'], self.current_data['lon'])
+        # Distances entre communes précalculées une fois par version
+        self.similarity_index = SimilarityIndex(build_feature_matrix(self.current_data))
+        # Indicateurs de l'en-tête : calculés une fois, relus tels quels à chaque réexécution
+        self.key_metrics = analytics.compute_key_metrics(self.historical_data, self.current_data)
+        # Leviers de référence et appartenance aux micro-régions des scénarios
+        self.scenario_engine = scenarios.ScenarioEngine(self.current_data)
+        return DataSnapshot(version, self.communes_data, self.historical_data, self.current_data,
+                            self.microregion_data, fingerprint, load_timings=timings,
+                            trends=self.trends, spatial_index=self.spatial_index,
+                            similarity_index=self.similarity_index, price_quantiles=self.price_quantiles,
+                            key_metrics=self.key_metrics, scenario_engine=self.scenario_engine)
+    
+    def restore_snapshot(self, version, frames, fingerprint, timings):
+        """Reconstruit un instantané à partir des tables publiées par un autre processus"""
+        self.historical_data = frames['historical_data']
+        self.current_data = frames['current_data']
+        self.microregion_data = frames['microregion_data']
+        self.communes_data = self.current_data.to_dict('records')
+        self.price_quantiles = {niveau[len('quantiles_'):]: df for niveau, df in frames.items()
+                                if niveau.startswith('quantiles_')}
+        debut = time.perf_counter()
+        self.trends = analytics.compute_analytics(self.historical_data)
+        timings = dict(timings, analyses_locales=time.perf_counter() - debut)
+        return self.assemble_snapshot(version, fingerprint, timings)
+    
+    @staticmethod
+    def snapshot_frames(snapshot):
+        """Tables d'un instantané publiées en mémoire partagée"""
+        frames = {'historical_data': snapshot.historical_data, 'current_data': snapshot.current_data,
+                  'microregion_data': snapshot.microregion_data}
+        frames.update({f"quantiles_{niveau}": df for niveau, df in snapshot.price_quantiles.items()})
+        return frames
+    
+    def join_communes_sources(self, sources):
+        """Construit le référentiel des communes et y joint population, loyers et permis"""
+        if sources['communes'] is not None:
+            communes = sources['communes']
+        else:
+            communes = pd.DataFrame(self.define_communes_data())
+        
+        # Chaque source complémentaire remplace les colonnes qu'elle fournit, par commune
+        for name in ['population', 'loyers', 'permis']:
+            source = sources[name]
+            if source is None:
+                continue
+            colonnes = [c for c in source.columns if c != 'nom' and c in communes.columns]
+            complements = communes[['nom']].merge(source[['nom'] + colonnes], on='nom', how='left')
+            for colonne in colonnes:
+                communes[colonne] = (complements[colonne]
+                                     .fillna(communes[colonne])
+                                     .astype(communes[colonne].dtype)
+                                     .values)
+        
+        return communes.to_dict('records')
+    
+    def compute_price_index(self, transactions):
+        """Met à jour l'indice de prix à qualité constante de chaque micro-région (format long)"""
+        micro_regions = {commune['nom']: commune['micro_region'] for commune in self.communes_data}
+        transactions = transactions.assign(micro_region=transactions['commune'].map(micro_regions))
+        self.price_index_engine.refresh(transactions.dropna(subset=['micro_region']))
+        return self.price_index_engine.to_frame()
+    
+    def cached_artifact(self, name, fingerprint, params, compute, code=None):
+        """Artefact relu du cache disque s'il a déjà été calculé pour ces données, sinon compute()"""
+        if self.artifact_cache is None:
+            return compute()
+        return self.artifact_cache.get_or_compute(name, fingerprint, params, compute, code)
+    
+    def compute_price_quantiles(self, transactions):
+        """Ingère les nouvelles transactions dans les sketches et calcule P10/P50/P90 par niveau"""
+        self.quantile_sketches.ingest(transactions)
+        micro_regions = {commune['nom']: commune['micro_region'] for commune in self.communes_data}
+        return {
+            'commune': self.quantile_sketches.quantile_frame('commune'),
+            'micro_region': self.quantile_sketches.quantile_frame('micro_region', micro_regions),
+            'ile': self.quantile_sketches.quantile_frame('ile'),
+        }
+    
+    def apply_computed_trends(self):
+        """Remplace l'évolution des prix sur 1 an par le glissement annuel calculé sur l'historique"""
+        glissement = self.trends['prix_m2']['resume']['glissement_annuel']
+        for commune in self.communes_data:
+            if pd.notna(glissement.get(commune['nom'])):
+                commune['evolution_prix_1an'] = round(float(glissement[commune['nom']]), 1)
+    
+    def join_transactions(self, historical_data, transactions):
+        """Remplace les prix simulés par la moyenne mensuelle des transactions, par commune"""
+        transactions = transactions.assign(date=pd.to_datetime(transactions['date']))
+        prix_mensuels = (transactions
+                         .groupby([pd.Grouper(key='date', freq='M'), 'commune'])['prix_m2']
+                         .mean()
+                         .rename('prix_transactions')
+                         .reset_index())
+        historical_data = historical_data.merge(prix_mensuels, on=['date', 'commune'], how='left')
+        historical_data['prix_m2'] = historical_data['prix_transactions'].fillna(historical_data['prix_m2'])
+        return historical_data.drop(columns='prix_transactions')
         
     def define_communes_data(self):
         """Définit les données des communes de La Réunion"""
-        return [
-            {
-                'nom': 'Saint-Denis',
-                'micro_region': 'Nord',
-                'population': 153810,
-                'superficie_km2': 142.79,
-                'prix_m2_moyen': 3200,
-                'evolution_prix_1an': 4.2,
-                'loyers_moyens_m2': 12.5,
-                'logements_sociaux_pourcentage': 28,
-                'taux_vacance': 6.2,
-                'permis_construire_2024': 420,
-                'lat': -20.8789,
-                'lon': 55.4481,
-                'description': 'Préfecture et ville la plus peuplée'
-            },
-            {
-                'nom': 'Saint-Paul',
-                'micro_region': 'Ouest',
-                'population': 105240,
-                'superficie_km2': 241.28,
-                'prix_m2_moyen': 2800,
-                'evolution_prix_1an': 5.8,
-                'loyers_moyens_m2': 10.8,
-                'logements_sociaux_pourcentage': 32,
-                'taux_vacance': 5.8,
-                'permis_construire_2024': 380,
-                'lat': -21.0097,
-                'lon': 55.2697,
-                'description': 'Deuxième ville de l\'île, fort développement'
-            },
-            {
-                'nom': 'Saint-Pierre',
-                'micro_region': 'Sud',
-                'population': 84520,
-                'superficie_km2': 95.99,
-                'prix_m2_moyen': 2950,
-                'evolution_prix_1an': 6.1,
-                'loyers_moyens_m2': 11.2,
-                'logements_sociaux_pourcentage': 26,
-                'taux_vacance': 4.9,
-                'permis_construire_2024': 350,
-                'lat': -21.3393,
-                'lon': 55.4781,
-                'description': 'Sous-préfecture du Sud, pôle économique'
-            },
-            {
-                'nom': 'Le Tampon',
-                'micro_region': 'Sud',
-                'population': 79849,
-                'superficie_km2': 165.43,
-                'prix_m2_moyen': 2600,
-                'evolution_prix_1an': 5.2,
-                'loyers_moyens_m2': 9.8,
-                'logements_sociaux_pourcentage': 24,
-                'taux_vacance': 5.1,
-                'permis_construire_2024': 290,
-                'lat': -21.2779,
-                'lon': 55.5179,
-                'description': 'Commune résidentielle en forte croissance'
-            },
-            {
-                'nom': 'Saint-André',
-                'micro_region': 'Est',
-                'population': 56602,
-                'superficie_km2': 53.07,
-                'prix_m2_moyen': 2200,
-                'evolution_prix_1an': 3.8,
-                'loyers_moyens_m2': 8.5,
-                'logements_sociaux_pourcentage': 35,
-                'taux_vacance': 7.2,
-                'permis_construire_2024': 180,
-                'lat': -20.9631,
-                'lon': 55.6508,
-                'description': 'Commune agricole en développement'
-            },
-            {
-                'nom': 'Saint-Louis',
-                'micro_region': 'Sud',
-                'population': 53609,
-                'superficie_km2': 98.90,
-                'prix_m2_moyen': 2450,
-                'evolution_prix_1an': 4.9,
-                'loyers_moyens_m2': 10.2,
-                'logements_sociaux_pourcentage': 31,
-                'taux_vacance': 6.5,
-                'permis_construire_2024': 220,
-                'lat': -21.2861,
-                'lon': 55.4111,
-                'description': 'Pôle économique du Sud'
-            },
-            {
-                'nom': 'Le Port',
-                'micro_region': 'Ouest',
-                'population': 32995,
-                'superficie_km2': 16.62,
-                'prix_m2_moyen': 1950,
-                'evolution_prix_1an': 2.8,
-                'loyers_moyens_m2': 7.8,
-                'logements_sociaux_pourcentage': 45,
-                'taux_vacance': 8.5,
-                'permis_construire_2024': 120,
-                'lat': -20.9394,
-                'lon': 55.2928,
-                'description': 'Ville portuaire et industrielle'
-            },
-            {
-                'nom': 'Saint-Joseph',
-                'micro_region': 'Sud',
-                'population': 37882,
-                'superficie_km2': 178.50,
-                'prix_m2_moyen': 2100,
-                'evolution_prix_1an': 4.1,
-                'loyers_moyens_m2': 8.2,
-                'logements_sociaux_pourcentage': 29,
-                'taux_vacance': 6.8,
-                'permis_construire_2024': 160,
-                'lat': -21.3778,
-                'lon': 55.6197,
-                'description': 'Grande commune du Sud'
-            },
-            {
-                'nom': 'Saint-Benoît',
-                'micro_region': 'Est',
-                'population': 37308,
-                'superficie_km2': 229.61,
-                'prix_m2_moyen': 2050,
-                'evolution_prix_1an': 3.5,
-                'loyers_moyens_m2': 7.9,
-                'logements_sociaux_pourcentage': 33,
-                'taux_vacance': 7.1,
-                'permis_construire_2024': 140,
-                'lat': -21.0339,
-                'lon': 55.7147,
-                'description': 'Sous-préfecture de l\'Est'
-            },
-            {
-                'nom': 'Sainte-Marie',
-                'micro_region': 'Nord',
-                'population': 34167,
-                'superficie_km2': 87.21,
-                'prix_m2_moyen': 2850,
-                'evolution_prix_1an': 4.5,
-                'loyers_moyens_m2': 11.0,
-                'logements_sociaux_pourcentage': 27,
-                'taux_vacance': 5.5,
-                'permis_construire_2024': 190,
-                'lat': -20.8969,
-                'lon': 55.5492,
-                'description': 'Ville dynamique du Nord'
-            },
-            {
-                'nom': 'Saint-Leu',
-                'micro_region': 'Ouest',
-                'population': 34746,
-                'superficie_km2': 118.37,
-                'prix_m2_moyen': 2700,
-                'evolution_prix_1an': 5.5,
-                'loyers_moyens_m2': 10.5,
-                'logements_sociaux_pourcentage': 25,
-                'taux_vacance': 5.2,
-                'permis_construire_2024': 210,
-                'lat': -21.1653,
-                'lon': 55.2881,
-                'description': 'Station balnéaire prisée'
-            },
-            {
-                'nom': 'La Possession',
-                'micro_region': 'Ouest',
-                'population': 33506,
-                'superficie_km2': 118.35,
-                'prix_m2_moyen': 2500,
-                'evolution_prix_1an': 4.8,
-                'loyers_moyens_m2': 9.5,
-                'logements_sociaux_pourcentage': 30,
-                'taux_vacance': 5.9,
-                'permis_construire_2024': 170,
-                'lat': -20.9253,
-                'lon': 55.3358,
-                'description': 'Ville en développement rapide'
-            },
-            {
-                'nom': 'Sainte-Suzanne',
-                'micro_region': 'Nord',
-                'population': 24645,
-                'superficie_km2': 57.84,
-                'prix_m2_moyen': 2650,
-                'evolution_prix_1an': 4.0,
-                'loyers_moyens_m2': 10.0,
-                'logements_sociaux_pourcentage': 28,
-                'taux_vacance': 6.0,
-                'permis_construire_2024': 130,
-                'lat': -20.9061,
-                'lon': 55.6069,
-                'description': 'Commune agricole et résidentielle'
-            },
-            {
-                'nom': 'Bras-Panon',
-                'micro_region': 'Est',
-                'population': 13170,
-                'superficie_km2': 88.55,
-                'prix_m2_moyen': 1900,
-                'evolution_prix_1an': 3.2,
-                'loyers_moyens_m2': 7.2,
-                'logements_sociaux_pourcentage': 32,
-                'taux_vacance': 7.5,
-                'permis_construire_2024': 90,
-                'lat': -21.0017,
-                'lon': 55.6772,
-                'description': 'Commune rurale de l\'Est'
-            },
-            {
-                'nom': 'Les Avirons',
-                'micro_region': 'Ouest',
-                'population': 11447,
-                'superficie_km2': 26.27,
-                'prix_m2_moyen': 2350,
-                'evolution_prix_1an': 4.3,
-                'loyers_moyens_m2': 9.0,
-                'logements_sociaux_pourcentage': 26,
-                'taux_vacance': 5.7,
-                'permis_construire_2024': 110,
-                'lat': -21.2408,
-                'lon': 55.3392,
-                'description': 'Petite commune de l\'Ouest'
-            },
-            {
-                'nom': 'Entre-Deux',
-                'micro_region': 'Sud',
-                'population': 7070,
-                'superficie_km2': 66.83,
-                'prix_m2_moyen': 2000,
-                'evolution_prix_1an': 3.7,
-                'loyers_moyens_m2': 7.5,
-                'logements_sociaux_pourcentage': 22,
-                'taux_vacance': 6.3,
-                'permis_construire_2024': 70,
-                'lat': -21.2500,
-                'lon': 55.4722,
-                'description': 'Commune des Hauts de l\'île'
-            },
-            {
-                'nom': 'L\'Étang-Salé',
-                'micro_region': 'Ouest',
-                'population': 14030,
-                'superficie_km2': 38.65,
-                'prix_m2_moyen': 2400,
-                'evolution_prix_1an': 4.6,
-                'loyers_moyens_m2': 9.2,
-                'logements_sociaux_pourcentage': 27,
-                'taux_vacance': 5.4,
-                'permis_construire_2024': 100,
-                'lat': -21.2631,
-                'lon': 55.3842,
-                'description': 'Station balnéaire familiale'
-            },
-            {
-                'nom': 'Petite-Île',
-                'micro_region': 'Sud',
-                'population': 12155,
-                'superficie_km2': 33.93,
-                'prix_m2_moyen': 2250,
-                'evolution_prix_1an': 4.0,
-                'loyers_moyens_m2': 8.8,
-                'logements_sociaux_pourcentage': 29,
-                'taux_vacance': 6.1,
-                'permis_construire_2024': 85,
-                'lat': -21.3531,
-                'lon': 55.5639,
-                'description': 'Petite commune du Sud'
-            },
-            {
-                'nom': 'Saint-Philippe',
-                'micro_region': 'Sud',
-                'population': 5232,
-                'superficie_km2': 153.94,
-                'prix_m2_moyen': 1800,
-                'evolution_prix_1an': 2.9,
-                'loyers_moyens_m2': 6.8,
-                'logements_sociaux_pourcentage': 24,
-                'taux_vacance': 8.0,
-                'permis_construire_2024': 50,
-                'lat': -21.3592,
-                'lon': 55.7672,
-                'description': 'Commune sauvage du Sud Sauvage'
-            },
-            {
-                'nom': 'Sainte-Rose',
-                'micro_region': 'Est',
-                'population': 6424,
-                'superficie_km2': 177.60,
-                'prix_m2_moyen': 1750,
-                'evolution_prix_1an': 2.7,
-                'loyers_moyens_m2': 6.5,
-                'logements_sociaux_pourcentage': 26,
-                'taux_vacance': 8.2,
-                'permis_construire_2024': 45,
-                'lat': -21.1242,
-                'lon': 55.7961,
-                'description': 'Commune de l\'Est préservée'
-            },
-            {
-                'nom': 'Cilaos',
-                'micro_region': 'Cirques',
-                'population': 5528,
-                'superficie_km2': 84.40,
-                'prix_m2_moyen': 1600,
-                'evolution_prix_1an': 2.5,
-                'loyers_moyens_m2': 6.0,
-                'logements_sociaux_pourcentage': 35,
-                'taux_vacance': 9.0,
-                'permis_construire_2024': 30,
-                'lat': -21.1339,
-                'lon': 55.4719,
-                'description': 'Commune du cirque de Cilaos'
-            },
-            {
-                'nom': 'Salazie',
-                'micro_region': 'Cirques',
-                'population': 7363,
-                'superficie_km2': 103.82,
-                'prix_m2_moyen': 1550,
-                'evolution_prix_1an': 2.3,
-                'loyers_moyens_m2': 5.8,
-                'logements_sociaux_pourcentage': 38,
-                'taux_vacance': 9.5,
-                'permis_construire_2024': 35,
-                'lat': -21.0272,
-                'lon': 55.5392,
-                'description': 'Commune du cirque de Salazie'
-            },
-            {
-                'nom': 'Les Trois-Bassins',
-                'micro_region': 'Ouest',
-                'population': 6980,
-                'superficie_km2': 42.58,
-                'prix_m2_moyen': 2300,
-                'evolution_prix_1an': 4.2,
-                'loyers_moyens_m2': 8.9,
-                'logements_sociaux_pourcentage': 25,
-                'taux_vacance': 5.8,
-                'permis_construire_2024': 75,
-                'lat': -21.1039,
-                'lon': 55.2992,
-                'description': 'Commune de l\'Ouest'
-            }
-        ]
+        return reference_data.communes_data()
     
     def initialize_historical_data(self):
         """Initialise les données historiques des prix"""
@@ -495,6 +642,10 @@ class ReunionHousingDashboard:
         
         return pd.DataFrame(data)
     
+    def data_fingerprint(self):
+        """Calcule l'empreinte (version) des données chargées"""
+        return frame_fingerprint(self.current_data, self.historical_data)
+    
     def display_header(self):
         """Affiche l'en-tête du dashboard"""
         st.markdown('<h1 class="main-header">🏝️ Dashboard Logements - Île de la Réunion</h1>', 
@@ -504,215 +655,289 @@ class ReunionHousingDashboard:
         with col2:
             st.markdown("**Analyse du marché immobilier réunionnais - Données 2024**")
         
-        current_time = datetime.now().strftime('%d/%m/%Y %H:%M')
-        st.sidebar.markdown(f"**🕐 Dernière mise à jour: {current_time}**")
+        current_time = self.snapshot.created_at.strftime('%d/%m/%Y %H:%M')
+        st.sidebar.markdown(f"**🕐 Dernière mise à jour: {current_time}** (v{self.snapshot.version})")
     
     def display_key_metrics(self):
         """Affiche les métriques clés du marché immobilier"""
         st.markdown('<h3 class="section-header">📊 INDICATEURS CLÉS DU MARCHÉ</h3>', 
                    unsafe_allow_html=True)
         
-        # Calcul des métriques globales
-        prix_moyen_global = self.current_data['prix_m2_moyen'].mean()
-        evolution_prix_moyenne = self.current_data['evolution_prix_1an'].mean()
-        population_totale = self.current_data['population'].sum()
-        permis_construire_total = self.current_data['permis_construire_2024'].sum()
+        # Métriques globales précalculées pour cette version des données
+        metriques = self.key_metrics
+        aide = (f"Variation sur 12 mois au {metriques['date']:%m/%Y}" if metriques.get('date') is not None
+                else None)
+        
+        def variation(nom, decimales=1):
+            valeur = metriques[nom]['variation']
+            return f"{valeur:+.{decimales}f}%" if valeur is not None else None
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
             st.metric(
                 "Prix moyen au m²",
-                f"{prix_moyen_global:.0f} €",
-                f"{evolution_prix_moyenne:+.1f}%",
-                delta_color="normal"
+                f"{metriques['prix_m2']['valeur']:.0f} €",
+                variation('prix_m2'),
+                delta_color="normal",
+                help=aide
             )
         
         with col2:
             st.metric(
                 "Loyer moyen au m²",
-                f"{self.current_data['loyers_moyens_m2'].mean():.1f} €",
-                f"{np.random.uniform(1, 3):.1f}%"
+                f"{metriques['loyer_m2']['valeur']:.1f} €",
+                variation('loyer_m2'),
+                help=aide
             )
         
         with col3:
             st.metric(
                 "Population totale",
-                f"{population_totale:,}",
-                f"{np.random.uniform(0.5, 1.5):.1f}%"
+                f"{metriques['population']['valeur']:,}",
+                help="Population légale des communes (sans historique)"
             )
         
         with col4:
             st.metric(
                 "Permis de construire 2024",
-                f"{permis_construire_total:,}",
-                f"{np.random.uniform(5, 15):.0f}%"
+                f"{metriques['permis_construire']['valeur']:,}",
+                variation('permis_construire', 0),
+                help=aide
             )
     
+    def view_datasets(self):
+        """Jeux de données interrogés par les vues déclarées dans view_specs"""
+        return {'communes': self.current_data, 'micro_regions': self.microregion_data,
+                'historique': self.windowed_history()}
+    
+    def view_results(self):
+        """Résultats de toutes les requêtes distinctes des vues, calculés en un lot par exécution"""
+        cle = ('plan_vues', self.snapshot.fingerprint) + self.history_window()
+        if self._view_results is None or self._view_results[0] != cle:
+            self._view_results = (cle, self.queries.submit(
+                cle, lambda: view_specs.DASHBOARD_PLAN.execute(self.view_datasets())).result())
+        return self._view_results[1]
+    
+    def display_view(self, nom, key=None):
+        """Affiche une vue déclarée à partir du résultat de sa requête dans le plan (key : vue affichée deux fois)"""
+        vue = view_specs.VIEWS[nom]
+        donnees = view_specs.DASHBOARD_PLAN.result(self.view_results(), nom)
+        st.plotly_chart(view_specs.build_figure(vue, donnees), use_container_width=True, key=key)
+    
     def create_market_overview(self):
         """Crée la vue d'ensemble du marché"""
         st.markdown('<h3 class="section-header">🏛️ VUE D\'ENSEMBLE DU MARCHÉ</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3, tab4 = st.tabs(["Carte Interactive", "Évolution des Prix", "Répartition Micro-régions", "Indicateurs Clés"])
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Carte Interactive", "Évolution des Prix", "Répartition Micro-régions",
+                                                "Indicateurs Clés", "Carte Choroplèthe"])
         
         with tab1:
             # Carte interactive avec Folium
             st.subheader("Carte des prix au m² par commune")
             
-            # Création de la carte centrée sur La Réunion
-            m = folium.Map(location=[-21.115, 55.536], zoom_start=10)
+            # Recherche par rayon autour d'une commune
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                centre_rayon = st.selectbox("Centre de la recherche par rayon:",
+                                            ['Aucun'] + list(self.current_data['nom']))
+            with col2:
+                rayon_km = st.slider("Rayon (km):", 1, 50, 10)
             
-            # Ajout des marqueurs pour chaque commune
-            for commune in self.communes_data:
-                # Déterminer la couleur en fonction du prix
-                if commune['prix_m2_moyen'] > 2800:
-                    color = 'red'
-                elif commune['prix_m2_moyen'] > 2300:
-                    color = 'orange'
-                elif commune['prix_m2_moyen'] > 1800:
-                    color = 'green'
-                else:
-                    color = 'blue'
-                
-                # Popup avec informations détaillées
-                popup_text = f"""
-                <b>{commune['nom']}</b><br>
-                Micro-région: {commune['micro_region']}<br>
-                Prix m²: {commune['prix_m2_moyen']} €<br>
-                Évolution: {commune['evolution_prix_1an']} %<br>
-                Population: {commune['population']:,}<br>
-                Taux vacance: {commune['taux_vacance']} %
-                """
-                
-                folium.Marker(
-                    [commune['lat'], commune['lon']],
-                    popup=folium.Popup(popup_text, max_width=300),
-                    tooltip=commune['nom'],
-                    icon=folium.Icon(color=color, icon='home', prefix='fa')
-                ).add_to(m)
+            # Carte relue du cache des artefacts pour ces données et ce rayon
+            carte_html = self.cached_artifact('carte_prix', self.snapshot.fingerprint, (centre_rayon, rayon_km),
+                                              lambda: self.build_price_map_html(centre_rayon, rayon_km),
+                                              code=self.build_price_map_html)
+            display_map_html(carte_html, width=1000, height=500)
             
-            # Affichage de la carte
-            folium_static(m, width=1000, height=500)
+            if centre_rayon != 'Aucun':
+                centre = self.current_data[self.current_data['nom'] == centre_rayon].iloc[0]
+                self.display_radius_stats(centre, rayon_km)
         
         with tab2:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Évolution des prix moyens par micro-région
-                evolution_data = self.historical_data.groupby([
-                    self.historical_data['date'].dt.year,
-                    'micro_region'
-                ])['prix_m2'].mean().reset_index()
-                
-                fig = px.line(evolution_data, 
-                             x='date', 
-                             y='prix_m2',
-                             color='micro_region',
-                             title='Évolution des prix au m² par micro-région (2018-2024)',
-                             color_discrete_sequence=['#FF6B35', '#2A9D8F', '#E9C46A', '#F4A261', '#264653'])
-                fig.update_layout(yaxis_title="Prix moyen au m² (€)")
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('evolution_prix_microregions')
             
             with col2:
-                # Évolution des loyers
-                loyer_data = self.historical_data.groupby([
-                    self.historical_data['date'].dt.year,
-                    'micro_region'
-                ])['loyer_m2'].mean().reset_index()
-                
-                fig = px.line(loyer_data, 
-                             x='date', 
-                             y='loyer_m2',
-                             color='micro_region',
-                             title='Évolution des loyers au m² par micro-région (2018-2024)',
-                             color_discrete_sequence=['#FF6B35', '#2A9D8F', '#E9C46A', '#F4A261', '#264653'])
-                fig.update_layout(yaxis_title="Loyer moyen au m² (€)")
-                st.plotly_chart(fig, use_container_width=True)
+                # Évolution des loyers (même requête que les prix : un seul regroupement)
+                self.display_view('evolution_loyers_microregions')
         
         with tab3:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Répartition des communes par micro-région
-                fig = px.pie(self.microregion_data, 
-                            values='nombre_communes', 
-                            names='micro_region',
-                            title='Répartition des communes par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('communes_par_microregion')
             
             with col2:
                 # Prix moyens par micro-région
-                fig = px.bar(self.microregion_data, 
-                            x='micro_region', 
-                            y='prix_m2_moyen',
-                            title='Prix moyen au m² par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                fig.update_layout(yaxis_title="Prix moyen au m² (€)")
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('prix_microregions')
         
         with tab4:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Taux de vacance par micro-région
-                taux_vacance_data = self.current_data.groupby('micro_region')['taux_vacance'].mean().reset_index()
-                
-                fig = px.bar(taux_vacance_data, 
-                            x='micro_region', 
-                            y='taux_vacance',
-                            title='Taux de vacance moyen par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                fig.update_layout(yaxis_title="Taux de vacance (%)")
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('vacance_microregions')
             
             with col2:
                 # Logements sociaux par micro-région
-                logements_sociaux_data = self.current_data.groupby('micro_region')['logements_sociaux_pourcentage'].mean().reset_index()
-                
-                fig = px.bar(logements_sociaux_data, 
-                            x='micro_region', 
-                            y='logements_sociaux_pourcentage',
-                            title='Pourcentage de logements sociaux par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                fig.update_layout(yaxis_title="Logements sociaux (%)")
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('logements_sociaux_microregions')
+        
+        with tab5:
+            self.choropleth_panel()
+    
+    @st.fragment
+    def choropleth_panel(self):
+        """Carte choroplèthe des communes, contours au niveau de détail adapté au zoom"""
+        indicateur = st.selectbox("Indicateur:", list(CHOROPLETH_INDICATORS),
+                                  format_func=CHOROPLETH_INDICATORS.get, key='choropleth_indicateur')
+        zoom = st.session_state.get('choropleth_zoom', CHOROPLETH_DEFAULT_ZOOM)
+        centre = st.session_state.get('choropleth_centre', [-21.115, 55.536])
+        niveau = boundaries.level_for_zoom(zoom)
+        contours = self.commune_boundaries(niveau)
+        
+        m = self.build_choropleth_map(contours, indicateur)
+        etat = display_interactive_map(m, 'carte_choroplethe', zoom, centre)
+        
+        source = ("contours officiels" if os.path.exists(os.path.join(DATA_DIR, 'communes.geojson'))
+                  else "contours approximatifs (cellules de Voronoï autour des communes)")
+        st.caption(f"Niveau de détail {niveau} pour le zoom {zoom} "
+                   f"({len(json.dumps(contours, separators=(',', ':'))) / 1024:.0f} Ko) - {source}")
+        
+        if etat and etat.get('zoom'):
+            st.session_state['choropleth_zoom'] = etat['zoom']
+            if etat.get('center'):
+                st.session_state['choropleth_centre'] = [etat['center']['lat'], etat['center']['lng']]
+            # Nouveau niveau de détail : seule la carte est redessinée
+            if boundaries.level_for_zoom(etat['zoom']) != niveau:
+                st.rerun(scope='fragment')
+    
+    def commune_boundaries(self, level):
+        """Contours des communes à un niveau de détail (précalculés, sinon simplifiés et mis en cache)"""
+        precalcules = boundaries.load_level(DATA_DIR, level)
+        if precalcules is not None:
+            return precalcules
+        # Le fichier source des contours fait partie de la clé (remplacer communes.geojson invalide le cache)
+        return self.cached_artifact('contours', self.snapshot.fingerprint,
+                                    (level, boundaries.source_version(DATA_DIR)),
+                                    lambda: self.build_commune_boundaries(level), code=boundaries)
+    
+    def build_commune_boundaries(self, level):
+        """Simplifie les contours complets (ou approximatifs à défaut) à un niveau de détail"""
+        complets = boundaries.load_boundaries(DATA_DIR)
+        if complets is None:
+            complets = boundaries.voronoi_boundaries(self.current_data)
+        return boundaries.simplify_collection(complets, boundaries.LEVEL_TOLERANCES[level])
+    
+    def build_choropleth_map(self, contours, indicateur):
+        """Carte Folium des contours colorés par indicateur, joints aux données des communes"""
+        valeurs = self.current_data.set_index('nom')[list(CHOROPLETH_INDICATORS)]
+        colormap = LinearColormap(['#2A9D8F', '#E9C46A', '#FF6B35'],
+                                  vmin=float(valeurs[indicateur].min()), vmax=float(valeurs[indicateur].max()),
+                                  caption=CHOROPLETH_INDICATORS[indicateur])
+        
+        features = []
+        for feature in contours['features']:
+            proprietes = dict(feature['properties'])
+            if proprietes.get('nom') in valeurs.index:
+                proprietes.update({cle: float(v) for cle, v in valeurs.loc[proprietes['nom']].items()})
+            features.append({'type': 'Feature', 'properties': proprietes, 'geometry': feature['geometry']})
+        
+        def style(feature):
+            valeur = feature['properties'].get(indicateur)
+            return {'fillColor': colormap(valeur) if valeur is not None else '#cccccc',
+                    'color': '#264653', 'weight': 1, 'fillOpacity': 0.7}
+        
+        m = folium.Map(location=[-21.115, 55.536], zoom_start=CHOROPLETH_DEFAULT_ZOOM)
+        champs = [c for c in ['nom'] + list(CHOROPLETH_INDICATORS)
+                  if all(c in f['properties'] for f in features)]
+        folium.GeoJson({'type': 'FeatureCollection', 'features': features}, style_function=style,
+                       tooltip=folium.GeoJsonTooltip(fields=champs,
+                                                     aliases=[CHOROPLETH_INDICATORS.get(c, 'Commune')
+                                                              for c in champs])).add_to(m)
+        colormap.add_to(m)
+        return m
+    
+    def build_price_map_html(self, centre_rayon, rayon_km):
+        """Carte Folium des prix au m² par commune (HTML autonome)"""
+        # Création de la carte centrée sur La Réunion
+        m = folium.Map(location=[-21.115, 55.536], zoom_start=10)
+        
+        if centre_rayon != 'Aucun':
+            centre = self.current_data[self.current_data['nom'] == centre_rayon].iloc[0]
+            folium.Circle([centre['lat'], centre['lon']], radius=rayon_km * 1000,
+                          color='#264653', fill=True, fill_opacity=0.1).add_to(m)
+        
+        # Ajout des marqueurs pour chaque commune
+        for commune in self.communes_data:
+            # Déterminer la couleur en fonction du prix
+            if commune['prix_m2_moyen'] > 2800:
+                color = 'red'
+            elif commune['prix_m2_moyen'] > 2300:
+                color = 'orange'
+            elif commune['prix_m2_moyen'] > 1800:
+                color = 'green'
+            else:
+                color = 'blue'
+        
+            # Popup avec informations détaillées
+            popup_text = f"""
+            <b>{commune['nom']}</b><br>
+            Micro-région: {commune['micro_region']}<br>
+            Prix m²: {commune['prix_m2_moyen']} €<br>
+            Évolution: {commune['evolution_prix_1an']} %<br>
+            Population: {commune['population']:,}<br>
+            Taux vacance: {commune['taux_vacance']} %
+            """
+        
+            folium.Marker(
+                [commune['lat'], commune['lon']],
+                popup=folium.Popup(popup_text, max_width=300),
+                tooltip=commune['nom'],
+                icon=folium.Icon(color=color, icon='home', prefix='fa')
+            ).add_to(m)
+        
+        return folium.Figure().add_child(m).render()
+    
+    def display_radius_stats(self, centre, rayon_km):
+        """Statistiques des communes situées dans un rayon et communes les plus proches"""
+        def stats(colonne, poids=None):
+            return self.spatial_index.radius_stats(centre['lat'], centre['lon'], rayon_km,
+                                                   self.current_data[colonne], poids)
+        population = stats('population')
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(f"Communes à moins de {rayon_km} km", population['nombre'])
+        with col2:
+            st.metric("Population", f"{population['somme']:,.0f}")
+        with col3:
+            # Prix moyen pondéré par la population
+            prix_pondere = stats('prix_m2_moyen', self.current_data['population'])['moyenne']
+            st.metric("Prix moyen pondéré au m²", f"{prix_pondere:.0f} €")
+        with col4:
+            st.metric("Taux de vacance moyen", f"{stats('taux_vacance')['moyenne']:.1f}%")
+        
+        # Communes les plus proches (hors centre)
+        indices, distances = self.spatial_index.nearest(centre['lat'], centre['lon'], k=6)
+        voisines = self.current_data.iloc[indices][['nom', 'micro_region', 'prix_m2_moyen', 'loyers_moyens_m2']]
+        voisines = voisines.assign(distance_km=distances.round(1))
+        st.markdown(f"**Communes les plus proches de {centre['nom']}**")
+        st.dataframe(voisines[voisines['nom'] != centre['nom']].head(5), hide_index=True)
     
     def create_communes_analysis(self):
         """Affiche l'analyse détaillée par commune"""
         st.markdown('<h3 class="section-header">🏢 ANALYSE PAR COMMUNE</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Comparaison Communes", "Top Performances", "Détails par Commune"])
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Comparaison Communes", "Top Performances",
+                                                      "Détails par Commune", "Communes Similaires", "Superposition",
+                                                      "Anomalies"])
         
         with tab1:
             # Filtres pour les communes
@@ -721,33 +946,15 @@ class ReunionHousingDashboard:
                 microregion_filtre = st.selectbox("Micro-région:", 
                                                 ['Toutes'] + list(self.microregion_data['micro_region'].unique()))
             with col2:
-                population_filtre = st.selectbox("Taille:", 
-                                               ['Toutes', 'Grandes (>50k)', 'Moyennes (20k-50k)', 'Petites (<20k)'])
+                population_filtre = st.selectbox("Taille:", exports.SIZE_FILTERS)
             with col3:
-                tri_filtre = st.selectbox("Trier par:", 
-                                        ['Prix m²', 'Évolution prix', 'Population', 'Permis construire'])
+                tri_filtre = st.selectbox("Trier par:", list(exports.SORT_COLUMNS))
             
-            # Application des filtres
-            communes_filtrees = self.current_data.copy()
-            if microregion_filtre != 'Toutes':
-                communes_filtrees = communes_filtrees[communes_filtrees['micro_region'] == microregion_filtre]
-            if population_filtre == 'Grandes (>50k)':
-                communes_filtrees = communes_filtrees[communes_filtrees['population'] > 50000]
-            elif population_filtre == 'Moyennes (20k-50k)':
-                communes_filtrees = communes_filtrees[(communes_filtrees['population'] >= 20000) & 
-                                                     (communes_filtrees['population'] <= 50000)]
-            elif population_filtre == 'Petites (<20k)':
-                communes_filtrees = communes_filtrees[communes_filtrees['population'] < 20000]
-            
-            # Tri
-            if tri_filtre == 'Prix m²':
-                communes_filtrees = communes_filtrees.sort_values('prix_m2_moyen', ascending=False)
-            elif tri_filtre == 'Évolution prix':
-                communes_filtrees = communes_filtrees.sort_values('evolution_prix_1an', ascending=False)
-            elif tri_filtre == 'Population':
-                communes_filtrees = communes_filtrees.sort_values('population', ascending=False)
-            elif tri_filtre == 'Permis construire':
-                communes_filtrees = communes_filtrees.sort_values('permis_construire_2024', ascending=False)
+            # Application des filtres et tri
+            communes_filtrees = exports.filter_communes(self.current_data, microregion_filtre,
+                                                        population_filtre, tri_filtre)
+            self.export_panel(communes_filtrees, {'micro_region': microregion_filtre,
+                                                  'taille': population_filtre, 'tri': tri_filtre})
             
             # Affichage des communes
             for _, commune in communes_filtrees.iterrows():
@@ -787,114 +994,328 @@ class ReunionHousingDashboard:
             
             with col1:
                 # Top des communes avec la plus forte hausse des prix
-                top_hausse = self.current_data.nlargest(10, 'evolution_prix_1an')
-                fig = px.bar(top_hausse, 
-                            x='evolution_prix_1an', 
-                            y='nom',
-                            orientation='h',
-                            title='Top 10 des communes avec la plus forte hausse des prix (%)',
-                            color='evolution_prix_1an',
-                            color_continuous_scale='Greens')
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('top_hausse_prix')
             
             with col2:
-                # Top des communes avec le plus de permis de construire
-                top_permis = self.current_data.nlargest(10, 'permis_construire_2024')
-                fig = px.bar(top_permis, 
-                            x='permis_construire_2024', 
-                            y='nom',
-                            orientation='h',
-                            title='Top 10 des communes avec le plus de permis de construire (2024)',
-                            color='permis_construire_2024',
-                            color_continuous_scale='Blues')
-                st.plotly_chart(fig, use_container_width=True)
+                # Top des communes avec le plus de permis de construire (même parcours des communes)
+                self.display_view('top_permis')
         
         with tab3:
             # Détails pour une commune sélectionnée
-            commune_selectionnee = st.selectbox("Sélectionnez une commune:", 
-                                             self.current_data['nom'].unique())
+            self.commune_detail_panel()
+        
+        with tab4:
+            self.similar_communes_panel()
+        
+        with tab5:
+            self.commune_overlay_panel()
+        
+        with tab6:
+            self.display_anomalies()
+    
+    def display_anomalies(self):
+        """Variations mensuelles anormales par commune et lignes invalides de l'historique"""
+        indicateurs = {'prix_m2': 'Prix au m²', 'loyer_m2': 'Loyer au m²'}
+        indicateur = st.radio("Série analysée:", list(indicateurs), format_func=indicateurs.get, horizontal=True)
+        historique = self.windowed_history()
+        
+        # Z-score robuste et variation mensuelle des mois signalés
+        signalees = historique.loc[historique[f'anomalie_{indicateur}'],
+                                   ['date', 'commune', 'micro_region', indicateur]]
+        resultats = self.trends[indicateur]
+        signalees = signalees.join(resultats['anomalies']['zscore'].stack().rename('z_score'), on=['date', 'commune'])
+        variations = resultats['series']['valeur'].pct_change(fill_method=None).stack() * 100
+        signalees = signalees.join(variations.rename('variation_mensuelle'), on=['date', 'commune'])
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Mois signalés", f"{len(signalees):,}")
+        with col2:
+            st.metric("Communes concernées", f"{signalees['commune'].nunique()}")
+        with col3:
+            st.metric("Lignes invalides", f"{int(historique['ligne_invalide'].sum()):,}")
+        
+        if signalees.empty:
+            st.info(f"Aucune variation anormale (|z| > {analytics.ANOMALY_THRESHOLD}) sur la période.")
+            return
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.dataframe(signalees.sort_values('date', ascending=False)
+                         .round({indicateur: 1, 'z_score': 1, 'variation_mensuelle': 1}),
+                         hide_index=True)
+        with col2:
+            par_commune = signalees['commune'].value_counts().rename_axis('commune').reset_index(name='mois')
+            fig = px.bar(par_commune, x='mois', y='commune', orientation='h',
+                         title='Mois signalés par commune', color_discrete_sequence=['#E63946'])
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
+    def export_panel(self, communes_filtrees, filtres):
+        """Boutons d'export de la liste filtrée et de l'historique de ces communes (période de la sidebar)"""
+        with st.expander("📥 Exporter"):
+            fmt = st.radio("Format:", exports.available_formats(), horizontal=True, key='export_format')
+            mime = exports.FORMATS[fmt][0]
+            communes = list(communes_filtrees['nom'])
+            date_debut, date_fin = self.history_window()
+            historique = self.historical_data
             
-            if commune_selectionnee:
-                commune_data = self.current_data[self.current_data['nom'] == commune_selectionnee].iloc[0]
-                historique_commune = self.historical_data[self.historical_data['commune'] == commune_selectionnee]
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader(f"Fiche commune: {commune_selectionnee}")
-                    
-                    st.metric("Micro-région", commune_data['micro_region'])
-                    st.metric("Population", f"{commune_data['population']:,}")
-                    st.metric("Superficie", f"{commune_data['superficie_km2']} km²")
-                    st.metric("Prix moyen au m²", f"{commune_data['prix_m2_moyen']} €")
-                    st.metric("Évolution prix (1 an)", f"{commune_data['evolution_prix_1an']}%")
-                    st.metric("Loyer moyen au m²", f"{commune_data['loyers_moyens_m2']} €")
-                    st.metric("Taux de vacance", f"{commune_data['taux_vacance']}%")
-                    st.metric("Logements sociaux", f"{commune_data['logements_sociaux_pourcentage']}%")
-                    st.metric("Permis de construire 2024", commune_data['permis_construire_2024'])
-                
-                with col2:
-                    # Graphique d'évolution des prix pour la commune sélectionnée
-                    fig = px.line(historique_commune, 
-                                 x='date', 
-                                 y='prix_m2',
-                                 title=f'Évolution des prix au m² à {commune_selectionnee}',
-                                 color_discrete_sequence=['#FF6B35'])
-                    fig.update_layout(yaxis_title="Prix au m² (€)")
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Graphique d'évolution des loyers
-                    fig = px.line(historique_commune, 
-                                 x='date', 
-                                 y='loyer_m2',
-                                 title=f'Évolution des loyers au m² à {commune_selectionnee}',
-                                 color_discrete_sequence=['#2A9D8F'])
-                    fig.update_layout(yaxis_title="Loyer au m² (€)")
-                    st.plotly_chart(fig, use_container_width=True)
+            # Fichiers générés à la demande, hors du fil d'exécution du script
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("Liste des communes", key='export_communes', mime=mime,
+                                   file_name=exports.export_filename('communes', fmt), on_click='ignore',
+                                   data=lambda: exports.export_to_bytes(exports.iter_chunks(communes_filtrees), fmt,
+                                                                        exports.frame_schema(communes_filtrees)))
+            with col2:
+                st.download_button("Historique de ces communes", key='export_historique', mime=mime,
+                                   file_name=exports.export_filename('historique', fmt), on_click='ignore',
+                                   data=lambda: exports.export_to_bytes(
+                                       exports.history_chunks(historique, communes, date_debut, date_fin), fmt,
+                                       exports.frame_schema(historique)))
+            
+            # Gros volumes : flux HTTP direct depuis l'API locale
+            if API_PORT:
+                parametres = {'format': fmt, 'communes': ','.join(communes)}
+                if date_debut is not None:
+                    parametres['debut'] = str(date_debut)
+                if date_fin is not None:
+                    parametres['fin'] = str(date_fin)
+                st.markdown(f"Flux direct : [liste](http://localhost:{API_PORT}/export/communes?"
+                            f"{urlencode(dict(filtres, format=fmt))}) · "
+                            f"[historique](http://localhost:{API_PORT}/export/historique?{urlencode(parametres)})")
+    
+    @st.fragment
+    def commune_overlay_panel(self):
+        """Séries de plusieurs communes superposées, en base 100 sur une année de référence"""
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            communes = st.multiselect("Communes comparées:", list(self.current_data['nom']),
+                                      default=list(self.current_data.nlargest(3, 'population')['nom']),
+                                      max_selections=COMPARISON_MAX_COMMUNES)
+        with col2:
+            indicateur = st.radio("Indicateur:", ['Prix au m²', 'Loyer au m²'])
+        # Matrice (date × commune) calculée une fois par version : chaque commune est une colonne
+        matrice = self.trends['prix_m2' if indicateur == 'Prix au m²' else 'loyer_m2']['series']['valeur']
+        with col3:
+            annees = sorted(matrice.index.year.unique())
+            annee_base = st.selectbox("Année de base (=100):", annees)
+        
+        if not communes:
+            st.info("Sélectionnez au moins une commune.")
+            return
+        
+        date_debut, date_fin = self.history_window()
+        series = analytics.rebase(matrice[communes], annee_base).loc[date_debut:date_fin]
+        if series.empty:
+            st.info("Aucune donnée sur la période sélectionnée.")
+            return
+        
+        fig = go.Figure()
+        for commune in communes:
+            serie = downsample_series(series[commune].rename('indice').reset_index(), 'date', 'indice',
+                                      self.point_budget())
+            fig.add_scatter(x=serie['date'], y=serie['indice'], mode='lines', name=commune)
+        fig.add_hline(y=100, line_dash='dot', line_color='#264653')
+        fig.update_layout(title=f"{indicateur} en base 100 ({annee_base})",
+                          xaxis_title="Date", yaxis_title=f"Indice (base 100 en {annee_base})")
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Variation depuis l'année de base, à la dernière date de la période
+        dernieres = series.ffill().iloc[-1]
+        st.dataframe(pd.DataFrame({'commune': communes,
+                                   'indice': dernieres[communes].round(1).values,
+                                   'variation depuis la base (%)': (dernieres[communes] - 100).round(1).values}),
+                     hide_index=True)
+    
+    @st.fragment
+    def similar_communes_panel(self):
+        """Communes les plus comparables à une commune (prix, loyers, vacance, social, densité, permis)"""
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            commune_reference = st.selectbox("Commune de référence:", self.current_data['nom'].unique())
+        with col2:
+            nombre_similaires = st.slider("Nombre de communes similaires:", 1, 10, 5)
+        
+        similaires = self.similarity_index.most_similar(commune_reference, nombre_similaires)
+        
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            tableau = similaires.merge(self.current_data[['nom', 'micro_region', 'prix_m2_moyen', 'loyers_moyens_m2']],
+                                       on='nom')
+            st.dataframe(tableau.round({'distance': 2}), hide_index=True)
+        
+        with col2:
+            # Profil normalisé (z-scores) de la commune de référence et de ses comparables
+            profils = (self.similarity_index.features
+                       .loc[[commune_reference] + list(similaires['nom'])]
+                       .reset_index()
+                       .melt(id_vars='nom', var_name='indicateur', value_name='z_score'))
+            fig = px.bar(profils,
+                         x='indicateur',
+                         y='z_score',
+                         color='nom',
+                         barmode='group',
+                         title=f'Profil des communes comparables à {commune_reference}')
+            fig.update_layout(xaxis_title="Indicateur", yaxis_title="Écart à la moyenne (z-score)")
+            st.plotly_chart(fig, use_container_width=True)
+    
+    @st.fragment
+    def commune_detail_panel(self):
+        """Fiche d'une commune, servie depuis le cache des fiches et réexécutée seule"""
+        commune_selectionnee = st.selectbox("Sélectionnez une commune:", 
+                                         self.current_data['nom'].unique())
+        
+        if commune_selectionnee:
+            # La fenêtre temporelle et le budget de points font partie de la clé du cache
+            variante = self.history_window() + (self.point_budget(),)
+            detail = get_commune_detail_cache().get(commune_selectionnee, self.snapshot.version,
+                                                    lambda commune: self.commune_detail_query(commune).result(),
+                                                    variante)
+            
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.subheader(f"Fiche commune: {commune_selectionnee}")
+                for label, valeur in detail['metrics']:
+                    st.metric(label, valeur)
+            
+            with col2:
+                for figure_json in detail['figures']:
+                    st.plotly_chart(pio.from_json(figure_json), use_container_width=True)
+    
+    def commune_detail_query(self, commune):
+        """Fiche d'une commune (Future), calculée une seule fois pour les sessions qui la demandent ensemble"""
+        cle = ('fiche_commune', self.snapshot.fingerprint, commune) + self.history_window() + (self.point_budget(),)
+        return self.queries.submit(cle, lambda: self.cached_commune_detail(commune))
+    
+    def cached_commune_detail(self, commune):
+        """Fiche d'une commune relue du cache disque des artefacts, ou calculée"""
+        variante = self.history_window() + (self.point_budget(),)
+        return self.cached_artifact('fiche_commune', self.snapshot.fingerprint, (commune, variante),
+                                    lambda: self.build_commune_detail(commune),
+                                    code=(self.build_commune_detail, analytics, lttb_indices, downsample_series))
+    
+    def build_commune_detail(self, commune):
+        """Calcule les métriques et les figures (JSON) de la fiche d'une commune"""
+        commune_data = self.current_data[self.current_data['nom'] == commune].iloc[0]
+        historique = self.windowed_history()
+        historique_commune = historique[historique['commune'] == commune]
+        
+        metrics = [
+            ("Micro-région", commune_data['micro_region']),
+            ("Population", f"{commune_data['population']:,}"),
+            ("Superficie", f"{commune_data['superficie_km2']} km²"),
+            ("Prix moyen au m²", f"{commune_data['prix_m2_moyen']} €"),
+            ("Évolution prix (1 an)", f"{commune_data['evolution_prix_1an']}%"),
+            ("Loyer moyen au m²", f"{commune_data['loyers_moyens_m2']} €"),
+            ("Taux de vacance", f"{commune_data['taux_vacance']}%"),
+            ("Logements sociaux", f"{commune_data['logements_sociaux_pourcentage']}%"),
+            ("Permis de construire 2024", f"{commune_data['permis_construire_2024']}"),
+        ]
+        
+        # Tendances calculées sur l'historique complet
+        tendances = self.trends['prix_m2']['resume'].loc[commune]
+        metrics += [
+            ("Prix moyen mobile 12 mois", f"{tendances['moyenne_12m']:.0f} €"),
+            ("Croissance annuelle moyenne (CAGR)", f"{tendances['cagr']:+.1f}%"),
+            ("Volatilité annualisée (12 mois)", f"{tendances['volatilite_12m']:.1f}%"),
+            ("Baisse maximale depuis un pic", f"{tendances['drawdown_max']:.1f}%"),
+        ]
+        
+        # Graphique d'évolution des prix pour la commune sélectionnée
+        fig_prix = px.line(downsample_series(historique_commune, 'date', 'prix_m2', self.point_budget()), 
+                           x='date', 
+                           y='prix_m2',
+                           title=f'Évolution des prix au m² à {commune}',
+                           color_discrete_sequence=['#FF6B35'])
+        moyenne_mobile = self.trends['prix_m2']['series']['moyenne_12m'][commune].rename('prix_m2').reset_index()
+        moyenne_mobile = moyenne_mobile[moyenne_mobile['date'].isin(historique_commune['date'])]
+        moyenne_mobile = downsample_series(moyenne_mobile, 'date', 'prix_m2', self.point_budget())
+        fig_prix.add_scatter(x=moyenne_mobile['date'], y=moyenne_mobile['prix_m2'],
+                             mode='lines', name='Moyenne mobile 12 mois',
+                             line=dict(color='#264653', dash='dash'))
+        anomalies = historique_commune[historique_commune['anomalie_prix_m2']]
+        if len(anomalies):
+            fig_prix.add_scatter(x=anomalies['date'], y=anomalies['prix_m2'], mode='markers',
+                                 name='Variation anormale', marker=dict(color='#E63946', size=10, symbol='x'))
+        fig_prix.update_layout(yaxis_title="Prix au m² (€)")
+        
+        # Graphique d'évolution des loyers
+        fig_loyer = px.line(downsample_series(historique_commune, 'date', 'loyer_m2', self.point_budget()), 
+                            x='date', 
+                            y='loyer_m2',
+                            title=f'Évolution des loyers au m² à {commune}',
+                            color_discrete_sequence=['#2A9D8F'])
+        fig_loyer.update_layout(yaxis_title="Loyer au m² (€)")
+        
+        return {'metrics': metrics, 'figures': [fig_prix.to_json(), fig_loyer.to_json()]}
+    
+    def history_window(self):
+        """Période d'analyse de la sidebar, None pour une borne couvrant tout l'historique"""
+        date_debut, date_fin = self.controls.get('date_debut'), self.controls.get('date_fin')
+        if date_debut is not None and pd.Timestamp(date_debut) <= self.historical_data['date'].min():
+            date_debut = None
+        if date_fin is not None and pd.Timestamp(date_fin) >= self.historical_data['date'].max():
+            date_fin = None
+        return date_debut, date_fin
+    
+    def session_cache(self):
+        """Cache borné propre à la session courante (None hors session Streamlit)"""
+        if get_script_run_ctx() is None:
+            return None
+        if 'cache_session' not in st.session_state:
+            st.session_state['cache_session'] = get_session_budget_registry().create_cache()
+        return st.session_state['cache_session']
+    
+    def session_cached(self, key, compute):
+        """Valeur du cache de la session pour cette version des données, ou compute()"""
+        cache = self.session_cache()
+        if cache is None:
+            return compute()
+        return cache.get_or_compute((self.snapshot.version,) + key, compute)
+    
+    def windowed_history(self):
+        """Historique restreint à la période d'analyse choisie dans la sidebar"""
+        date_debut, date_fin = self.history_window()
+        if date_debut is None and date_fin is None:
+            return self.historical_data
+        # Une même période est filtrée une seule fois par session, et un seul filtrage à la fois entre sessions
+        return self.session_cached(('historique', date_debut, date_fin),
+                                   lambda: self.queries.history(self.snapshot, date_debut, date_fin).result())
+    
+    def point_budget(self):
+        """Budget de points par série (option de la sidebar)"""
+        return self.controls.get('point_budget', SERIES_POINT_BUDGET)
+    
+    def prewarm_commune_details(self, cache, n=None):
+        """Précalcule les fiches des communes les plus consultées pour cet instantané"""
+        communes = cache.top_communes(n or COMMUNE_DETAIL_PREWARM)
+        if not communes:
+            # Aucune consultation encore : les communes les plus peuplées
+            communes = list(self.current_data.nlargest(n or COMMUNE_DETAIL_PREWARM, 'population')['nom'])
+        variante = (None, None, SERIES_POINT_BUDGET)
+        for commune in communes:
+            cache.prewarm(commune, self.snapshot.version, self.cached_commune_detail, variante)
     
     def create_microregion_analysis(self):
         """Analyse détaillée par micro-région"""
         st.markdown('<h3 class="section-header">📊 ANALYSE PAR MICRO-RÉGION</h3>', 
                    unsafe_allow_html=True)
         
-        tab1, tab2, tab3 = st.tabs(["Comparaison Micro-régions", "Détails Micro-région", "Tendances"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Comparaison Micro-régions", "Détails Micro-région", "Tendances",
+                                          "Scénarios"])
         
         with tab1:
             col1, col2 = st.columns(2)
             
             with col1:
-                # Comparaison des prix moyens
-                fig = px.bar(self.microregion_data, 
-                            x='micro_region', 
-                            y='prix_m2_moyen',
-                            title='Comparaison des prix moyens au m² par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                fig.update_layout(yaxis_title="Prix moyen au m² (€)")
-                st.plotly_chart(fig, use_container_width=True)
+                # Comparaison des prix moyens (vue partagée avec la vue d'ensemble)
+                self.display_view('prix_microregions', key='comparaison_prix_microregions')
             
             with col2:
                 # Comparaison de l'évolution des prix
-                fig = px.bar(self.microregion_data, 
-                            x='micro_region', 
-                            y='evolution_prix_1an',
-                            title='Évolution des prix sur 1 an par micro-région',
-                            color='micro_region',
-                            color_discrete_map={
-                                'Nord': '#FF6B35',
-                                'Sud': '#2A9D8F',
-                                'Ouest': '#E9C46A',
-                                'Est': '#F4A261',
-                                'Cirques': '#264653'
-                            })
-                fig.update_layout(yaxis_title="Évolution des prix (%)")
-                st.plotly_chart(fig, use_container_width=True)
+                self.display_view('evolution_prix_1an_microregions')
         
         with tab2:
             # Détails pour une micro-région sélectionnée
@@ -902,11 +1323,15 @@ class ReunionHousingDashboard:
                                                   self.microregion_data['micro_region'].unique())
             
             if microregion_selectionnee:
+                # Série de la micro-région lancée avant l'affichage des métriques, partagée entre sessions
+                evolution_requete = self.queries.microregion_evolution(self.snapshot, microregion_selectionnee,
+                                                                       *self.history_window())
                 communes_microregion = self.current_data[
                     self.current_data['micro_region'] == microregion_selectionnee
                 ]
-                historique_microregion = self.historical_data[
-                    self.historical_data['micro_region'] == microregion_selectionnee
+                historique = self.windowed_history()
+                historique_microregion = historique[
+                    historique['micro_region'] == microregion_selectionnee
                 ]
                 
                 col1, col2 = st.columns(2)
@@ -932,7 +1357,9 @@ class ReunionHousingDashboard:
                 
                 with col2:
                     # Graphique d'évolution des prix pour la micro-région
-                    evolution_microregion = historique_microregion.groupby('date')['prix_m2'].mean().reset_index()
+                    evolution_microregion = evolution_requete.result()
+                    evolution_microregion = downsample_series(evolution_microregion, 'date', 'prix_m2',
+                                                              self.point_budget())
                     
                     fig = px.line(evolution_microregion, 
                                  x='date', 
@@ -942,6 +1369,41 @@ class ReunionHousingDashboard:
                     fig.update_layout(yaxis_title="Prix moyen au m² (€)")
                     st.plotly_chart(fig, use_container_width=True)
                     
+                    # Prix médian et bande P10-P90, disponibles avec des données de transactions
+                    if 'micro_region' in self.price_quantiles:
+                        quantiles = self.price_quantiles['micro_region']
+                        quantiles = quantiles[quantiles['micro_region'] == microregion_selectionnee]
+                        date_debut, date_fin = self.history_window()
+                        if date_debut is not None:
+                            quantiles = quantiles[quantiles['date'] >= pd.Timestamp(date_debut)]
+                        if date_fin is not None:
+                            quantiles = quantiles[quantiles['date'] <= pd.Timestamp(date_fin)]
+                        fig = go.Figure([
+                            go.Scatter(x=quantiles['date'], y=quantiles['p90'], mode='lines',
+                                       line=dict(width=0), name='P90', showlegend=False),
+                            go.Scatter(x=quantiles['date'], y=quantiles['p10'], mode='lines',
+                                       line=dict(width=0), fill='tonexty', fillcolor='rgba(42, 157, 143, 0.2)',
+                                       name='P10-P90'),
+                            go.Scatter(x=quantiles['date'], y=quantiles['p50'], mode='lines',
+                                       line=dict(color='#2A9D8F'), name='Médiane'),
+                        ])
+                        fig.update_layout(title=f'Prix médian au m² et bande P10-P90 - {microregion_selectionnee}',
+                                          yaxis_title="Prix au m² (€)")
+                        st.plotly_chart(fig, use_container_width=True)
+                    
+                    # Indice à qualité constante, disponible avec des données de transactions
+                    if 'indice_prix_ajuste' in historique_microregion.columns:
+                        indice_microregion = (historique_microregion.groupby('date')['indice_prix_ajuste']
+                                              .first().dropna().reset_index())
+                        fig = px.line(downsample_series(indice_microregion, 'date', 'indice_prix_ajuste',
+                                                        self.point_budget()),
+                                      x='date',
+                                      y='indice_prix_ajuste',
+                                      title=f'Indice des prix à qualité constante - {microregion_selectionnee}',
+                                      color_discrete_sequence=['#264653'])
+                        fig.update_layout(yaxis_title="Indice (base 100)")
+                        st.plotly_chart(fig, use_container_width=True)
+                    
                     # Graphique de répartition des prix par commune
                     fig = px.bar(communes_microregion.sort_values('prix_m2_moyen', ascending=False), 
                                 x='nom', 
@@ -996,6 +1458,67 @@ class ReunionHousingDashboard:
                 - Défis d'accessibilité
                 - Tourisme comme levier
                 """)
+        
+        with tab4:
+            self.scenario_panel()
+    
+    @st.fragment
+    def scenario_panel(self):
+        """Scénarios comparés côte à côte, réévalués seuls lorsque leurs curseurs changent"""
+        st.subheader("Scénarios : permis, logements sociaux, vacance et population")
+        st.caption(f"Résidences principales estimées à {scenarios.HOUSEHOLD_SIZE} personnes par ménage. "
+                   "Tous les scénarios sont évalués en un seul calcul vectorisé.")
+        
+        noms_predefinis = [scenario['nom'] for scenario in scenarios.PRESET_SCENARIOS]
+        predefinis = st.multiselect("Scénarios prédéfinis:", noms_predefinis, default=noms_predefinis[:2])
+        
+        st.markdown("**Scénario personnalisé**")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            zone = st.selectbox("Micro-région du scénario:", ['Toutes'] + self.scenario_engine.regions)
+            variation_permis = st.slider("Variation des permis (%):", -50, 100, 20, step=5)
+        
+        with col2:
+            plancher_sociaux = st.slider("Logements sociaux minimum (%):", 0, 50, 0)
+            variation_vacance = st.slider("Variation de la vacance (points):", -5.0, 5.0, 0.0, step=0.5)
+        
+        with col3:
+            variation_population = st.slider("Variation de la population (%):", -10, 20, 0)
+            indicateur = st.selectbox("Indicateur comparé:", list(scenarios.INDICATORS),
+                                      format_func=scenarios.INDICATORS.get)
+        
+        chocs_hors_permis = [
+            scenarios.shock('logements_sociaux_pourcentage', plancher_sociaux, 'plancher', zone),
+            scenarios.shock('taux_vacance', variation_vacance, 'absolu', zone),
+            scenarios.shock('population', variation_population, 'relatif', zone),
+        ]
+        personnalise = {'nom': 'Personnalisé', 'chocs': chocs_hors_permis + [
+            scenarios.shock('permis_construire_2024', variation_permis, 'relatif', zone)]}
+        lot = [scenario for scenario in scenarios.PRESET_SCENARIOS if scenario['nom'] in predefinis]
+        resultats = self.scenario_engine.evaluate(lot + [personnalise])
+        
+        fig = px.bar(resultats, x='micro_region', y=indicateur, color='scenario', barmode='group',
+                     title=f"{scenarios.INDICATORS[indicateur]} par micro-région et par scénario")
+        fig.update_layout(xaxis_title="Micro-région", yaxis_title=scenarios.INDICATORS[indicateur],
+                          legend_title="Scénario")
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(scenarios.side_by_side(resultats, indicateur).round(2), use_container_width=True)
+        
+        # Sensibilité à la variation des permis, les autres chocs du scénario personnalisé étant fixés
+        variations = np.arange(-50, 101, 5)
+        balayage = self.scenario_engine.evaluate(
+            scenarios.sweep('permis_construire_2024', variations, micro_region=zone,
+                            base={'chocs': chocs_hors_permis}), reference=False)
+        ligne = scenarios.ISLAND if zone == 'Toutes' else zone
+        sensibilite = pd.DataFrame({'variation_permis': variations,
+                                    indicateur: balayage.loc[balayage['micro_region'] == ligne, indicateur].values})
+        fig = px.line(sensibilite, x='variation_permis', y=indicateur, markers=True,
+                      title=f"Sensibilité aux permis de construire - {ligne}",
+                      color_discrete_sequence=['#2A9D8F'])
+        fig.add_vline(x=variation_permis, line_dash='dash', line_color='#FF6B35')
+        fig.update_layout(xaxis_title="Variation des permis (%)", yaxis_title=scenarios.INDICATORS[indicateur])
+        st.plotly_chart(fig, use_container_width=True)
     
     def create_affordability_analysis(self):
         """Analyse de l'accessibilité au logement"""
@@ -1005,16 +1528,17 @@ class ReunionHousingDashboard:
         tab1, tab2, tab3 = st.tabs(["Indicateurs d'Accessibilité", "Effort d'Épargne", "Recommandations"])
         
         with tab1:
-            # Calcul d'indicateurs d'accessibilité
-            self.current_data['prix_appart_70m2'] = self.current_data['prix_m2_moyen'] * 70
-            self.current_data['loyer_appart_70m2'] = self.current_data['loyers_moyens_m2'] * 70
-            self.current_data['annees_epargne'] = self.current_data['prix_appart_70m2'] / (2000 * 12)  # Simulation épargne
+            # Calcul d'indicateurs d'accessibilité (copie : l'instantané est partagé entre sessions)
+            accessibilite = self.current_data.copy()
+            accessibilite['prix_appart_70m2'] = accessibilite['prix_m2_moyen'] * 70
+            accessibilite['loyer_appart_70m2'] = accessibilite['loyers_moyens_m2'] * 70
+            accessibilite['annees_epargne'] = accessibilite['prix_appart_70m2'] / (2000 * 12)  # Simulation épargne
             
             col1, col2 = st.columns(2)
             
             with col1:
                 # Prix d'un appartement 70m² par commune
-                fig = px.bar(self.current_data.nlargest(15, 'prix_appart_70m2'), 
+                fig = px.bar(accessibilite.nlargest(15, 'prix_appart_70m2'), 
                             x='prix_appart_70m2', 
                             y='nom',
                             orientation='h',
@@ -1025,7 +1549,7 @@ class ReunionHousingDashboard:
             
             with col2:
                 # Années d'épargne nécessaires
-                fig = px.bar(self.current_data.nlargest(15, 'annees_epargne'), 
+                fig = px.bar(accessibilite.nlargest(15, 'annees_epargne'), 
                             x='annees_epargne', 
                             y='nom',
                             orientation='h',
@@ -1035,46 +1559,7 @@ class ReunionHousingDashboard:
                 st.plotly_chart(fig, use_container_width=True)
         
         with tab2:
-            st.subheader("Simulateur d'effort d'épargne")
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                commune_choisie = st.selectbox("Commune:", self.current_data['nom'].unique())
-                surface_desiree = st.slider("Surface (m²):", 30, 120, 70)
-            
-            with col2:
-                apport_personnel = st.number_input("Apport personnel (€):", 0, 100000, 20000, step=5000)
-                epargne_mensuelle = st.number_input("Épargne mensuelle (€):", 100, 3000, 1000, step=100)
-            
-            with col3:
-                duree_pret = st.slider("Durée du prêt (ans):", 15, 25, 20)
-                taux_pret = st.slider("Taux du prêt (%):", 1.0, 5.0, 3.0, step=0.1)
-            
-            if commune_choisie:
-                commune_info = self.current_data[self.current_data['nom'] == commune_choisie].iloc[0]
-                prix_total = commune_info['prix_m2_moyen'] * surface_desiree
-                montant_emprunte = prix_total - apport_personnel
-                
-                # Calcul mensualité (simplifié)
-                taux_mensuel = taux_pret / 100 / 12
-                nb_mensualites = duree_pret * 12
-                if taux_mensuel > 0:
-                    mensualite = (montant_emprunte * taux_mensuel * (1 + taux_mensuel)**nb_mensualites) / ((1 + taux_mensuel)**nb_mensualites - 1)
-                else:
-                    mensualite = montant_emprunte / nb_mensualites
-                
-                # Affichage des résultats
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Prix total", f"{prix_total:,.0f} €")
-                    st.metric("Montant à emprunter", f"{montant_emprunte:,.0f} €")
-                with col2:
-                    st.metric("Mensualité estimée", f"{mensualite:.0f} €")
-                    st.metric("Taux d'endettement", f"{(mensualite / 2000 * 100):.1f}%")
-                with col3:
-                    st.metric("Épargne nécessaire", f"{apport_personnel:,.0f} €")
-                    st.metric("Durée d'épargne", f"{(apport_personnel / epargne_mensuelle / 12):.1f} ans")
+            self.affordability_simulator()
         
         with tab3:
             st.subheader("Recommandations pour l'Accession")
@@ -1115,6 +1600,66 @@ class ReunionHousingDashboard:
                 - Considérer la colocation accession
                 """)
     
+    @st.fragment
+    def affordability_simulator(self):
+        """Simulateur d'effort d'épargne, réexécuté seul lorsque ses widgets changent"""
+        st.subheader("Simulateur d'effort d'épargne")
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            commune_choisie = st.selectbox("Commune:", self.current_data['nom'].unique())
+            surface_desiree = st.slider("Surface (m²):", 30, 120, 70)
+        
+        with col2:
+            apport_personnel = st.number_input("Apport personnel (€):", 0, 100000, 20000, step=5000)
+            epargne_mensuelle = st.number_input("Épargne mensuelle (€):", 100, 3000, 1000, step=100)
+        
+        with col3:
+            duree_pret = st.slider("Durée du prêt (ans):", 15, 25, 20)
+            taux_pret = st.slider("Taux du prêt (%):", 1.0, 5.0, 3.0, step=0.1)
+        
+        if commune_choisie:
+            commune_info = self.current_data[self.current_data['nom'] == commune_choisie].iloc[0]
+            prix_total = commune_info['prix_m2_moyen'] * surface_desiree
+            montant_emprunte = prix_total - apport_personnel
+            mensualite = float(compute_monthly_payments(montant_emprunte, taux_pret, duree_pret))
+            
+            # Affichage des résultats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Prix total", f"{prix_total:,.0f} €")
+                st.metric("Montant à emprunter", f"{montant_emprunte:,.0f} €")
+            with col2:
+                st.metric("Mensualité estimée", f"{mensualite:.0f} €")
+                st.metric("Taux d'endettement", f"{(mensualite / 2000 * 100):.1f}%")
+            with col3:
+                st.metric("Épargne nécessaire", f"{apport_personnel:,.0f} €")
+                st.metric("Durée d'épargne", f"{(apport_personnel / epargne_mensuelle / 12):.1f} ans")
+            
+            # Grille des mensualités pour toutes les durées et tous les taux (un seul calcul vectorisé)
+            grille = self.session_cached(('grille_simulateur', float(montant_emprunte)),
+                                         lambda: self.build_simulator_grid(montant_emprunte))
+            fig = px.imshow(grille,
+                            labels=dict(x="Taux du prêt (%)", y="Durée du prêt (ans)", color="Mensualité (€)"),
+                            title=f'Mensualités selon la durée et le taux - {commune_choisie}, {surface_desiree} m²',
+                            color_continuous_scale='Oranges',
+                            aspect='auto')
+            st.plotly_chart(fig, use_container_width=True)
+            
+            fmt = st.radio("Format de la grille:", exports.available_formats(), horizontal=True)
+            st.download_button("📥 Exporter la grille des mensualités", key='export_grille', on_click='ignore',
+                               mime=exports.FORMATS[fmt][0], file_name=exports.export_filename('grille_mensualites', fmt),
+                               data=lambda: exports.export_to_bytes(
+                                   exports.simulator_grid_chunks(montant_emprunte, compute_monthly_payments), fmt))
+    
+    def build_simulator_grid(self, montant_emprunte):
+        """Grille des mensualités (durée × taux) pour un montant emprunté"""
+        durees = np.arange(15, 26)
+        taux = np.round(np.arange(1.0, 5.01, 0.1), 1)
+        mensualites = compute_monthly_payments(montant_emprunte, taux[np.newaxis, :], durees[:, np.newaxis])
+        return pd.DataFrame(mensualites.round(0), index=durees, columns=taux)
+    
     def create_sidebar(self):
         """Crée la sidebar avec les contrôles"""
         st.sidebar.markdown("## 🎛️ CONTRÔLES D'ANALYSE")
@@ -1122,7 +1667,7 @@ class ReunionHousingDashboard:
         # Filtres temporels
         st.sidebar.markdown("### 📅 Période d'analyse")
         date_debut = st.sidebar.date_input("Date de début", 
-                                         value=datetime.now() - timedelta(days=365*3))
+                                         value=self.historical_data['date'].min())
         date_fin = st.sidebar.date_input("Date de fin", 
                                        value=datetime.now())
         
@@ -1138,10 +1683,29 @@ class ReunionHousingDashboard:
         st.sidebar.markdown("### ⚙️ Options")
         show_technical = st.sidebar.checkbox("Afficher indicateurs techniques", value=True)
         auto_refresh = st.sidebar.checkbox("Rafraîchissement automatique", value=False)
+        point_budget = st.sidebar.number_input("Points max par série", 50, 5000, SERIES_POINT_BUDGET, step=50)
         
-        # Bouton de rafraîchissement manuel
+        # Bouton de rafraîchissement manuel : adopte la dernière version publiée,
+        # sinon demande une reconstruction en arrière-plan
         if st.sidebar.button("🔄 Rafraîchir les données"):
-            st.rerun()
+            if self.store is not None and self.store.version > self.snapshot.version:
+                st.session_state['snapshot'] = self.store.current()
+                st.rerun()
+            elif self.store is not None:
+                self.store.request_refresh()
+                st.sidebar.info("Rafraîchissement lancé en arrière-plan")
+        
+        if self.store is not None:
+            if auto_refresh:
+                with st.sidebar:
+                    self.poll_snapshot_version()
+            elif self.store.version > self.snapshot.version:
+                st.sidebar.info(f"Nouvelle version des données disponible (v{self.store.version})")
+        
+        # Emplacement du panneau d'instrumentation, rempli en fin d'exécution (caches à jour)
+        self.instrumentation_slot = st.sidebar.empty() if show_technical else None
+        # Panneau de profilage, réservé aux administrateurs
+        self.profiling_slot = st.sidebar.empty() if self.is_admin() else None
         
         # Informations marché
         st.sidebar.markdown("---")
@@ -1167,13 +1731,96 @@ class ReunionHousingDashboard:
             'date_fin': date_fin,
             'microregions_selectionnees': microregions_selectionnees,
             'show_technical': show_technical,
-            'auto_refresh': auto_refresh
+            'auto_refresh': auto_refresh,
+            'point_budget': point_budget
         }
 
+    def display_instrumentation(self):
+        """Affiche le panneau d'instrumentation (version et temps de chargement des données)"""
+        with st.expander("🔧 Instrumentation"):
+            st.markdown(f"**Version des données:** v{self.snapshot.version} ({self.snapshot.fingerprint})")
+            if self.snapshot.load_timings:
+                timings = pd.DataFrame({
+                    'étape': list(self.snapshot.load_timings),
+                    'durée (ms)': [round(d * 1000, 1) for d in self.snapshot.load_timings.values()]
+                })
+                st.dataframe(timings, hide_index=True)
+            registre = get_session_budget_registry()
+            cache_session = self.session_cache()
+            if cache_session is not None:
+                st.markdown(f"**Cache de la session:** {len(cache_session)} entrées, "
+                            f"{cache_session.bytes / 1024 ** 2:.1f}/{cache_session.max_bytes / 1024 ** 2:.0f} Mo "
+                            f"({cache_session.hits} succès, {cache_session.evictions} évictions)")
+            st.markdown(f"**Caches de toutes les sessions:** {len(registre.sessions())} sessions, "
+                        f"{registre.total_bytes() / 1024 ** 2:.1f}/{registre.total_budget / 1024 ** 2:.0f} Mo "
+                        f"({registre.total_evictions()} évictions)")
+            detail_cache = get_commune_detail_cache()
+            st.markdown(f"**Cache fiches communes:** {len(detail_cache)}/{detail_cache.max_size} "
+                        f"({detail_cache.hits} succès, {detail_cache.misses} échecs)")
+            st.markdown(f"**Plan des vues:** {len(view_specs.VIEWS)} graphiques, "
+                        f"{len(view_specs.DASHBOARD_PLAN.queries)} requêtes distinctes")
+            st.markdown(f"**Requêtes partagées:** {self.queries.executed} exécutées, "
+                        f"{self.queries.coalesced} regroupées, {self.queries.in_flight()} en cours")
+            if self.artifact_cache is not None:
+                st.markdown(f"**Cache disque des artefacts:** {len(self.artifact_cache)} entrées, "
+                            f"{self.artifact_cache.size() / 1024 ** 2:.1f} Mo "
+                            f"({self.artifact_cache.hits} succès, {self.artifact_cache.misses} échecs)")
+    
+    def is_admin(self):
+        """Session d'administration : ?admin=<LOGEMENTS_PROFILING_TOKEN> dans l'URL"""
+        if not PROFILING_TOKEN:
+            return False
+        # Comparaison en octets : compare_digest refuse les chaînes non ASCII (?admin=é)
+        return hmac.compare_digest(st.query_params.get('admin', '').encode(), PROFILING_TOKEN.encode())
+    
+    def run_section(self, section):
+        """Exécute une section, sous le profileur si un profilage a été demandé pour cette exécution"""
+        if self.profiler is None:
+            return section()
+        # cProfile ne suit que le thread du script : les requêtes de la section sont calculées sur place
+        requetes, self.queries = self.queries, data_layer.DataLayer(max_workers=0)
+        try:
+            return self.profiler.run(section.__name__, section)
+        finally:
+            self.queries = requetes
+    
+    def display_profiling(self):
+        """Panneau d'administration : profilage de la prochaine exécution et captures enregistrées"""
+        with st.expander("🩺 Profilage", expanded=self.last_capture is not None):
+            st.checkbox("Flamegraph (échantillonnage des piles)", value=False, key='profilage_flamegraph')
+            st.button("⏱️ Profiler la prochaine exécution", key='profilage_bouton', on_click=request_profiling)
+            
+            if self.last_capture is not None and self.last_capture['skipped']:
+                st.warning("Sections non profilées (profilage en cours dans une autre session) : "
+                           + ', '.join(self.last_capture['skipped']))
+            
+            for capture in profiling.list_captures(PROFILE_DIR)[:PROFILE_LIST_SIZE]:
+                durees = ', '.join(f"{nom.replace('create_', '')} {duree:.2f} s"
+                                   for nom, duree in capture['durations'].items())
+                st.markdown(f"**{capture['date']}** - {durees}")
+                for fichier in capture['files']:
+                    st.download_button(f"📥 {fichier}", key=f"profil_{capture['capture']}_{fichier}",
+                                       on_click='ignore', mime=profiling.CAPTURE_FILES[fichier],
+                                       file_name=f"profil-{capture['capture']}-{fichier}",
+                                       data=lambda capture=capture['capture'], fichier=fichier:
+                                       profiling.read_capture_file(PROFILE_DIR, capture, fichier))
+    
+    @st.fragment(run_every=VERSION_POLL_SECONDS)
+    def poll_snapshot_version(self):
+        """Interroge le compteur de version et recharge la page si un nouvel instantané est publié"""
+        if self.store.version > self.snapshot.version:
+            st.session_state['snapshot'] = self.store.current()
+            st.rerun()
+    
     def run_dashboard(self):
         """Exécute le dashboard complet"""
+        # Profilage de cette exécution, demandé par un administrateur
+        if PROFILING_TOKEN and 'profilage_demande' in st.session_state:
+            self.profiler = profiling.ProfileCapture(flamegraph=st.session_state.pop('profilage_demande'))
+        
         # Sidebar
         controls = self.create_sidebar()
+        self.controls = controls
         
         # Header
         self.display_header()
@@ -1192,16 +1839,16 @@ class ReunionHousingDashboard:
         ])
         
         with tab1:
-            self.create_market_overview()
+            self.run_section(self.create_market_overview)
         
         with tab2:
-            self.create_communes_analysis()
+            self.run_section(self.create_communes_analysis)
         
         with tab3:
-            self.create_microregion_analysis()
+            self.run_section(self.create_microregion_analysis)
         
         with tab4:
-            self.create_affordability_analysis()
+            self.run_section(self.create_affordability_analysis)
         
         with tab5:
             st.markdown("## 📊 TENDANCES ET PERSPECTIVES")
@@ -1290,8 +1937,87 @@ class ReunionHousingDashboard:
             - Site web: www.reunion.logement.gouv.fr
             - Email: observatoire.habitat@reunion.gouv.fr
             """)
+        
+        # Instrumentation affichée en dernier, une fois les caches sollicités par cette exécution
+        if self.instrumentation_slot is not None:
+            with self.instrumentation_slot.container():
+                self.display_instrumentation()
+        
+        if self.profiler is not None:
+            self.last_capture = self.profiler.save(PROFILE_DIR,
+                                                   f"Dashboard logements - données v{self.snapshot.version}")
+            self.profiler = None
+        if self.profiling_slot is not None:
+            with self.profiling_slot.container():
+                self.display_profiling()
+
+
+def request_profiling():
+    """Demande le profilage de l'exécution déclenchée par le bouton"""
+    st.session_state['profilage_demande'] = st.session_state.get('profilage_flamegraph', False)
+
+
+def restore_shared_snapshot(version, frames, fingerprint, timings):
+    """Instantané reconstruit à partir des tables projetées depuis la mémoire partagée"""
+    vide = DataSnapshot(version, [], None, None, None, fingerprint)
+    return ReunionHousingDashboard(snapshot=vide).restore_snapshot(version, frames, fingerprint, timings)
+
+
+@st.cache_resource
+def get_artifact_cache():
+    """Cache disque des artefacts partagé par toutes les sessions (et les redémarrages)"""
+    return ArtifactCache(ARTIFACT_CACHE_DIR)
+
+
+@st.cache_resource
+def get_data_layer():
+    """Pool de requêtes partagé par toutes les sessions et l'API (requêtes identiques regroupées)"""
+    return data_layer.DataLayer()
+
+
+@st.cache_resource
+def get_session_budget_registry():
+    """Registre des caches de session, soumis à un budget mémoire global"""
+    return SessionBudgetRegistry()
+
+
+@st.cache_resource
+def get_commune_detail_cache():
+    """Cache des fiches communes partagé par toutes les sessions"""
+    return CommuneDetailCache()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """Magasin d'instantanés unique pour tout le processus Streamlit"""
+    price_index_engine = PriceIndexEngine()
+    quantile_sketches = QuantileSketchCube()
+    artifact_cache = get_artifact_cache()
+    builder = lambda version: ReunionHousingDashboard(
+        version=version, price_index_engine=price_index_engine, quantile_sketches=quantile_sketches,
+        artifact_cache=artifact_cache).snapshot
+    # Plusieurs processus Streamlit : un seul construit, les autres projettent l'instantané publié
+    if SHARED_SNAPSHOT_DIR:
+        builder = shared_builder(
+            SharedSnapshotDirectory(SHARED_SNAPSHOT_DIR), builder, ReunionHousingDashboard.snapshot_frames,
+            restore_shared_snapshot, max_age=REFRESH_INTERVAL_SECONDS)
+    store = SnapshotStore(builder)
+    # Préchauffage des fiches les plus consultées au démarrage et à chaque nouvelle version
+    detail_cache = get_commune_detail_cache()
+    store.subscribe(lambda snapshot: ReunionHousingDashboard(
+        snapshot=snapshot, artifact_cache=artifact_cache).prewarm_commune_details(detail_cache))
+    # API locale servant le même instantané que le dashboard
+    if API_PORT:
+        api.start_in_background(store, compute_monthly_payments, port=int(API_PORT), queries=get_data_layer())
+    return store
+
 
 # Lancement du dashboard
 if __name__ == "__main__":
-    dashboard = ReunionHousingDashboard()
+    store = get_snapshot_store()
+    # Chaque session reste sur son instantané jusqu'à adoption explicite d'une nouvelle version
+    if 'snapshot' not in st.session_state:
+        st.session_state['snapshot'] = store.current()
+    dashboard = ReunionHousingDashboard(snapshot=st.session_state['snapshot'], store=store,
+                                        artifact_cache=get_artifact_cache(), queries=get_data_layer())
     dashboard.run_dashboard()
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""Analyses temporelles vectorisées sur l'historique des prix et des loyers.
+
+Toutes les communes sont traitées en une fois sur une matrice (date × commune) :
+aucune boucle Python par commune.
+"""
+import numpy as np
+import pandas as pd
+
+# Z-score robuste au-delà duquel une variation mensuelle est signalée comme anormale
+ANOMALY_THRESHOLD = 3.5
+# Historique minimal (en mois) pour retirer une composante saisonnière
+SEASONAL_MIN_MONTHS = 36
+
+
+def pivot_history(historical_data, value):
+    """Matrice (date × commune) d'une colonne de l'historique"""
+    return historical_data.pivot_table(index='date', columns='commune', values=value, aggfunc='mean').sort_index()
+
+
+def rebase(matrix, base_year):
+    """Séries en base 100 sur la moyenne de l'année de référence, colonne par colonne"""
+    reference = matrix[matrix.index.year == base_year].mean()
+    return matrix / reference.replace(0, np.nan) * 100
+
+
+def compute_trend_metrics(matrix):
+    """Calcule les séries dérivées (glissement annuel, moyennes mobiles, volatilité, drawdown)"""
+    rendements = np.log(matrix).diff()
+    return {
+        'valeur': matrix,
+        'glissement_annuel': matrix.pct_change(12, fill_method=None) * 100,
+        'moyenne_3m': matrix.rolling(3, min_periods=1).mean(),
+        'moyenne_12m': matrix.rolling(12, min_periods=1).mean(),
+        # Volatilité annualisée des rendements mensuels sur 12 mois glissants
+        'volatilite_12m': rendements.rolling(12).std() * np.sqrt(12) * 100,
+        'drawdown': (matrix / matrix.cummax() - 1) * 100,
+    }
+
+
+def compute_cagr(matrix):
+    """Taux de croissance annuel composé de chaque commune sur tout l'historique (%)"""
+    premiers = matrix.bfill().iloc[0]
+    derniers = matrix.ffill().iloc[-1]
+    annees = (matrix.index[-1] - matrix.index[0]).days / 365.25
+    if annees <= 0:
+        return pd.Series(np.nan, index=matrix.columns)
+    return ((derniers / premiers) ** (1 / annees) - 1) * 100
+
+
+def summarize_trends(metrics):
+    """Dernière valeur de chaque indicateur par commune, plus le CAGR et le drawdown maximal"""
+    resume = pd.DataFrame({nom: serie.ffill().iloc[-1] for nom, serie in metrics.items()})
+    resume['cagr'] = compute_cagr(metrics['valeur'])
+    resume['drawdown_max'] = metrics['drawdown'].min()
+    resume.index.name = 'commune'
+    return resume
+
+
+def robust_zscores(matrix):
+    """Z-scores robustes (médiane et MAD) de chaque colonne"""
+    mediane = matrix.median()
+    mad = (matrix - mediane).abs().median() * 1.4826
+    return (matrix - mediane) / mad.replace(0, np.nan)
+
+
+def detect_anomalies(matrix, threshold=ANOMALY_THRESHOLD):
+    """Variations mensuelles anormales de chaque commune : z-scores robustes et signalements"""
+    rendements = np.log(matrix.where(matrix > 0)).diff()
+    # Composante saisonnière commune à l'île : médiane, pour chaque mois calendaire, de la variation
+    # médiane des communes (estimée sur toutes les séries, elle ne surajuste aucune commune)
+    if len(rendements) >= SEASONAL_MIN_MONTHS:
+        profil = rendements.median(axis=1)
+        rendements = rendements.sub(profil.groupby(profil.index.month).transform('median'), axis=0)
+    zscores = robust_zscores(rendements)
+    return {'zscore': zscores, 'anomalie': zscores.abs() > threshold}
+
+
+def flag_invalid_rows(historical_data, values=('prix_m2', 'loyer_m2')):
+    """Lignes de l'historique dont une valeur est manquante ou non positive"""
+    invalides = pd.Series(False, index=historical_data.index)
+    for value in values:
+        invalides |= ~(historical_data[value] > 0)
+    return invalides
+
+
+def compute_analytics(historical_data, values=('prix_m2', 'loyer_m2')):
+    """Analyses complètes de l'historique : séries dérivées, résumé et anomalies par commune, par indicateur"""
+    analyses = {}
+    for value in values:
+        matrix = pivot_history(historical_data, value)
+        metrics = compute_trend_metrics(matrix)
+        analyses[value] = {'series': metrics, 'resume': summarize_trends(metrics),
+                           'anomalies': detect_anomalies(matrix)}
+    return analyses
+
+
+def anomaly_flags(historical_data, analyses):
+    """Colonnes de signalement à joindre à l'historique (une par indicateur, plus les lignes invalides)"""
+    cles = pd.MultiIndex.from_frame(historical_data[['date', 'commune']].astype({'commune': object}))
+    drapeaux = {f"anomalie_{value}": (resultats['anomalies']['anomalie'].stack()
+                                      .reindex(cles, fill_value=False).values)
+                for value, resultats in analyses.items()}
+    drapeaux['ligne_invalide'] = flag_invalid_rows(historical_data, list(analyses)).values
+    return pd.DataFrame(drapeaux, index=historical_data.index)
+
+
+def year_over_year(serie):
+    """Variation (%) de la dernière valeur d'une série mensuelle par rapport à 12 mois plus tôt"""
+    serie = serie.dropna()
+    if len(serie) < 13 or serie.iloc[-13] == 0:
+        return None
+    return float((serie.iloc[-1] / serie.iloc[-13] - 1) * 100)
+
+
+def compute_key_metrics(historical_data, current_data):
+    """Indicateurs clés de l'île et leur variation sur 12 mois, calculés une fois par version"""
+    agregats = {'prix_m2': ('prix_m2', 'mean'), 'loyer_m2': ('loyer_m2', 'mean'),
+                'permis_construire': ('permis_construire', 'sum')}
+    # Une ligne par mois pour toute l'île
+    mensuel = historical_data.groupby('date').agg(**agregats).sort_index()
+
+    def variation(colonne):
+        return year_over_year(mensuel[colonne])
+
+    return {
+        'prix_m2': {'valeur': float(current_data['prix_m2_moyen'].mean()), 'variation': variation('prix_m2')},
+        'loyer_m2': {'valeur': float(current_data['loyers_moyens_m2'].mean()), 'variation': variation('loyer_m2')},
+        # La population n'a pas d'historique (une valeur par commune) : pas de variation
+        'population': {'valeur': int(current_data['population'].sum()), 'variation': None},
+        'permis_construire': {'valeur': int(current_data['permis_construire_2024'].sum()),
+                              'variation': variation('permis_construire')},
+        'date': mensuel.index[-1] if len(mensuel) else None,
+    }
@@ -0,0 +1,221 @@
+"""API HTTP locale exposant les agrégats du dashboard.
+
+Service asynchrone (Starlette) servant les mêmes données que le dashboard, lues
+dans l'instantané publié par le ``SnapshotStore`` : communes, agrégats par
+micro-région, séries temporelles et calcul d'accessibilité. Les réponses
+portent un ETag dérivé de l'empreinte des données (réponse 304 si inchangé)
+et sont disponibles en JSON, en CSV (``?format=csv``) ou en flux Arrow IPC
+(``?format=arrow`` ou ``Accept: application/vnd.apache.arrow.stream``).
+
+Utilisation autonome :
+
+    python api.py --port 8502
+
+Dans le processus Streamlit, définir ``LOGEMENTS_API_PORT`` démarre l'API sur
+le même instantané que le dashboard.
+"""
+import argparse
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import exports
+from data_layer import DataLayer
+
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+# Formats des réponses des points d'accès (?format=)
+FRAME_FORMATS = {'json': 'application/json', 'arrow': ARROW_MEDIA_TYPE, 'csv': 'text/csv; charset=utf-8'}
+# Nombre de réponses encodées conservées (par version des données)
+RESPONSE_CACHE_SIZE = 256
+# Durée pendant laquelle un client peut réutiliser une réponse sans revalidation
+CACHE_MAX_AGE_SECONDS = 60
+
+
+def encode_frame(df, fmt):
+    """Encode un DataFrame en JSON (liste d'enregistrements), en flux Arrow IPC ou en CSV"""
+    if fmt == 'arrow':
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), FRAME_FORMATS['arrow']
+    if fmt == 'csv':
+        return df.to_csv(index=False, date_format='%Y-%m-%d').encode('utf-8'), FRAME_FORMATS['csv']
+    return df.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8'), FRAME_FORMATS['json']
+
+
+class DashboardAPI:
+    """Points d'accès de l'API, adossés au magasin d'instantanés du dashboard"""
+
+    def __init__(self, store, compute_monthly_payments, queries=None):
+        self.store = store
+        self.compute_monthly_payments = compute_monthly_payments
+        self.queries = queries or DataLayer()
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def routes(self):
+        return [
+            Route('/version', self.version),
+            Route('/communes', self.communes),
+            Route('/micro-regions', self.micro_regions),
+            Route('/series', self.series),
+            Route('/accessibilite', self.accessibilite),
+            Route('/export/{table}', self.export),
+        ]
+
+    async def version(self, request):
+        snapshot = self.store.current()
+        return JSONResponse({'version': snapshot.version, 'empreinte': snapshot.fingerprint,
+                             'cree_le': snapshot.created_at.isoformat(timespec='seconds')})
+
+    async def communes(self, request):
+        return await self._frame_response(request, lambda snapshot, params: snapshot.current_data)
+
+    async def micro_regions(self, request):
+        return await self._frame_response(request, lambda snapshot, params: snapshot.microregion_data)
+
+    async def series(self, request):
+        return await self._frame_response(request, self._series_frame)
+
+    async def accessibilite(self, request):
+        return await self._frame_response(request, self._affordability_frame)
+
+    async def export(self, request):
+        """Export en flux (CSV, Parquet, Excel) : communes filtrées, historique ou grille du simulateur"""
+        snapshot = self.store.current()
+        params = dict(request.query_params)
+        fmt = params.get('format', 'csv')
+        table = request.path_params['table']
+        if fmt not in exports.available_formats():
+            return JSONResponse({'erreur': f"Format d'export inconnu : {fmt}"}, status_code=400)
+        try:
+            if table == 'communes':
+                communes = exports.filter_communes(snapshot.current_data, params.get('micro_region', 'Toutes'),
+                                                   params.get('taille', 'Toutes'), params.get('tri', 'Prix m²'))
+                morceaux = exports.iter_chunks(communes)
+                schema = exports.frame_schema(communes)
+            elif table == 'historique':
+                communes = params['communes'].split(',') if params.get('communes') else None
+                # Dates lues avant l'envoi de la réponse : une erreur dans le flux arriverait après le statut 200
+                debut, fin = (pd.Timestamp(params[cle]) if params.get(cle) else None for cle in ('debut', 'fin'))
+                morceaux = exports.history_chunks(snapshot.historical_data, communes, debut, fin)
+                schema = exports.frame_schema(snapshot.historical_data)
+            elif table == 'grille':
+                morceaux = exports.simulator_grid_chunks(float(params.get('montant', 200000)),
+                                                         self.compute_monthly_payments)
+                schema = None
+            else:
+                return JSONResponse({'erreur': f"Table inconnue : {table}"}, status_code=404)
+        except ValueError as exc:
+            return JSONResponse({'erreur': str(exc)}, status_code=400)
+        # Générateur synchrone : Starlette l'itère dans un thread, sans bloquer les autres requêtes
+        nom = exports.export_filename(f"{table}-{snapshot.fingerprint}", fmt)
+        return StreamingResponse(exports.stream_export(morceaux, fmt, schema), media_type=exports.FORMATS[fmt][0],
+                                 headers={'Content-Disposition': f'attachment; filename="{nom}"'})
+
+    def _series_frame(self, snapshot, params):
+        """Série mensuelle d'un indicateur, par commune ou moyenne par micro-région"""
+        indicateur = params.get('indicateur', 'prix_m2')
+        if indicateur not in ('prix_m2', 'loyer_m2', 'permis_construire'):
+            raise ValueError(f"Indicateur inconnu : {indicateur}")
+        historique = snapshot.historical_data
+        if 'commune' in params:
+            historique = historique[historique['commune'] == params['commune']]
+            return historique[['date', 'commune', indicateur]].reset_index(drop=True)
+        if 'micro_region' in params:
+            historique = historique[historique['micro_region'] == params['micro_region']]
+        return historique.groupby(['date', 'micro_region'], observed=True)[indicateur].mean().reset_index()
+
+    def _affordability_frame(self, snapshot, params):
+        """Prix, emprunt et mensualité pour une surface, un apport, une durée et un taux"""
+        surface = float(params.get('surface', 70))
+        apport = float(params.get('apport', 20000))
+        duree = np.asarray(float(params.get('duree', 20)))
+        taux = np.asarray(float(params.get('taux', 3.0)))
+        communes = snapshot.current_data
+        if 'commune' in params:
+            communes = communes[communes['nom'] == params['commune']]
+        prix_total = communes['prix_m2_moyen'].values * surface
+        montant_emprunte = prix_total - apport
+        mensualite = self.compute_monthly_payments(montant_emprunte, taux, duree)
+        return pd.DataFrame({
+            'nom': communes['nom'].values,
+            'prix_total': prix_total,
+            'montant_emprunte': montant_emprunte,
+            'mensualite': mensualite,
+            'taux_endettement': mensualite / 2000 * 100,
+        })
+
+    async def _frame_response(self, request, build):
+        snapshot = self.store.current()
+        params = dict(request.query_params)
+        fmt = params.pop('format', None)
+        if fmt is None:
+            fmt = 'arrow' if ARROW_MEDIA_TYPE in request.headers.get('accept', '') else 'json'
+        if fmt not in FRAME_FORMATS:
+            return JSONResponse({'erreur': f"Format inconnu : {fmt} ({', '.join(FRAME_FORMATS)})"}, status_code=400)
+
+        # L'ETag dépend de la version des données et de la requête complète
+        cle = (snapshot.fingerprint, request.url.path, tuple(sorted(params.items())), fmt)
+        etag = '"' + hashlib.sha1(repr(cle).encode('utf-8')).hexdigest()[:20] + '"'
+        en_tetes = {'ETag': etag, 'Cache-Control': f'public, max-age={CACHE_MAX_AGE_SECONDS}'}
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=en_tetes)
+
+        with self._lock:
+            reponse = self._responses.get(cle)
+            if reponse is not None:
+                self._responses.move_to_end(cle)
+        if reponse is None:
+            try:
+                # Requêtes identiques simultanées : un seul calcul, hors de la boucle d'événements
+                reponse = await self.queries.query(('api',) + cle, lambda: encode_frame(build(snapshot, params), fmt))
+            except (KeyError, ValueError) as exc:
+                return JSONResponse({'erreur': str(exc)}, status_code=400)
+            with self._lock:
+                self._responses[cle] = reponse
+                while len(self._responses) > RESPONSE_CACHE_SIZE:
+                    self._responses.popitem(last=False)
+
+        contenu, media_type = reponse
+        return Response(contenu, media_type=media_type, headers=en_tetes)
+
+
+def create_app(store, compute_monthly_payments, queries=None):
+    """Application ASGI servant l'instantané publié par store"""
+    return Starlette(routes=DashboardAPI(store, compute_monthly_payments, queries).routes())
+
+
+def start_in_background(store, compute_monthly_payments, host='127.0.0.1', port=8502, queries=None):
+    """Démarre l'API dans un thread du processus courant (partage de l'instantané et des requêtes)"""
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(create_app(store, compute_monthly_payments, queries),
+                                           host=host, port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, name='dashboard-api', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API locale du dashboard logements")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    import Dashboard
+    store = Dashboard.get_snapshot_store()
+    uvicorn.run(create_app(store, Dashboard.compute_monthly_payments), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
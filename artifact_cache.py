@@ -0,0 +1,114 @@
+"""Cache disque des artefacts calculés, adressé par contenu.
+
+Chaque artefact (agrégats, tendances, fiches communes en JSON Plotly, carte
+Folium en HTML) est rangé sous une clé dérivée de l'empreinte des données
+d'entrée, des paramètres du calcul et du code source de la fonction qui le
+produit : une modification des données ou du code invalide naturellement les
+entrées concernées. Le cache survit aux redémarrages et peut être partagé par
+plusieurs réplicas ; il est borné en taille (éviction des entrées les moins
+récemment lues).
+"""
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale du cache sur disque
+MAX_BYTES = 512 * 1024 ** 2
+# À incrémenter si le format des entrées change
+CACHE_FORMAT = 1
+
+
+def code_version(func):
+    """Empreinte du code source d'une fonction (ou méthode)"""
+    func = getattr(func, '__func__', func)
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = f"{func.__module__}.{func.__qualname__}"
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+
+class ArtifactCache:
+    """Artefacts sérialisés sur disque, indexés par empreinte des données, paramètres et code"""
+
+    def __init__(self, directory, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, name, fingerprint, params, code):
+        """Clé d'un artefact : nom, données d'entrée, paramètres et version du code (une ou plusieurs sources)"""
+        if isinstance(code, tuple):
+            cle_code = tuple(c if isinstance(c, str) else self._code_version(c) for c in code)
+        else:
+            cle_code = code if isinstance(code, str) else self._code_version(code)
+        contenu = repr((CACHE_FORMAT, name, fingerprint, params, cle_code))
+        return f"{name}-{hashlib.sha1(contenu.encode('utf-8')).hexdigest()}"
+
+    def get_or_compute(self, name, fingerprint, params, compute, code=None):
+        """Relit l'artefact sur disque, ou le calcule avec compute() et l'enregistre"""
+        chemin = os.path.join(self.directory, self.key(name, fingerprint, params, code or compute) + '.pkl')
+        try:
+            with open(chemin, 'rb') as f:
+                artefact = pickle.load(f)
+            # La date de modification sert d'horodatage d'accès pour l'éviction
+            os.utime(chemin)
+            self.hits += 1
+            return artefact
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.warning("Entrée illisible dans le cache des artefacts : %s", chemin)
+        self.misses += 1
+        artefact = compute()
+        self._write(chemin, artefact)
+        return artefact
+
+    def size(self):
+        """Taille totale des entrées sur disque (octets)"""
+        return sum(entree.stat().st_size for entree in self._entries())
+
+    def __len__(self):
+        return sum(1 for _ in self._entries())
+
+    def _code_version(self, code):
+        cle = getattr(code, '__func__', code)
+        if cle not in self._versions:
+            self._versions[cle] = code_version(code)
+        return self._versions[cle]
+
+    def _entries(self):
+        return (e for e in os.scandir(self.directory) if e.is_file() and e.name.endswith('.pkl'))
+
+    def _write(self, chemin, artefact):
+        temporaire = f"{chemin}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporaire, 'wb') as f:
+                pickle.dump(artefact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporaire, chemin)
+        except OSError:
+            logger.warning("Écriture impossible dans le cache des artefacts : %s", chemin)
+            return
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """Supprime les entrées les moins récemment lues au-delà de la taille maximale"""
+        entrees = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries()), reverse=True)
+        total = 0
+        for _, taille, chemin in entrees:
+            total += taille
+            if total > self.max_bytes:
+                try:
+                    os.remove(chemin)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,214 @@
+"""Contours des communes simplifiés à plusieurs niveaux de détail.
+
+Les contours complets (``communes.geojson`` dans le répertoire des données,
+propriété ``nom``) sont simplifiés par l'algorithme de Douglas-Peucker à
+plusieurs tolérances ; la carte choroplèthe n'envoie au navigateur que le
+niveau adapté au zoom courant. Les niveaux peuvent être précalculés :
+
+    python boundaries.py data/communes.geojson --output data/boundaries
+
+Sans fichier de contours, des cellules de Voronoï autour des centres des
+communes, découpées par un contour approximatif de l'île, en tiennent lieu.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from scipy.spatial import Voronoi
+
+# Tolérance de simplification (degrés) par niveau de détail ; 0 = géométrie complète
+LEVEL_TOLERANCES = {0: 0.01, 1: 0.003, 2: 0.0008, 3: 0.0}
+# Zoom Leaflet maximal servi par chaque niveau (au-delà : niveau complet)
+LEVEL_MAX_ZOOM = {0: 9, 1: 11, 2: 13}
+# Propriétés reconnues comme nom de commune dans les fichiers sources
+NAME_PROPERTIES = ['nom', 'NOM', 'nom_com', 'NOM_COM', 'libelle', 'LIBELLE', 'name']
+# Contour approximatif de l'île (ellipse) pour découper les cellules de Voronoï
+ISLAND_CENTER = (55.535, -21.13)
+ISLAND_HALF_AXES = (0.38, 0.30)
+
+
+def level_for_zoom(zoom):
+    """Niveau de détail le plus léger adapté à un zoom Leaflet"""
+    for niveau, zoom_max in sorted(LEVEL_MAX_ZOOM.items()):
+        if zoom <= zoom_max:
+            return niveau
+    return max(LEVEL_TOLERANCES)
+
+
+def simplify_ring(coords, tolerance):
+    """Simplifie un anneau fermé (Douglas-Peucker itératif), au moins 4 points conservés"""
+    points = np.asarray(coords, dtype=float)
+    if tolerance <= 0 or len(points) <= 4:
+        return points
+    garder = np.zeros(len(points), dtype=bool)
+    garder[0] = garder[-1] = True
+    # Un anneau fermé est coupé au point le plus éloigné du premier
+    milieu = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+    garder[milieu] = True
+    pile = [(0, milieu), (milieu, len(points) - 1)]
+    while pile:
+        debut, fin = pile.pop()
+        if fin - debut < 2:
+            continue
+        a, b = points[debut], points[fin]
+        segment = b - a
+        longueur = np.hypot(*segment)
+        interieurs = points[debut + 1:fin]
+        if longueur == 0:
+            distances = np.hypot(*(interieurs - a).T)
+        else:
+            distances = np.abs(segment[0] * (interieurs[:, 1] - a[1])
+                               - segment[1] * (interieurs[:, 0] - a[0])) / longueur
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            garder[debut + 1 + i] = True
+            pile += [(debut, debut + 1 + i), (debut + 1 + i, fin)]
+    simplifie = points[garder]
+    return simplifie if len(simplifie) >= 4 else points
+
+
+def simplify_geometry(geometry, tolerance, decimals):
+    """Simplifie un Polygon ou MultiPolygon GeoJSON et arrondit ses coordonnées"""
+    def anneau(coords):
+        return np.round(simplify_ring(coords, tolerance), decimals).tolist()
+
+    if geometry['type'] == 'Polygon':
+        return {'type': 'Polygon', 'coordinates': [anneau(r) for r in geometry['coordinates']]}
+    if geometry['type'] == 'MultiPolygon':
+        return {'type': 'MultiPolygon',
+                'coordinates': [[anneau(r) for r in polygone] for polygone in geometry['coordinates']]}
+    return geometry
+
+
+def simplify_collection(collection, tolerance):
+    """Collection GeoJSON simplifiée à une tolérance (précision des coordonnées assortie)"""
+    decimals = 6 if tolerance <= 0 else max(3, int(np.ceil(-np.log10(tolerance))) + 1)
+    return {
+        'type': 'FeatureCollection',
+        'features': [{'type': 'Feature', 'properties': dict(feature['properties']),
+                      'geometry': simplify_geometry(feature['geometry'], tolerance, decimals)}
+                     for feature in collection['features']],
+    }
+
+
+def build_levels(collection, tolerances=LEVEL_TOLERANCES):
+    """Collections simplifiées de tous les niveaux de détail"""
+    return {niveau: simplify_collection(collection, tolerance) for niveau, tolerance in tolerances.items()}
+
+
+def normalize_names(collection):
+    """Recopie le nom de commune du fichier source dans la propriété 'nom'"""
+    for feature in collection['features']:
+        proprietes = feature.setdefault('properties', {})
+        for cle in NAME_PROPERTIES:
+            if cle in proprietes:
+                proprietes['nom'] = proprietes[cle]
+                break
+    return collection
+
+
+def load_boundaries(data_dir):
+    """Contours complets des communes (communes.geojson), None si le fichier n'est pas fourni"""
+    chemin = os.path.join(data_dir, 'communes.geojson')
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding='utf-8') as f:
+        return normalize_names(json.load(f))
+
+
+def source_version(data_dir):
+    """Version des contours complets (date de modification et taille), None si le fichier n'est pas fourni"""
+    chemin = os.path.join(data_dir, 'communes.geojson')
+    if not os.path.exists(chemin):
+        return None
+    etat = os.stat(chemin)
+    return etat.st_mtime_ns, etat.st_size
+
+
+def load_level(data_dir, level):
+    """Niveau de détail précalculé (boundaries/lod<niveau>.geojson), None s'il est absent"""
+    chemin = os.path.join(data_dir, 'boundaries', f"lod{level}.geojson")
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _clip(polygone, contour):
+    """Découpe un polygone convexe par un contour convexe (Sutherland-Hodgman)"""
+    resultat = list(polygone)
+    for i in range(len(contour)):
+        a, b = contour[i], contour[(i + 1) % len(contour)]
+        entree, resultat = resultat, []
+        if not entree:
+            break
+
+        def dedans(p):
+            return (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) >= 0
+
+        def intersection(p, q):
+            d1 = (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])
+            d2 = (b[0] - a[0]) * (q[1] - a[1]) - (b[1] - a[1]) * (q[0] - a[0])
+            t = d1 / (d1 - d2)
+            return (p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1]))
+
+        for j in range(len(entree)):
+            p, q = entree[j - 1], entree[j]
+            if dedans(q):
+                if not dedans(p):
+                    resultat.append(intersection(p, q))
+                resultat.append(q)
+            elif dedans(p):
+                resultat.append(intersection(p, q))
+    return resultat
+
+
+def voronoi_boundaries(current_data, n_outline=512):
+    """Contours approximatifs : cellules de Voronoï des centres des communes, découpées par l'île"""
+    # Longitudes mises à l'échelle des latitudes pour des distances quasi isotropes
+    echelle = np.cos(np.radians(ISLAND_CENTER[1]))
+    points = np.column_stack([current_data['lon'].values * echelle, current_data['lat'].values])
+    # Points lointains : toutes les cellules des communes deviennent bornées
+    lointains = np.array([[-1, -1], [-1, 1], [1, -1], [1, 1]]) * 10 + points.mean(axis=0)
+    diagramme = Voronoi(np.vstack([points, lointains]))
+
+    angles = np.linspace(0, 2 * np.pi, n_outline, endpoint=False)
+    contour = [((ISLAND_CENTER[0] + ISLAND_HALF_AXES[0] * np.cos(t)) * echelle,
+                ISLAND_CENTER[1] + ISLAND_HALF_AXES[1] * np.sin(t)) for t in angles]
+
+    features = []
+    for i, nom in enumerate(current_data['nom']):
+        region = diagramme.regions[diagramme.point_region[i]]
+        cellule = [tuple(diagramme.vertices[v]) for v in region]
+        # Sommets dans le sens trigonométrique, comme le contour
+        centre = np.mean(cellule, axis=0)
+        cellule.sort(key=lambda p: np.arctan2(p[1] - centre[1], p[0] - centre[0]))
+        decoupee = _clip(cellule, contour)
+        if len(decoupee) < 3:
+            continue
+        anneau = [[x / echelle, y] for x, y in decoupee]
+        features.append({'type': 'Feature', 'properties': {'nom': nom},
+                         'geometry': {'type': 'Polygon', 'coordinates': [anneau + [anneau[0]]]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précalcul des contours simplifiés des communes")
+    parser.add_argument('contours', help="Fichier GeoJSON des contours complets")
+    parser.add_argument('--output', default='data/boundaries', help="Répertoire des niveaux de détail")
+    args = parser.parse_args()
+
+    with open(args.contours, encoding='utf-8') as f:
+        collection = normalize_names(json.load(f))
+    os.makedirs(args.output, exist_ok=True)
+    for niveau, simplifiee in build_levels(collection).items():
+        chemin = os.path.join(args.output, f"lod{niveau}.geojson")
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(simplifiee, f, separators=(',', ':'))
+        print(f"✅ niveau {niveau} (tolérance {LEVEL_TOLERANCES[niveau]}°): "
+              f"{os.path.getsize(chemin) / 1024:.0f} Ko -> {chemin}")
+
+
+if __name__ == "__main__":
+    main()
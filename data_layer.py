@@ -0,0 +1,121 @@
+"""Accès aux données non bloquant, avec regroupement des requêtes identiques.
+
+Les requêtes (historique filtré, agrégats par micro-région, fiches communes,
+réponses de l'API) sont exécutées dans un pool de threads commun à toutes les
+sessions. Une requête identique à une requête encore en cours (même clé :
+empreinte des données et paramètres) ne relance pas le calcul et reçoit le même
+résultat à venir. Si toutes les sessions ouvrent la micro-région Nord en même
+temps, l'agrégat n'est calculé qu'une fois.
+
+Chaque requête existe sous deux formes. La première renvoie un Future : le
+script Streamlit lance ses requêtes tôt et n'attend leurs résultats qu'au
+moment de les afficher. La seconde est une coroutine (``await``), utilisée par
+l'API asynchrone. Sans pool (``max_workers=0``), les requêtes sont calculées
+sur place. Les résultats ne sont pas conservés une fois la requête
+terminée, ce rôle revenant aux caches existants (session, fiches, artefacts).
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pandas as pd
+
+# Nombre de requêtes exécutées simultanément
+QUERY_MAX_WORKERS = 4
+
+
+def filter_history(historical_data, debut=None, fin=None):
+    """Historique restreint à une période (bornes None : tout l'historique)"""
+    masque = pd.Series(True, index=historical_data.index)
+    if debut is not None:
+        masque &= historical_data['date'] >= pd.Timestamp(debut)
+    if fin is not None:
+        masque &= historical_data['date'] <= pd.Timestamp(fin)
+    return historical_data[masque]
+
+
+def microregion_evolution(historical_data, micro_region):
+    """Prix moyen au m² mensuel d'une micro-région"""
+    historique = historical_data[historical_data['micro_region'] == micro_region]
+    return historique.groupby('date')['prix_m2'].mean().reset_index()
+
+
+def completed(compute):
+    """Future déjà résolu avec le résultat (ou l'exception) de compute()"""
+    future = Future()
+    try:
+        future.set_result(compute())
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+class DataLayer:
+    """Requêtes sur les instantanés, exécutées dans un pool et regroupées tant qu'elles sont en cours"""
+
+    def __init__(self, max_workers=QUERY_MAX_WORKERS):
+        self._executor = (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='requetes')
+                          if max_workers else None)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.executed = 0
+        self.coalesced = 0
+
+    def submit(self, key, compute):
+        """Future du résultat de compute(), partagé avec une requête de même clé encore en cours"""
+        if self._executor is None or getattr(self._local, 'worker', False):
+            # Sans pool, ou requête lancée depuis une autre requête (attendre le pool pourrait l'épuiser) : sur place
+            return completed(compute)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._executor.submit(self._run, compute)
+            self._inflight[key] = future
+            self.executed += 1
+        future.add_done_callback(lambda termine: self._forget(key, termine))
+        return future
+
+    async def query(self, key, compute):
+        """Résultat de compute() attendu sans bloquer la boucle d'événements"""
+        return await asyncio.wrap_future(self.submit(key, compute))
+
+    def in_flight(self):
+        """Nombre de requêtes en cours"""
+        with self._lock:
+            return len(self._inflight)
+
+    def history(self, snapshot, debut=None, fin=None):
+        """Historique d'un instantané restreint à une période (Future)"""
+        return self.submit(('historique', snapshot.fingerprint, debut, fin),
+                           lambda: filter_history(snapshot.historical_data, debut, fin))
+
+    async def history_async(self, snapshot, debut=None, fin=None):
+        return await asyncio.wrap_future(self.history(snapshot, debut, fin))
+
+    def microregion_evolution(self, snapshot, micro_region, debut=None, fin=None):
+        """Prix moyen mensuel d'une micro-région sur une période (Future)"""
+        return self.submit(('evolution_microregion', snapshot.fingerprint, micro_region, debut, fin),
+                           lambda: microregion_evolution(filter_history(snapshot.historical_data, debut, fin),
+                                                         micro_region))
+
+    async def microregion_evolution_async(self, snapshot, micro_region, debut=None, fin=None):
+        return await asyncio.wrap_future(self.microregion_evolution(snapshot, micro_region, debut, fin))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, compute):
+        self._local.worker = True
+        try:
+            return compute()
+        finally:
+            self._local.worker = False
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
@@ -0,0 +1,262 @@
+"""Export statique du dashboard.
+
+Exécute les sections ``create_*`` du dashboard pour une version des données et
+un préréglage de filtres, puis écrit un bundle statique (HTML pré-rendu, JSON
+Plotly et carte Folium) servable par n'importe quel serveur de fichiers ou CDN.
+
+Utilisation :
+
+    python export_static.py --output build/static --seed 42 --preset defaut --preset nord
+"""
+import argparse
+import contextlib
+import html
+import json
+import os
+import types
+from datetime import datetime
+
+import numpy as np
+
+import Dashboard
+
+
+# Sections exportées : (identifiant, titre, méthode du dashboard)
+SECTIONS = [
+    ('indicateurs', 'Indicateurs clés', 'display_key_metrics'),
+    ('vue_ensemble', "Vue d'ensemble", 'create_market_overview'),
+    ('communes', 'Communes', 'create_communes_analysis'),
+    ('micro_regions', 'Micro-régions', 'create_microregion_analysis'),
+    ('accessibilite', 'Accessibilité', 'create_affordability_analysis'),
+]
+
+# Préréglages de filtres : libellé du widget -> valeur imposée
+PRESETS = {
+    'defaut': {},
+    'nord': {
+        "Micro-région:": 'Nord',
+        "Sélectionnez une micro-région:": 'Nord',
+        "Sélectionnez une commune:": 'Saint-Denis',
+        "Commune:": 'Saint-Denis',
+    },
+    'sud': {
+        "Micro-région:": 'Sud',
+        "Sélectionnez une micro-région:": 'Sud',
+        "Sélectionnez une commune:": 'Saint-Pierre',
+        "Commune:": 'Saint-Pierre',
+    },
+    'ouest': {
+        "Micro-région:": 'Ouest',
+        "Sélectionnez une micro-région:": 'Ouest',
+        "Sélectionnez une commune:": 'Saint-Paul',
+        "Commune:": 'Saint-Paul',
+    },
+    'est': {
+        "Micro-région:": 'Est',
+        "Sélectionnez une micro-région:": 'Est',
+        "Sélectionnez une commune:": 'Saint-André',
+        "Commune:": 'Saint-André',
+    },
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem; color: #264653; }}
+.metric {{ display: inline-block; min-width: 12rem; margin: 0.5rem; padding: 1rem;
+           border-radius: 10px; border-left: 4px solid #FF6B35; background: #f0f2f6; }}
+.metric .delta {{ font-size: 0.9rem; color: #2A9D8F; }}
+nav a {{ margin-right: 1rem; }}
+</style>
+</head>
+<body>
+<nav>{nav}</nav>
+{body}
+</body>
+</html>
+"""
+
+
+class StaticRecorder:
+    """Remplace ``st`` pendant l'export et enregistre le rendu en HTML statique"""
+
+    def __init__(self, section, output_dir, preset):
+        self.section = section
+        self.output_dir = output_dir
+        self.preset = preset
+        self.blocks = []
+        self.figures = []
+        self.maps = []
+        self.sidebar = self
+        self.session_state = {}
+
+    # Mise en page : les conteneurs deviennent de simples contextes
+    def tabs(self, labels):
+        return [self._titled(label) for label in labels]
+
+    def columns(self, spec, **kwargs):
+        nombre = spec if isinstance(spec, int) else len(spec)
+        return [contextlib.nullcontext() for _ in range(nombre)]
+
+    def expander(self, label, **kwargs):
+        return self._titled(label)
+
+    @contextlib.contextmanager
+    def _titled(self, label):
+        self.blocks.append(f"<h2>{html.escape(str(label))}</h2>")
+        yield self
+
+    # Widgets : valeur du préréglage, sinon valeur par défaut du widget
+    def selectbox(self, label, options, index=0, **kwargs):
+        options = list(options)
+        return self.preset.get(label, options[index] if options else None)
+
+    def radio(self, label, options, index=0, **kwargs):
+        return self.selectbox(label, options, index)
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return self.preset.get(label, list(default or []))
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self.preset.get(label, value if value is not None else min_value)
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self.preset.get(label, value if value is not None else min_value)
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self.preset.get(label, value)
+
+    def date_input(self, label, value=None, **kwargs):
+        return self.preset.get(label, value)
+
+    def button(self, label, **kwargs):
+        return False
+
+    # Sorties
+    def markdown(self, body, unsafe_allow_html=False, **kwargs):
+        if unsafe_allow_html:
+            self.blocks.append(body)
+        else:
+            self.blocks.append(f"<div>{html.escape(body)}</div>")
+
+    def write(self, *args, **kwargs):
+        self.blocks.append(f"<p>{html.escape(' '.join(str(a) for a in args))}</p>")
+
+    def subheader(self, body, **kwargs):
+        self.blocks.append(f"<h3>{html.escape(str(body))}</h3>")
+
+    def metric(self, label, value, delta=None, **kwargs):
+        delta_html = f"<div class='delta'>{html.escape(str(delta))}</div>" if delta is not None else ""
+        self.blocks.append(
+            f"<div class='metric'><div>{html.escape(str(label))}</div>"
+            f"<b>{html.escape(str(value))}</b>{delta_html}</div>"
+        )
+
+    def plotly_chart(self, fig, **kwargs):
+        nom = f"{self.section}_{len(self.figures) + 1}.json"
+        with open(os.path.join(self.output_dir, 'figures', nom), 'w', encoding='utf-8') as f:
+            f.write(fig.to_json())
+        self.figures.append(nom)
+        # plotly.js n'est chargé (CDN) qu'avec la première figure de la page
+        self.blocks.append(fig.to_html(full_html=False,
+                                       include_plotlyjs='cdn' if len(self.figures) == 1 else False))
+
+    def display_map_html(self, carte_html, width=None, height=None):
+        nom = f"carte_{self.section}_{len(self.maps) + 1}.html"
+        with open(os.path.join(self.output_dir, nom), 'w', encoding='utf-8') as f:
+            f.write(carte_html)
+        self.maps.append(nom)
+        self.blocks.append(f"<iframe src='{nom}' width='{width or 1000}' height='{height or 500}' "
+                           f"style='border:none'></iframe>")
+
+    def display_interactive_map(self, m, key=None, zoom=None, center=None):
+        nom = f"carte_{self.section}_{len(self.maps) + 1}.html"
+        m.save(os.path.join(self.output_dir, nom))
+        self.maps.append(nom)
+        self.blocks.append(f"<iframe src='{nom}' width='1000' height='500' style='border:none'></iframe>")
+        return None
+    
+    def __getattr__(self, name):
+        # Appels Streamlit sans équivalent statique (rerun, info...) : ignorés
+        def noop(*args, **kwargs):
+            return None
+        return noop
+
+
+@contextlib.contextmanager
+def static_rendering(recorder, dashboard):
+    """Redirige les appels Streamlit du module Dashboard vers l'enregistreur"""
+    originaux = Dashboard.st, Dashboard.display_map_html, Dashboard.display_interactive_map
+    Dashboard.st, Dashboard.display_map_html, Dashboard.display_interactive_map = (
+        recorder, recorder.display_map_html, recorder.display_interactive_map)
+    # Les fragments Streamlit ne s'exécutent pas hors session : on appelle la méthode d'origine
+    fragments = [nom for nom, attr in vars(type(dashboard)).items()
+                 if isinstance(attr, types.FunctionType) and hasattr(attr, '__wrapped__')]
+    for nom in fragments:
+        setattr(dashboard, nom, types.MethodType(getattr(type(dashboard), nom).__wrapped__, dashboard))
+    try:
+        yield recorder
+    finally:
+        Dashboard.st, Dashboard.display_map_html, Dashboard.display_interactive_map = originaux
+        for nom in fragments:
+            delattr(dashboard, nom)
+
+
+def export_preset(dashboard, version, preset_name, output_root):
+    """Exporte toutes les sections pour un préréglage de filtres"""
+    preset = PRESETS[preset_name]
+    output_dir = os.path.join(output_root, version, preset_name)
+    os.makedirs(os.path.join(output_dir, 'figures'), exist_ok=True)
+
+    nav = ' '.join(f"<a href='{ident}.html'>{html.escape(titre)}</a>" for ident, titre, _ in SECTIONS)
+    manifest = {'version': version, 'preset': preset_name, 'filtres': preset,
+                'genere_le': datetime.now().isoformat(timespec='seconds'), 'sections': {}}
+
+    for ident, titre, methode in SECTIONS:
+        recorder = StaticRecorder(ident, output_dir, preset)
+        with static_rendering(recorder, dashboard):
+            getattr(dashboard, methode)()
+
+        page = PAGE_TEMPLATE.format(title=html.escape(f"{titre} - Logements Réunion"),
+                                    nav=nav, body='\n'.join(recorder.blocks))
+        with open(os.path.join(output_dir, f"{ident}.html"), 'w', encoding='utf-8') as f:
+            f.write(page)
+        manifest['sections'][ident] = {
+            'titre': titre,
+            'page': f"{ident}.html",
+            'figures': [f"figures/{nom}" for nom in recorder.figures],
+            'cartes': recorder.maps,
+        }
+
+    with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(title="Dashboard Logements - Île de la Réunion", nav=nav,
+                                     body=f"<p>Version des données : {version} - préréglage : {preset_name}</p>"))
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export statique du dashboard logements")
+    parser.add_argument('--output', default='build/static', help="Répertoire de sortie")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Graine de génération des données (version reproductible)")
+    parser.add_argument('--preset', action='append', choices=sorted(PRESETS),
+                        help="Préréglage de filtres à exporter (répétable, défaut : tous)")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        np.random.seed(args.seed)
+    dashboard = Dashboard.ReunionHousingDashboard()
+    version = dashboard.data_fingerprint()
+
+    for preset_name in args.preset or sorted(PRESETS):
+        output_dir = export_preset(dashboard, version, preset_name, args.output)
+        print(f"✅ {preset_name}: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Exports en flux (CSV, Parquet, Excel) des tables du dashboard.
+
+Les tables sont lues par morceaux dans l'instantané des données (filtres
+appliqués morceau par morceau) et encodées au fil de l'eau. Le point d'accès
+``/export`` de l'API transmet les octets au fur et à mesure ; les boutons de
+téléchargement du dashboard, qui envoient le fichier en une fois, réunissent
+les mêmes octets en mémoire.
+"""
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Nombre de lignes lues et encodées par morceau
+CHUNK_ROWS = 50_000
+# Taille des blocs renvoyés lors de la relecture d'un fichier Excel
+FILE_BLOCK_BYTES = 1024 ** 2
+# Type MIME et extension de chaque format
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+SIZE_FILTERS = ['Toutes', 'Grandes (>50k)', 'Moyennes (20k-50k)', 'Petites (<20k)']
+SORT_COLUMNS = {
+    'Prix m²': 'prix_m2_moyen',
+    'Évolution prix': 'evolution_prix_1an',
+    'Population': 'population',
+    'Permis construire': 'permis_construire_2024',
+}
+
+
+def available_formats():
+    """Formats d'export disponibles (Excel requiert openpyxl)"""
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return ['csv', 'parquet']
+    return list(FORMATS)
+
+
+def filter_communes(current_data, micro_region='Toutes', taille='Toutes', tri='Prix m²'):
+    """Communes filtrées par micro-région et taille, triées (filtres de l'onglet Comparaison)"""
+    communes = current_data
+    if micro_region != 'Toutes':
+        communes = communes[communes['micro_region'] == micro_region]
+    if taille == 'Grandes (>50k)':
+        communes = communes[communes['population'] > 50000]
+    elif taille == 'Moyennes (20k-50k)':
+        communes = communes[(communes['population'] >= 20000) & (communes['population'] <= 50000)]
+    elif taille == 'Petites (<20k)':
+        communes = communes[communes['population'] < 20000]
+    if tri in SORT_COLUMNS:
+        communes = communes.sort_values(SORT_COLUMNS[tri], ascending=False)
+    return communes
+
+
+def iter_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Découpe une table en morceaux (vues, sans copie de la table entière)"""
+    for debut in range(0, len(df), chunk_rows):
+        yield df.iloc[debut:debut + chunk_rows]
+    if len(df) == 0:
+        yield df
+
+
+def history_chunks(historical_data, communes=None, debut=None, fin=None, chunk_rows=CHUNK_ROWS):
+    """Historique des communes choisies sur une période, filtré morceau par morceau"""
+    for morceau in iter_chunks(historical_data, chunk_rows):
+        masque = np.ones(len(morceau), dtype=bool)
+        if communes is not None:
+            masque &= morceau['commune'].isin(communes).values
+        if debut is not None:
+            masque &= (morceau['date'] >= pd.Timestamp(debut)).values
+        if fin is not None:
+            masque &= (morceau['date'] <= pd.Timestamp(fin)).values
+        yield morceau[masque]
+
+
+def simulator_grid_chunks(montant_emprunte, compute_monthly_payments, durees=range(15, 26),
+                          taux=np.round(np.arange(1.0, 5.01, 0.1), 1)):
+    """Grille des mensualités au format long, une durée de prêt par morceau"""
+    for duree in durees:
+        yield pd.DataFrame({
+            'duree_ans': duree,
+            'taux': taux,
+            'montant_emprunte': float(montant_emprunte),
+            'mensualite': np.round(compute_monthly_payments(montant_emprunte, taux, duree), 0),
+        })
+
+
+class _ChunkSink:
+    """Flux d'écriture dont les octets sont récupérés au fur et à mesure"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        parts, self._parts = self._parts, []
+        return b''.join(parts)
+
+
+def encode_csv(chunks):
+    """Encode les morceaux en CSV (en-tête une seule fois)"""
+    premier = True
+    for morceau in chunks:
+        texte = morceau.to_csv(index=False, header=premier, date_format='%Y-%m-%d')
+        premier = False
+        if texte:
+            yield texte.encode('utf-8')
+
+
+def frame_schema(df):
+    """Schéma Arrow d'une table entière, déduit de ses types (colonnes objet : texte)"""
+    schema = pa.Schema.from_pandas(df.head(0), preserve_index=False).remove_metadata()
+    for position, champ in enumerate(schema):
+        # Une colonne objet vide n'a pas de type Arrow : ce sont des chaînes dans les tables du dashboard
+        if pa.types.is_null(champ.type):
+            schema = schema.set(position, pa.field(champ.name, pa.string()))
+    return schema
+
+
+def encode_parquet(chunks, schema=None):
+    """Encode les morceaux en Parquet, un groupe de lignes par morceau.
+
+    Le schéma doit venir de la table entière (frame_schema) : déduit du premier morceau, une colonne vide
+    dans ce morceau serait typée null et les morceaux suivants ne pourraient pas y être convertis.
+    """
+    sink = _ChunkSink()
+    writer = None
+    for morceau in chunks:
+        table = pa.Table.from_pandas(morceau, preserve_index=False).replace_schema_metadata(None)
+        if writer is None:
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema or table.schema)
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def encode_xlsx(chunks, sheet_name='export'):
+    """Encode les morceaux en Excel (mode écriture seule, lignes écrites sur disque au fil de l'eau)"""
+    from openpyxl import Workbook
+
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet(sheet_name)
+    premier = True
+    for morceau in chunks:
+        if premier:
+            feuille.append(list(morceau.columns))
+            premier = False
+        for ligne in morceau.itertuples(index=False):
+            feuille.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else
+                            v.item() if isinstance(v, np.generic) else v for v in ligne])
+    # Le format xlsx est une archive zip : elle n'est lisible qu'une fois complète
+    with tempfile.TemporaryFile() as fichier:
+        classeur.save(fichier)
+        fichier.seek(0)
+        while True:
+            bloc = fichier.read(FILE_BLOCK_BYTES)
+            if not bloc:
+                break
+            yield bloc
+
+
+def stream_export(chunks, fmt, schema=None):
+    """Flux d'octets d'un export dans le format demandé (schema : schéma Arrow de la table, pour Parquet)"""
+    if fmt == 'csv':
+        return encode_csv(chunks)
+    if fmt == 'parquet':
+        return encode_parquet(chunks, schema)
+    if fmt == 'xlsx':
+        return encode_xlsx(chunks)
+    raise ValueError(f"Format d'export inconnu : {fmt}")
+
+
+def export_to_bytes(chunks, fmt, schema=None):
+    """Contenu complet d'un export (bouton de téléchargement)"""
+    # st.download_button envoie le fichier en une fois : l'export est matérialisé en mémoire, seul le
+    # point d'accès /export de l'API le transmet en flux
+    return b''.join(stream_export(chunks, fmt, schema))
+
+
+def export_filename(name, fmt):
+    """Nom de fichier d'un export"""
+    return f"{name}.{FORMATS[fmt][1]}"
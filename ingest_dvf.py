@@ -0,0 +1,213 @@
+"""Pipeline d'ingestion des fichiers DVF bruts (demandes de valeurs foncières).
+
+Lit les CSV DVF géolocalisés par morceaux, nettoie les mutations, les rattache
+au référentiel des communes (``nom``, ``lat``, ``lon``, ``micro_region``) et
+écrit un jeu Parquet partitionné (``annee=.../micro_region=...``) directement
+lisible par le dashboard (``data/transactions/``). Les fichiers sont répartis
+sur plusieurs processus ; la mémoire reste bornée par la taille des morceaux.
+
+Utilisation :
+
+    python ingest_dvf.py dvf/2022.csv.gz dvf/2023.csv.gz --output data/transactions --workers 4
+"""
+import argparse
+import glob
+import hashlib
+import os
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import reference_data
+
+# Colonnes utiles des fichiers DVF géolocalisés
+DVF_COLUMNS = [
+    'id_mutation', 'date_mutation', 'nature_mutation', 'valeur_fonciere', 'code_departement',
+    'nom_commune', 'id_parcelle', 'type_local', 'surface_reelle_bati',
+    'nombre_pieces_principales', 'longitude', 'latitude',
+]
+# Nombre de lignes lues par morceau
+CHUNK_SIZE = 200_000
+# Bornes de plausibilité du prix au m² (€)
+MIN_PRIX_M2 = 200
+MAX_PRIX_M2 = 20_000
+TYPES_LOGEMENT = ['Maison', 'Appartement']
+
+
+def normalize_name(nom):
+    """Nom de commune sans accents, casse, tirets ni apostrophes, pour le rapprochement"""
+    nom = unicodedata.normalize('NFKD', str(nom)).encode('ascii', 'ignore').decode('ascii')
+    return ''.join(c for c in nom.lower() if c.isalnum())
+
+
+def clean_chunk(chunk, reference, departement):
+    """Nettoie un morceau de mutations et le rattache au référentiel ; renvoie (lignes, rejets)"""
+    rejets = {}
+
+    def garder(masque, motif):
+        rejets[motif] = rejets.get(motif, 0) + int((~masque).sum())
+        return masque
+
+    chunk = chunk[garder(chunk['nature_mutation'] == 'Vente', 'hors_vente')]
+    if departement:
+        chunk = chunk[garder(chunk['code_departement'] == departement, 'hors_departement')]
+    chunk = chunk[garder(chunk['type_local'].isin(TYPES_LOGEMENT), 'hors_logement')]
+
+    # Une mutation portant sur plusieurs logements répète la valeur foncière : on l'écarte
+    logements_par_mutation = chunk.groupby('id_mutation')['id_mutation'].transform('size')
+    chunk = chunk[garder(logements_par_mutation == 1, 'mutation_multiple')]
+
+    surface = pd.to_numeric(chunk['surface_reelle_bati'], errors='coerce')
+    chunk = chunk.assign(surface=surface,
+                         prix_m2=pd.to_numeric(chunk['valeur_fonciere'], errors='coerce') / surface)
+    chunk = chunk[garder(chunk['prix_m2'].between(MIN_PRIX_M2, MAX_PRIX_M2), 'prix_aberrant')]
+
+    # Géocodage : rattachement au référentiel par nom, coordonnées de la commune à défaut
+    cle = chunk['nom_commune'].map(normalize_name)
+    chunk = chunk[garder(cle.isin(reference.index), 'commune_inconnue')]
+    cle = cle[chunk.index]
+    communes = reference.loc[cle.values]
+
+    lignes = pd.DataFrame({
+        'date': pd.to_datetime(chunk['date_mutation'], errors='coerce').values,
+        'commune': communes['nom'].values,
+        'micro_region': communes['micro_region'].values,
+        'prix_m2': chunk['prix_m2'].values,
+        'surface': chunk['surface'].values,
+        'type_local': chunk['type_local'].values,
+        'nombre_pieces': pd.to_numeric(chunk['nombre_pieces_principales'], errors='coerce').values,
+        'id_bien': chunk['id_parcelle'].values,
+        'id_mutation': chunk['id_mutation'].values,
+        'lat': pd.to_numeric(chunk['latitude'], errors='coerce').fillna(pd.Series(communes['lat'].values,
+                                                                                  index=chunk.index)).values,
+        'lon': pd.to_numeric(chunk['longitude'], errors='coerce').fillna(pd.Series(communes['lon'].values,
+                                                                                   index=chunk.index)).values,
+    })
+    valides = garder(lignes['date'].notna().values, 'date_invalide')
+    return lignes[valides], rejets
+
+
+def write_partitions(lignes, output_dir, prefixe):
+    """Écrit un morceau nettoyé dans le jeu Parquet partitionné par année et micro-région"""
+    lignes = lignes.assign(annee=lignes['date'].dt.year)
+    for (annee, micro_region), partition in lignes.groupby(['annee', 'micro_region']):
+        dossier = os.path.join(output_dir, f"annee={annee}", f"micro_region={micro_region}")
+        os.makedirs(dossier, exist_ok=True)
+        table = pa.Table.from_pandas(partition.drop(columns=['annee', 'micro_region']), preserve_index=False)
+        pq.write_table(table, os.path.join(dossier, f"{prefixe}.parquet"))
+
+
+def partition_prefix(path):
+    """Préfixe des fichiers de partition d'une entrée : nom de base et empreinte du chemin complet"""
+    # Deux entrées de même nom (2022/full.csv.gz, 2023/full.csv.gz) ne doivent pas s'écraser ; une même
+    # entrée réingérée remplace ses propres fichiers
+    empreinte = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.basename(path).split('.')[0]}-{empreinte}"
+
+
+def remove_partitions(output_dir, prefixe):
+    """Supprime les fichiers de partition d'une ingestion précédente de la même entrée"""
+    # Une entrée réingérée peut produire moins de morceaux : ses anciens fichiers seraient lus en double
+    anciens = glob.glob(os.path.join(glob.escape(output_dir), 'annee=*', 'micro_region=*',
+                                     f"{glob.escape(prefixe)}-*.parquet"))
+    for chemin in anciens:
+        os.remove(chemin)
+    return len(anciens)
+
+
+def ingest_file(path, reference, output_dir, departement, chunk_size=CHUNK_SIZE, sep=','):
+    """Traite un fichier DVF morceau par morceau (exécuté dans un processus du pool)"""
+    debut = time.perf_counter()
+    stats = {'fichier': path, 'lues': 0, 'ecrites': 0, 'rejets': {}}
+    nom_fichier = partition_prefix(path)
+    remove_partitions(output_dir, nom_fichier)
+    report = pd.DataFrame()
+
+    lecteur = pd.read_csv(path, sep=sep, usecols=lambda c: c in DVF_COLUMNS, dtype=str, chunksize=chunk_size)
+    for numero, chunk in enumerate(lecteur):
+        stats['lues'] += len(chunk)
+        # Les lignes d'une mutation sont contiguës : la dernière mutation du morceau peut
+        # se poursuivre dans le suivant, on la reporte
+        chunk = pd.concat([report, chunk], ignore_index=True)
+        derniere = chunk['id_mutation'].iloc[-1]
+        report = chunk[chunk['id_mutation'] == derniere]
+        chunk = chunk[chunk['id_mutation'] != derniere]
+
+        lignes, rejets = clean_chunk(chunk, reference, departement)
+        for motif, nombre in rejets.items():
+            stats['rejets'][motif] = stats['rejets'].get(motif, 0) + nombre
+        if len(lignes):
+            write_partitions(lignes, output_dir, f"{nom_fichier}-{numero:05d}")
+        stats['ecrites'] += len(lignes)
+        duree = time.perf_counter() - debut
+        print(f"  {nom_fichier} morceau {numero}: {stats['lues']:,} lignes lues "
+              f"({stats['lues'] / duree:,.0f} lignes/s)", file=sys.stderr, flush=True)
+
+    if len(report):
+        lignes, rejets = clean_chunk(report, reference, departement)
+        for motif, nombre in rejets.items():
+            stats['rejets'][motif] = stats['rejets'].get(motif, 0) + nombre
+        if len(lignes):
+            write_partitions(lignes, output_dir, f"{nom_fichier}-fin")
+        stats['ecrites'] += len(lignes)
+
+    stats['duree'] = time.perf_counter() - debut
+    return stats
+
+
+def load_reference(path=None):
+    """Référentiel des communes (nom, lat, lon, micro_region) indexé par nom normalisé"""
+    if path:
+        reference = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    else:
+        reference = pd.DataFrame(reference_data.communes_data())
+    reference = reference[['nom', 'lat', 'lon', 'micro_region']]
+    return reference.set_index(reference['nom'].map(normalize_name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion des fichiers DVF bruts en Parquet partitionné")
+    parser.add_argument('fichiers', nargs='+', help="Fichiers CSV DVF (éventuellement compressés)")
+    parser.add_argument('--output', default='data/transactions', help="Répertoire du jeu Parquet")
+    parser.add_argument('--communes', default=None,
+                        help="Référentiel des communes (CSV/Parquet), sinon le référentiel intégré")
+    parser.add_argument('--departement', default='974', help="Code département conservé ('' pour tous)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Nombre de processus")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Lignes par morceau")
+    parser.add_argument('--sep', default=',', help="Séparateur des CSV")
+    args = parser.parse_args()
+
+    reference = load_reference(args.communes)
+    os.makedirs(args.output, exist_ok=True)
+
+    debut = time.perf_counter()
+    total = {'lues': 0, 'ecrites': 0, 'rejets': {}}
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(args.fichiers))) as executor:
+        futures = [executor.submit(ingest_file, path, reference, args.output, args.departement,
+                                   args.chunk_size, args.sep)
+                   for path in args.fichiers]
+        for termine, future in enumerate(as_completed(futures), start=1):
+            stats = future.result()
+            total['lues'] += stats['lues']
+            total['ecrites'] += stats['ecrites']
+            for motif, nombre in stats['rejets'].items():
+                total['rejets'][motif] = total['rejets'].get(motif, 0) + nombre
+            print(f"✅ [{termine}/{len(futures)}] {stats['fichier']}: {stats['ecrites']:,}/{stats['lues']:,} "
+                  f"lignes conservées en {stats['duree']:.1f}s "
+                  f"({stats['lues'] / max(stats['duree'], 1e-9):,.0f} lignes/s)", flush=True)
+
+    duree = time.perf_counter() - debut
+    print(f"Total: {total['ecrites']:,}/{total['lues']:,} lignes conservées en {duree:.1f}s "
+          f"({total['lues'] / max(duree, 1e-9):,.0f} lignes/s)")
+    for motif, nombre in sorted(total['rejets'].items(), key=lambda item: -item[1]):
+        if nombre:
+            print(f"  rejet {motif}: {nombre:,}")
+
+
+if __name__ == "__main__":
+    main()
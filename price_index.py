@@ -0,0 +1,164 @@
+"""Indices de prix à qualité constante (hédonique ou ventes répétées).
+
+Les prix moyens par commune dépendent du mélange des biens vendus chaque mois.
+Ce module estime, par micro-région et par mois, un indice corrigé de cet effet
+par moindres carrés creux (``scipy.sparse.linalg.lsqr``) :
+
+- hédonique : log(prix_m2) ~ effets mois + effets commune + caractéristiques du bien ;
+- ventes répétées (Bailey-Muth-Nourse) : log(p2 / p1) ~ effet mois2 - effet mois1,
+  pour les biens vendus plusieurs fois (colonne ``id_bien``).
+
+Les micro-régions sont estimées en parallèle dans un pool de processus. Les mois
+ajoutés ensuite sont chaînés sur l'indice existant à partir d'une fenêtre glissante
+(méthode RWTD), sans réviser les valeurs déjà publiées.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+
+# Fenêtre (en mois) réestimée lors de l'ajout de nouveaux mois
+WINDOW_MONTHS = 24
+# Nombre minimal de ventes répétées pour préférer cette méthode à l'hédonique
+MIN_REPEAT_PAIRS = 200
+
+
+def _dummies(codes, n_colonnes):
+    """Matrice creuse d'indicatrices, la modalité 0 servant de référence"""
+    lignes = np.nonzero(codes > 0)[0]
+    return sparse.csr_matrix((np.ones(len(lignes)), (lignes, codes[lignes] - 1)),
+                             shape=(len(codes), max(n_colonnes - 1, 0)))
+
+
+def _month_index(beta_mois, mois):
+    """Indice base 100 au premier mois à partir des effets mois estimés"""
+    return pd.Series(100 * np.exp(np.concatenate([[0.0], beta_mois])), index=mois.to_timestamp(how='end').normalize())
+
+
+def fit_hedonic(transactions):
+    """Indice hédonique mensuel : log(prix_m2) régressé sur mois, commune et caractéristiques"""
+    codes_mois, mois = pd.factorize(transactions['date'].dt.to_period('M'), sort=True)
+    blocs = [_dummies(codes_mois, len(mois))]
+
+    codes_communes, communes = pd.factorize(transactions['commune'], sort=True)
+    blocs.append(_dummies(codes_communes, len(communes)))
+    if 'type_local' in transactions:
+        codes_types, types = pd.factorize(transactions['type_local'].fillna('inconnu'), sort=True)
+        blocs.append(_dummies(codes_types, len(types)))
+
+    # Caractéristiques numériques disponibles, centrées ; colonne constante
+    numeriques = []
+    if 'surface' in transactions:
+        numeriques.append(np.log(transactions['surface'].clip(lower=1).fillna(transactions['surface'].median())))
+    if 'nombre_pieces' in transactions:
+        numeriques.append(transactions['nombre_pieces'].fillna(transactions['nombre_pieces'].median()))
+    numeriques = [np.asarray(v, dtype=float) - np.mean(v) for v in numeriques]
+    blocs.append(sparse.csr_matrix(np.column_stack([np.ones(len(transactions))] + numeriques)))
+
+    X = sparse.hstack(blocs, format='csr')
+    y = np.log(transactions['prix_m2'].values.astype(float))
+    beta = lsqr(X, y, atol=1e-10, btol=1e-10)[0]
+    return _month_index(beta[:len(mois) - 1], mois)
+
+
+def fit_repeat_sales(transactions):
+    """Indice de ventes répétées : écarts de log-prix entre deux ventes d'un même bien"""
+    ventes = transactions.sort_values(['id_bien', 'date'])
+    codes_mois, mois = pd.factorize(ventes['date'].dt.to_period('M'), sort=True)
+    log_prix = np.log(ventes['prix_m2'].values.astype(float))
+    meme_bien = ventes['id_bien'].values[1:] == ventes['id_bien'].values[:-1]
+
+    debut, fin = codes_mois[:-1][meme_bien], codes_mois[1:][meme_bien]
+    y = (log_prix[1:] - log_prix[:-1])[meme_bien]
+    lignes = np.arange(len(y))
+    # +1 au mois de revente, -1 au mois d'achat ; le premier mois sert de référence
+    X = (sparse.csr_matrix((np.ones(len(y)), (lignes, fin)), shape=(len(y), len(mois)))
+         - sparse.csr_matrix((np.ones(len(y)), (lignes, debut)), shape=(len(y), len(mois))))
+    beta = lsqr(X[:, 1:], y, atol=1e-10, btol=1e-10)[0]
+    return _month_index(beta, mois)
+
+
+def count_repeat_pairs(transactions):
+    """Nombre de couples de ventes d'un même bien"""
+    if 'id_bien' not in transactions:
+        return 0
+    return int(transactions['id_bien'].duplicated().sum())
+
+
+def fit_index(transactions, method='auto'):
+    """Estime l'indice d'une micro-région avec la méthode demandée (ou la plus adaptée)"""
+    if method == 'auto':
+        method = 'repeat_sales' if count_repeat_pairs(transactions) >= MIN_REPEAT_PAIRS else 'hedonic'
+    if method == 'repeat_sales':
+        return fit_repeat_sales(transactions)
+    return fit_hedonic(transactions)
+
+
+def _fit_region(args):
+    micro_region, transactions, method = args
+    return micro_region, fit_index(transactions, method)
+
+
+class PriceIndexEngine:
+    """Indices de prix par micro-région, estimés en parallèle et mis à jour mois par mois"""
+
+    def __init__(self, method='auto', window_months=WINDOW_MONTHS, max_workers=None):
+        self.method = method
+        self.window_months = window_months
+        self.max_workers = max_workers
+        self.indices = {}
+
+    def _fit_all(self, groupes):
+        taches = [(micro_region, transactions, self.method) for micro_region, transactions in groupes]
+        if len(taches) <= 1 or self.max_workers == 1:
+            return dict(map(_fit_region, taches))
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return dict(executor.map(_fit_region, taches))
+
+    def refresh(self, transactions):
+        """Estime les micro-régions inconnues et chaîne uniquement les mois nouveaux des autres"""
+        transactions = transactions.assign(date=pd.to_datetime(transactions['date']))
+        transactions = transactions[transactions['prix_m2'] > 0]
+
+        completes, fenetres = [], []
+        for micro_region, groupe in transactions.groupby('micro_region'):
+            index = self.indices.get(micro_region)
+            if index is None:
+                completes.append((micro_region, groupe))
+                continue
+            dernier_mois = index.index[-1]
+            if groupe['date'].max() <= dernier_mois:
+                continue
+            # Réestimation sur la fenêtre glissante qui se termine au mois le plus récent
+            debut_fenetre = (groupe['date'].max().to_period('M') - self.window_months + 1).to_timestamp()
+            fenetres.append((micro_region, groupe[groupe['date'] >= min(debut_fenetre, dernier_mois.replace(day=1))]))
+
+        self.indices.update(self._fit_all(completes))
+        for micro_region, index_fenetre in self._fit_all(fenetres).items():
+            self.indices[micro_region] = self._chain(self.indices[micro_region], index_fenetre)
+        return self
+
+    def restore(self, engine):
+        """Reprend les indices d'un moteur relu du cache des artefacts"""
+        self.indices = dict(engine.indices)
+        return self
+
+    @staticmethod
+    def _chain(index, index_fenetre):
+        """Prolonge l'indice publié avec les variations de la fenêtre, sans réviser le passé"""
+        dernier_mois = index.index[-1]
+        nouveaux = index_fenetre[index_fenetre.index > dernier_mois]
+        if dernier_mois not in index_fenetre.index or nouveaux.empty:
+            return index
+        return pd.concat([index, index[dernier_mois] * nouveaux / index_fenetre[dernier_mois]])
+
+    def to_frame(self):
+        """Indices au format long (date, micro_region, indice_prix_ajuste)"""
+        if not self.indices:
+            return pd.DataFrame(columns=['date', 'micro_region', 'indice_prix_ajuste'])
+        return pd.concat([
+            pd.DataFrame({'date': index.index, 'micro_region': micro_region, 'indice_prix_ajuste': index.values})
+            for micro_region, index in self.indices.items()
+        ], ignore_index=True)
@@ -0,0 +1,184 @@
+"""Profilage à la demande d'une exécution du dashboard.
+
+Un administrateur demande le profilage de la prochaine exécution : chaque
+section (``create_*``) est alors exécutée sous cProfile et, en option, sous un
+échantillonneur de piles qui produit un flamegraph au format speedscope
+(https://www.speedscope.app). Les résultats sont écrits sur disque, une capture
+par répertoire :
+
+    sections.prof                 statistiques cProfile (pstats, snakeviz...)
+    resume.txt                    fonctions les plus coûteuses (temps cumulé)
+    flamegraph.speedscope.json    piles échantillonnées, une racine par section
+    capture.json                  date, libellé et durée de chaque section
+
+Sans demande de profilage, les sections sont appelées directement.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Intervalle d'échantillonnage des piles (secondes)
+SAMPLE_INTERVAL = 0.005
+# Nombre de captures conservées sur disque
+KEEP_CAPTURES = 20
+# Nombre de fonctions listées dans le résumé texte
+SUMMARY_FUNCTIONS = 40
+CAPTURE_FILES = {
+    'sections.prof': 'application/octet-stream',
+    'resume.txt': 'text/plain',
+    'flamegraph.speedscope.json': 'application/json',
+}
+
+# Une seule section profilée à la fois dans le processus (cProfile ne se combine pas à un autre profileur actif)
+_capture_lock = threading.Lock()
+
+
+class StackSampler:
+    """Échantillonne périodiquement la pile d'un thread (profil « sampled » speedscope)"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = []
+        self.samples = []
+        self.weights = []
+        self._positions = {}
+        self._section = None
+        self._root = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, section, root):
+        """Échantillonne les appels sous le cadre root, rattachés à la racine section"""
+        self._section, self._root = section, root
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='echantillonneur-piles', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._root = None
+
+    def speedscope(self, name):
+        """Profil au format speedscope (schéma https://www.speedscope.app/file-format-schema.json)"""
+        total = float(sum(self.weights))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'dashboard-logements',
+            'activeProfileIndex': 0,
+            'shared': {'frames': self.frames},
+            'profiles': [{'type': 'sampled', 'name': name, 'unit': 'seconds', 'startValue': 0,
+                          'endValue': total, 'samples': self.samples, 'weights': self.weights}],
+        }
+
+    def _frame(self, cle, description):
+        if cle not in self._positions:
+            self._positions[cle] = len(self.frames)
+            self.frames.append(description)
+        return self._positions[cle]
+
+    def _run(self):
+        precedent = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            cadre = sys._current_frames().get(self.thread_id)
+            maintenant = time.perf_counter()
+            pile = []
+            # Les appels au-dessus de la section (Streamlit, run_dashboard) ne sont pas retenus
+            while cadre is not None and cadre is not self._root:
+                code = cadre.f_code
+                pile.append(self._frame((code.co_filename, code.co_firstlineno, code.co_name),
+                                        {'name': code.co_name, 'file': code.co_filename,
+                                         'line': code.co_firstlineno}))
+                cadre = cadre.f_back
+            pile.append(self._frame(('section', self._section), {'name': self._section}))
+            self.samples.append(pile[::-1])
+            self.weights.append(maintenant - precedent)
+            precedent = maintenant
+
+
+class ProfileCapture:
+    """Profil cProfile (et flamegraph optionnel) des sections d'une exécution"""
+
+    def __init__(self, flamegraph=False, interval=SAMPLE_INTERVAL):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), interval) if flamegraph else None
+        self.durations = {}
+        self.skipped = []
+
+    def run(self, name, func):
+        """Exécute une section sous le profileur (sans profilage si une autre session profile déjà)"""
+        if not _capture_lock.acquire(blocking=False):
+            self.skipped.append(name)
+            return func()
+        if self.sampler is not None:
+            self.sampler.start(name, sys._getframe())
+        debut = time.perf_counter()
+        self.profile.enable()
+        try:
+            return func()
+        finally:
+            self.profile.disable()
+            self.durations[name] = self.durations.get(name, 0) + time.perf_counter() - debut
+            if self.sampler is not None:
+                self.sampler.stop()
+            _capture_lock.release()
+
+    def save(self, directory, label, keep=KEEP_CAPTURES):
+        """Écrit la capture dans un nouveau répertoire de directory, renvoie sa description"""
+        horodatage = datetime.now()
+        nom = f"{horodatage:%Y%m%d-%H%M%S-%f}"
+        dossier = os.path.join(directory, nom)
+        os.makedirs(dossier, exist_ok=True)
+
+        self.profile.dump_stats(os.path.join(dossier, 'sections.prof'))
+        resume = io.StringIO()
+        pstats.Stats(self.profile, stream=resume).sort_stats('cumulative').print_stats(SUMMARY_FUNCTIONS)
+        with open(os.path.join(dossier, 'resume.txt'), 'w', encoding='utf-8') as f:
+            f.write(resume.getvalue())
+        if self.sampler is not None:
+            with open(os.path.join(dossier, 'flamegraph.speedscope.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.sampler.speedscope(label), f)
+
+        description = {'capture': nom, 'label': label, 'date': horodatage.isoformat(timespec='seconds'),
+                       'durations': self.durations, 'skipped': self.skipped,
+                       'files': [f for f in CAPTURE_FILES if os.path.exists(os.path.join(dossier, f))]}
+        with open(os.path.join(dossier, 'capture.json'), 'w', encoding='utf-8') as f:
+            json.dump(description, f, ensure_ascii=False, indent=2)
+        prune_captures(directory, keep)
+        return description
+
+
+def list_captures(directory):
+    """Descriptions des captures enregistrées, la plus récente en premier"""
+    if not os.path.isdir(directory):
+        return []
+    captures = []
+    for entree in sorted(os.scandir(directory), key=lambda e: e.name, reverse=True):
+        try:
+            with open(os.path.join(entree.path, 'capture.json'), encoding='utf-8') as f:
+                captures.append(json.load(f))
+        except (FileNotFoundError, NotADirectoryError, json.JSONDecodeError):
+            continue
+    return captures
+
+
+def prune_captures(directory, keep=KEEP_CAPTURES):
+    """Supprime les captures les plus anciennes au-delà de keep"""
+    dossiers = sorted((e for e in os.scandir(directory) if e.is_dir()), key=lambda e: e.name, reverse=True)
+    for entree in dossiers[keep:]:
+        shutil.rmtree(entree.path, ignore_errors=True)
+
+
+def read_capture_file(directory, capture, name):
+    """Contenu d'un fichier d'une capture (téléchargement)"""
+    with open(os.path.join(directory, capture, name), 'rb') as f:
+        return f.read()
@@ -0,0 +1,127 @@
+"""Sketches de quantiles fusionnables pour les prix des transactions.
+
+Chaque groupe commune × mois est résumé par un histogramme à buckets
+logarithmiques (DDSketch) : tout quantile est estimé avec une erreur relative
+bornée, deux sketches se fusionnent en additionnant leurs compteurs, et
+l'ingestion se fait par lots vectorisés. Les agrégations micro-région et île
+ne sont que des sommes de lignes, sans relire les transactions.
+"""
+import numpy as np
+import pandas as pd
+
+# Erreur relative garantie sur les quantiles estimés
+RELATIVE_ACCURACY = 0.01
+# Plage de valeurs couverte (prix au m²) ; les valeurs hors plage sont ramenées aux bornes
+MIN_VALUE = 1.0
+MAX_VALUE = 1e6
+
+
+def transaction_keys(transactions):
+    """Identité de chaque transaction : id_mutation s'il est fourni, sinon empreinte du contenu de la ligne"""
+    if 'id_mutation' in transactions:
+        return pd.Series(transactions['id_mutation'].astype(str).values, index=transactions.index)
+    return pd.util.hash_pandas_object(transactions, index=False)
+
+
+class QuantileSketchCube:
+    """Sketches DDSketch par commune × mois, stockés dans une matrice de compteurs"""
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, min_value=MIN_VALUE, max_value=MAX_VALUE):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.max_value = max_value
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        self.n_buckets = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.keys = pd.DataFrame(columns=['commune', 'date'])
+        self.counts = np.zeros((0, self.n_buckets), dtype=np.int64)
+        # Date de la dernière transaction ingérée (les fichiers sont complétés par date), et nombre d'occurrences
+        # déjà ingérées de chaque transaction de cette date (des ventes peuvent encore y être ajoutées)
+        self.watermark = None
+        self.watermark_counts = {}
+
+    def _buckets(self, values):
+        values = np.clip(np.asarray(values, dtype=float), self.min_value, self.max_value)
+        return np.ceil(np.log(values) / self._log_gamma).astype(int) - self._offset
+
+    def _bucket_values(self):
+        # Estimateur DDSketch : milieu (en erreur relative) de chaque bucket
+        indices = np.arange(self.n_buckets) + self._offset
+        return 2 * self.gamma ** indices / (self.gamma + 1)
+
+    def update(self, transactions, value='prix_m2'):
+        """Ingère un lot de transactions (commune, date, valeur) par additions vectorisées"""
+        transactions = transactions.dropna(subset=['commune', 'date', value])
+        if transactions.empty:
+            return self
+        dates = pd.to_datetime(transactions['date'])
+        lot = pd.DataFrame({'commune': transactions['commune'].values,
+                            'date': dates.dt.to_period('M').dt.to_timestamp(how='end').dt.normalize().values})
+
+        # Nouvelles lignes commune × mois
+        cles = pd.MultiIndex.from_frame(lot)
+        existantes = pd.MultiIndex.from_frame(self.keys) if len(self.keys) else pd.MultiIndex.from_arrays([[], []])
+        nouvelles = cles.unique().difference(existantes)
+        if len(nouvelles):
+            nouvelles_cles = nouvelles.to_frame(index=False, name=['commune', 'date'])
+            self.keys = nouvelles_cles if self.keys.empty else pd.concat([self.keys, nouvelles_cles],
+                                                                         ignore_index=True)
+            self.counts = np.vstack([self.counts, np.zeros((len(nouvelles), self.n_buckets), dtype=np.int64)])
+
+        lignes = pd.MultiIndex.from_frame(self.keys).get_indexer(cles)
+        cellules = lignes * self.n_buckets + self._buckets(transactions[value].values)
+        self.counts += np.bincount(cellules, minlength=self.counts.size).reshape(self.counts.shape)
+        date_max = dates.max()
+        if self.watermark is None or date_max > self.watermark:
+            self.watermark, self.watermark_counts = date_max, {}
+        if date_max == self.watermark:
+            for cle, nombre in transaction_keys(transactions[(dates == date_max).values]).value_counts().items():
+                self.watermark_counts[cle] = self.watermark_counts.get(cle, 0) + nombre
+        return self
+
+    def ingest(self, transactions, value='prix_m2'):
+        """Ingère uniquement les transactions absentes des lots précédents"""
+        if self.watermark is not None:
+            dates = pd.to_datetime(transactions['date'])
+            nouvelles = (dates > self.watermark).values
+            # À la date du filigrane, seules les occurrences au-delà de celles déjà ingérées sont nouvelles
+            limite = (dates == self.watermark).values
+            cles = transaction_keys(transactions[limite])
+            deja_ingerees = cles.map(self.watermark_counts).fillna(0).values
+            nouvelles[limite] = cles.groupby(cles.values).cumcount().values >= deja_ingerees
+            transactions = transactions[nouvelles]
+        return self.update(transactions, value)
+
+    def restore(self, cube):
+        """Reprend les compteurs et le filigrane d'un cube relu du cache des artefacts"""
+        self.keys, self.counts = cube.keys, cube.counts.copy()
+        self.watermark, self.watermark_counts = cube.watermark, dict(cube.watermark_counts)
+        return self
+
+    def rollup(self, mapping=None):
+        """Fusionne les sketches par mois et par groupe (commune -> groupe), ou pour toute l'île"""
+        groupes = self.keys['commune'].map(mapping) if mapping is not None else pd.Series('Île', index=self.keys.index)
+        compteurs = pd.DataFrame(self.counts).groupby([groupes.values, self.keys['date'].values]).sum()
+        return compteurs.index.to_frame(index=False, name=['groupe', 'date']), compteurs.values
+
+    def quantiles(self, counts, qs=(0.1, 0.5, 0.9)):
+        """Quantiles estimés de chaque ligne de compteurs (une colonne par quantile)"""
+        cumul = counts.cumsum(axis=1)
+        effectifs = cumul[:, -1]
+        valeurs = self._bucket_values()
+        resultats = {}
+        for q in qs:
+            rangs = q * (effectifs - 1)
+            buckets = (cumul > rangs[:, np.newaxis]).argmax(axis=1)
+            resultats[f"p{int(round(q * 100))}"] = np.where(effectifs > 0, valeurs[buckets], np.nan)
+        resultats['nombre'] = effectifs
+        return pd.DataFrame(resultats)
+
+    def quantile_frame(self, level='commune', mapping=None, qs=(0.1, 0.5, 0.9)):
+        """Quantiles par mois au niveau commune, micro-région (mapping) ou île"""
+        if level == 'commune':
+            cles, compteurs = self.keys.rename(columns={'commune': 'groupe'}), self.counts
+        else:
+            cles, compteurs = self.rollup(mapping if level != 'ile' else None)
+        resultat = pd.concat([cles.reset_index(drop=True), self.quantiles(compteurs, qs)], axis=1)
+        return resultat.rename(columns={'groupe': level}).sort_values([level, 'date']).reset_index(drop=True)
@@ -0,0 +1,359 @@
+"""Référentiel intégré des communes de La Réunion.
+
+Utilisé par le dashboard lorsqu'aucune source ``communes`` n'est fournie, et
+par le pipeline d'ingestion DVF pour rattacher les mutations aux communes.
+"""
+import copy
+
+COMMUNES = [
+    {
+        'nom': 'Saint-Denis',
+        'micro_region': 'Nord',
+        'population': 153810,
+        'superficie_km2': 142.79,
+        'prix_m2_moyen': 3200,
+        'evolution_prix_1an': 4.2,
+        'loyers_moyens_m2': 12.5,
+        'logements_sociaux_pourcentage': 28,
+        'taux_vacance': 6.2,
+        'permis_construire_2024': 420,
+        'lat': -20.8789,
+        'lon': 55.4481,
+        'description': 'Préfecture et ville la plus peuplée'
+    },
+    {
+        'nom': 'Saint-Paul',
+        'micro_region': 'Ouest',
+        'population': 105240,
+        'superficie_km2': 241.28,
+        'prix_m2_moyen': 2800,
+        'evolution_prix_1an': 5.8,
+        'loyers_moyens_m2': 10.8,
+        'logements_sociaux_pourcentage': 32,
+        'taux_vacance': 5.8,
+        'permis_construire_2024': 380,
+        'lat': -21.0097,
+        'lon': 55.2697,
+        'description': 'Deuxième ville de l\'île, fort développement'
+    },
+    {
+        'nom': 'Saint-Pierre',
+        'micro_region': 'Sud',
+        'population': 84520,
+        'superficie_km2': 95.99,
+        'prix_m2_moyen': 2950,
+        'evolution_prix_1an': 6.1,
+        'loyers_moyens_m2': 11.2,
+        'logements_sociaux_pourcentage': 26,
+        'taux_vacance': 4.9,
+        'permis_construire_2024': 350,
+        'lat': -21.3393,
+        'lon': 55.4781,
+        'description': 'Sous-préfecture du Sud, pôle économique'
+    },
+    {
+        'nom': 'Le Tampon',
+        'micro_region': 'Sud',
+        'population': 79849,
+        'superficie_km2': 165.43,
+        'prix_m2_moyen': 2600,
+        'evolution_prix_1an': 5.2,
+        'loyers_moyens_m2': 9.8,
+        'logements_sociaux_pourcentage': 24,
+        'taux_vacance': 5.1,
+        'permis_construire_2024': 290,
+        'lat': -21.2779,
+        'lon': 55.5179,
+        'description': 'Commune résidentielle en forte croissance'
+    },
+    {
+        'nom': 'Saint-André',
+        'micro_region': 'Est',
+        'population': 56602,
+        'superficie_km2': 53.07,
+        'prix_m2_moyen': 2200,
+        'evolution_prix_1an': 3.8,
+        'loyers_moyens_m2': 8.5,
+        'logements_sociaux_pourcentage': 35,
+        'taux_vacance': 7.2,
+        'permis_construire_2024': 180,
+        'lat': -20.9631,
+        'lon': 55.6508,
+        'description': 'Commune agricole en développement'
+    },
+    {
+        'nom': 'Saint-Louis',
+        'micro_region': 'Sud',
+        'population': 53609,
+        'superficie_km2': 98.90,
+        'prix_m2_moyen': 2450,
+        'evolution_prix_1an': 4.9,
+        'loyers_moyens_m2': 10.2,
+        'logements_sociaux_pourcentage': 31,
+        'taux_vacance': 6.5,
+        'permis_construire_2024': 220,
+        'lat': -21.2861,
+        'lon': 55.4111,
+        'description': 'Pôle économique du Sud'
+    },
+    {
+        'nom': 'Le Port',
+        'micro_region': 'Ouest',
+        'population': 32995,
+        'superficie_km2': 16.62,
+        'prix_m2_moyen': 1950,
+        'evolution_prix_1an': 2.8,
+        'loyers_moyens_m2': 7.8,
+        'logements_sociaux_pourcentage': 45,
+        'taux_vacance': 8.5,
+        'permis_construire_2024': 120,
+        'lat': -20.9394,
+        'lon': 55.2928,
+        'description': 'Ville portuaire et industrielle'
+    },
+    {
+        'nom': 'Saint-Joseph',
+        'micro_region': 'Sud',
+        'population': 37882,
+        'superficie_km2': 178.50,
+        'prix_m2_moyen': 2100,
+        'evolution_prix_1an': 4.1,
+        'loyers_moyens_m2': 8.2,
+        'logements_sociaux_pourcentage': 29,
+        'taux_vacance': 6.8,
+        'permis_construire_2024': 160,
+        'lat': -21.3778,
+        'lon': 55.6197,
+        'description': 'Grande commune du Sud'
+    },
+    {
+        'nom': 'Saint-Benoît',
+        'micro_region': 'Est',
+        'population': 37308,
+        'superficie_km2': 229.61,
+        'prix_m2_moyen': 2050,
+        'evolution_prix_1an': 3.5,
+        'loyers_moyens_m2': 7.9,
+        'logements_sociaux_pourcentage': 33,
+        'taux_vacance': 7.1,
+        'permis_construire_2024': 140,
+        'lat': -21.0339,
+        'lon': 55.7147,
+        'description': 'Sous-préfecture de l\'Est'
+    },
+    {
+        'nom': 'Sainte-Marie',
+        'micro_region': 'Nord',
+        'population': 34167,
+        'superficie_km2': 87.21,
+        'prix_m2_moyen': 2850,
+        'evolution_prix_1an': 4.5,
+        'loyers_moyens_m2': 11.0,
+        'logements_sociaux_pourcentage': 27,
+        'taux_vacance': 5.5,
+        'permis_construire_2024': 190,
+        'lat': -20.8969,
+        'lon': 55.5492,
+        'description': 'Ville dynamique du Nord'
+    },
+    {
+        'nom': 'Saint-Leu',
+        'micro_region': 'Ouest',
+        'population': 34746,
+        'superficie_km2': 118.37,
+        'prix_m2_moyen': 2700,
+        'evolution_prix_1an': 5.5,
+        'loyers_moyens_m2': 10.5,
+        'logements_sociaux_pourcentage': 25,
+        'taux_vacance': 5.2,
+        'permis_construire_2024': 210,
+        'lat': -21.1653,
+        'lon': 55.2881,
+        'description': 'Station balnéaire prisée'
+    },
+    {
+        'nom': 'La Possession',
+        'micro_region': 'Ouest',
+        'population': 33506,
+        'superficie_km2': 118.35,
+        'prix_m2_moyen': 2500,
+        'evolution_prix_1an': 4.8,
+        'loyers_moyens_m2': 9.5,
+        'logements_sociaux_pourcentage': 30,
+        'taux_vacance': 5.9,
+        'permis_construire_2024': 170,
+        'lat': -20.9253,
+        'lon': 55.3358,
+        'description': 'Ville en développement rapide'
+    },
+    {
+        'nom': 'Sainte-Suzanne',
+        'micro_region': 'Nord',
+        'population': 24645,
+        'superficie_km2': 57.84,
+        'prix_m2_moyen': 2650,
+        'evolution_prix_1an': 4.0,
+        'loyers_moyens_m2': 10.0,
+        'logements_sociaux_pourcentage': 28,
+        'taux_vacance': 6.0,
+        'permis_construire_2024': 130,
+        'lat': -20.9061,
+        'lon': 55.6069,
+        'description': 'Commune agricole et résidentielle'
+    },
+    {
+        'nom': 'Bras-Panon',
+        'micro_region': 'Est',
+        'population': 13170,
+        'superficie_km2': 88.55,
+        'prix_m2_moyen': 1900,
+        'evolution_prix_1an': 3.2,
+        'loyers_moyens_m2': 7.2,
+        'logements_sociaux_pourcentage': 32,
+        'taux_vacance': 7.5,
+        'permis_construire_2024': 90,
+        'lat': -21.0017,
+        'lon': 55.6772,
+        'description': 'Commune rurale de l\'Est'
+    },
+    {
+        'nom': 'Les Avirons',
+        'micro_region': 'Ouest',
+        'population': 11447,
+        'superficie_km2': 26.27,
+        'prix_m2_moyen': 2350,
+        'evolution_prix_1an': 4.3,
+        'loyers_moyens_m2': 9.0,
+        'logements_sociaux_pourcentage': 26,
+        'taux_vacance': 5.7,
+        'permis_construire_2024': 110,
+        'lat': -21.2408,
+        'lon': 55.3392,
+        'description': 'Petite commune de l\'Ouest'
+    },
+    {
+        'nom': 'Entre-Deux',
+        'micro_region': 'Sud',
+        'population': 7070,
+        'superficie_km2': 66.83,
+        'prix_m2_moyen': 2000,
+        'evolution_prix_1an': 3.7,
+        'loyers_moyens_m2': 7.5,
+        'logements_sociaux_pourcentage': 22,
+        'taux_vacance': 6.3,
+        'permis_construire_2024': 70,
+        'lat': -21.2500,
+        'lon': 55.4722,
+        'description': 'Commune des Hauts de l\'île'
+    },
+    {
+        'nom': 'L\'Étang-Salé',
+        'micro_region': 'Ouest',
+        'population': 14030,
+        'superficie_km2': 38.65,
+        'prix_m2_moyen': 2400,
+        'evolution_prix_1an': 4.6,
+        'loyers_moyens_m2': 9.2,
+        'logements_sociaux_pourcentage': 27,
+        'taux_vacance': 5.4,
+        'permis_construire_2024': 100,
+        'lat': -21.2631,
+        'lon': 55.3842,
+        'description': 'Station balnéaire familiale'
+    },
+    {
+        'nom': 'Petite-Île',
+        'micro_region': 'Sud',
+        'population': 12155,
+        'superficie_km2': 33.93,
+        'prix_m2_moyen': 2250,
+        'evolution_prix_1an': 4.0,
+        'loyers_moyens_m2': 8.8,
+        'logements_sociaux_pourcentage': 29,
+        'taux_vacance': 6.1,
+        'permis_construire_2024': 85,
+        'lat': -21.3531,
+        'lon': 55.5639,
+        'description': 'Petite commune du Sud'
+    },
+    {
+        'nom': 'Saint-Philippe',
+        'micro_region': 'Sud',
+        'population': 5232,
+        'superficie_km2': 153.94,
+        'prix_m2_moyen': 1800,
+        'evolution_prix_1an': 2.9,
+        'loyers_moyens_m2': 6.8,
+        'logements_sociaux_pourcentage': 24,
+        'taux_vacance': 8.0,
+        'permis_construire_2024': 50,
+        'lat': -21.3592,
+        'lon': 55.7672,
+        'description': 'Commune sauvage du Sud Sauvage'
+    },
+    {
+        'nom': 'Sainte-Rose',
+        'micro_region': 'Est',
+        'population': 6424,
+        'superficie_km2': 177.60,
+        'prix_m2_moyen': 1750,
+        'evolution_prix_1an': 2.7,
+        'loyers_moyens_m2': 6.5,
+        'logements_sociaux_pourcentage': 26,
+        'taux_vacance': 8.2,
+        'permis_construire_2024': 45,
+        'lat': -21.1242,
+        'lon': 55.7961,
+        'description': 'Commune de l\'Est préservée'
+    },
+    {
+        'nom': 'Cilaos',
+        'micro_region': 'Cirques',
+        'population': 5528,
+        'superficie_km2': 84.40,
+        'prix_m2_moyen': 1600,
+        'evolution_prix_1an': 2.5,
+        'loyers_moyens_m2': 6.0,
+        'logements_sociaux_pourcentage': 35,
+        'taux_vacance': 9.0,
+        'permis_construire_2024': 30,
+        'lat': -21.1339,
+        'lon': 55.4719,
+        'description': 'Commune du cirque de Cilaos'
+    },
+    {
+        'nom': 'Salazie',
+        'micro_region': 'Cirques',
+        'population': 7363,
+        'superficie_km2': 103.82,
+        'prix_m2_moyen': 1550,
+        'evolution_prix_1an': 2.3,
+        'loyers_moyens_m2': 5.8,
+        'logements_sociaux_pourcentage': 38,
+        'taux_vacance': 9.5,
+        'permis_construire_2024': 35,
+        'lat': -21.0272,
+        'lon': 55.5392,
+        'description': 'Commune du cirque de Salazie'
+    },
+    {
+        'nom': 'Les Trois-Bassins',
+        'micro_region': 'Ouest',
+        'population': 6980,
+        'superficie_km2': 42.58,
+        'prix_m2_moyen': 2300,
+        'evolution_prix_1an': 4.2,
+        'loyers_moyens_m2': 8.9,
+        'logements_sociaux_pourcentage': 25,
+        'taux_vacance': 5.8,
+        'permis_construire_2024': 75,
+        'lat': -21.1039,
+        'lon': 55.2992,
+        'description': 'Commune de l\'Ouest'
+    }
+]
+
+
+def communes_data():
+    """Copie modifiable du référentiel (le dashboard y recalcule certaines valeurs)"""
+    return copy.deepcopy(COMMUNES)
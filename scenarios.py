@@ -0,0 +1,180 @@
+"""Scénarios de politique du logement (permis, logements sociaux, vacance, population).
+
+Un scénario est une liste de chocs appliqués aux leviers de ``current_data``,
+sur toute l'île ou sur une micro-région :
+
+    {'nom': "Permis +20 % dans l'Ouest",
+     'chocs': [shock('permis_construire_2024', 20, micro_region='Ouest')]}
+
+Les chocs d'un lot de scénarios sont rangés dans des tableaux (scénario ×
+micro-région × levier) : les leviers de toutes les communes, les indicateurs
+dérivés et leurs agrégats par micro-région sont recalculés pour tous les
+scénarios à la fois, sans boucle Python par scénario ni par commune.
+"""
+import numpy as np
+import pandas as pd
+
+# Leviers de current_data modifiables par un scénario
+LEVERS = {
+    'permis_construire_2024': 'Permis de construire',
+    'logements_sociaux_pourcentage': 'Logements sociaux (%)',
+    'taux_vacance': 'Taux de vacance (%)',
+    'population': 'Population',
+}
+# Leviers exprimés en pourcentage (bornés à 100)
+PERCENT_LEVERS = ['logements_sociaux_pourcentage', 'taux_vacance']
+# relatif : variation en % ; absolu : valeur ajoutée (points pour un pourcentage) ; plancher : valeur minimale
+SHOCK_MODES = ['relatif', 'absolu', 'plancher']
+# Taille moyenne des ménages (résidences principales estimées à partir de la population)
+HOUSEHOLD_SIZE = 2.4
+# Ligne des agrégats de toute l'île
+ISLAND = 'Île'
+
+# Indicateurs agrégés par micro-région
+INDICATORS = {
+    'population': 'Population',
+    'permis_construire': 'Permis de construire',
+    'permis_pour_1000_hab': 'Permis pour 1 000 habitants',
+    'residences_principales': 'Résidences principales (estimation)',
+    'logements_sociaux': 'Logements sociaux (estimation)',
+    'logements_sociaux_pourcentage': 'Logements sociaux (%)',
+    'logements_vacants': 'Logements vacants (estimation)',
+    'taux_vacance': 'Taux de vacance (%)',
+    'nouveaux_menages': 'Nouveaux ménages',
+    'solde_logements': 'Permis - nouveaux ménages',
+}
+
+# Scénarios prédéfinis proposés dans le dashboard
+PRESET_SCENARIOS = [
+    {'nom': "Permis +20 % dans l'Ouest",
+     'chocs': [{'levier': 'permis_construire_2024', 'mode': 'relatif', 'valeur': 20, 'micro_region': 'Ouest'}]},
+    {'nom': "Logements sociaux à 30 % partout",
+     'chocs': [{'levier': 'logements_sociaux_pourcentage', 'mode': 'plancher', 'valeur': 30, 'micro_region': None}]},
+    {'nom': "Vacance -2 points",
+     'chocs': [{'levier': 'taux_vacance', 'mode': 'absolu', 'valeur': -2, 'micro_region': None}]},
+    {'nom': "Population +5 %, permis +10 %",
+     'chocs': [{'levier': 'population', 'mode': 'relatif', 'valeur': 5, 'micro_region': None},
+               {'levier': 'permis_construire_2024', 'mode': 'relatif', 'valeur': 10, 'micro_region': None}]},
+]
+
+
+def shock(levier, valeur, mode='relatif', micro_region=None):
+    """Choc sur un levier, pour toute l'île (micro_region None ou 'Toutes') ou une micro-région"""
+    if levier not in LEVERS:
+        raise ValueError(f"Levier inconnu : {levier}")
+    if mode not in SHOCK_MODES:
+        raise ValueError(f"Mode de choc inconnu : {mode}")
+    return {'levier': levier, 'mode': mode, 'valeur': float(valeur), 'micro_region': micro_region}
+
+
+def sweep(levier, valeurs, mode='relatif', micro_region=None, base=None):
+    """Lot de scénarios faisant varier un levier (ajouté aux chocs du scénario base)"""
+    chocs = list(base['chocs']) if base else []
+    return [{'nom': f"{levier} {valeur:g}", 'chocs': chocs + [shock(levier, valeur, mode, micro_region)]}
+            for valeur in valeurs]
+
+
+class ScenarioEngine:
+    """Évalue des lots de scénarios sur les communes de current_data"""
+
+    def __init__(self, current_data, household_size=HOUSEHOLD_SIZE):
+        self.communes = list(current_data['nom'])
+        self.regions = sorted(current_data['micro_region'].unique())
+        self.household_size = household_size
+        self._region_positions = {region: i for i, region in enumerate(self.regions)}
+        # Micro-région de chaque commune, et matrice d'appartenance (commune × micro-région) des agrégats
+        self._region_codes = current_data['micro_region'].map(self._region_positions).to_numpy()
+        self._membership = np.zeros((len(self.communes), len(self.regions)))
+        self._membership[np.arange(len(self.communes)), self._region_codes] = 1
+        # Leviers de référence (commune × levier)
+        self._base = current_data[list(LEVERS)].to_numpy(dtype=float)
+        self._lever_positions = {levier: i for i, levier in enumerate(LEVERS)}
+        self._percent = [self._lever_positions[levier] for levier in PERCENT_LEVERS]
+
+    def shock_arrays(self, scenarios):
+        """Chocs d'un lot de scénarios : variations, ajouts et planchers (scénario × micro-région × levier)"""
+        forme = (len(scenarios), len(self.regions), len(LEVERS))
+        relatif, absolu = np.zeros(forme), np.zeros(forme)
+        plancher = np.full(forme, -np.inf)
+        for s, scenario in enumerate(scenarios):
+            for choc in scenario['chocs']:
+                k = self._lever_positions[choc['levier']]
+                region = choc.get('micro_region')
+                r = slice(None) if region in (None, 'Toutes') else self._region_positions[region]
+                if choc['mode'] == 'relatif':
+                    relatif[s, r, k] += choc['valeur'] / 100
+                elif choc['mode'] == 'absolu':
+                    absolu[s, r, k] += choc['valeur']
+                elif choc['mode'] == 'plancher':
+                    plancher[s, r, k] = np.maximum(plancher[s, r, k], choc['valeur'])
+                else:
+                    raise ValueError(f"Mode de choc inconnu : {choc['mode']}")
+        return relatif, absolu, plancher
+
+    def apply(self, relatif, absolu, plancher):
+        """Leviers de chaque commune sous chaque scénario (scénario × commune × levier)"""
+        r = self._region_codes
+        leviers = np.maximum(self._base * (1 + relatif[:, r]) + absolu[:, r], plancher[:, r])
+        leviers = np.maximum(leviers, 0)
+        leviers[..., self._percent] = np.minimum(leviers[..., self._percent], 100)
+        return leviers
+
+    def indicators(self, leviers):
+        """Indicateurs additifs par commune (indicateur -> scénario × commune)"""
+        permis, sociaux, vacance, population = (leviers[..., self._lever_positions[levier]] for levier in LEVERS)
+        population_base = self._base[:, self._lever_positions['population']]
+        residences = population / self.household_size
+        # Les résidences principales sont la part non vacante du parc
+        parc = residences / np.maximum(1 - vacance / 100, 1e-6)
+        nouveaux_menages = (population - population_base) / self.household_size
+        return {
+            'population': population,
+            'permis_construire': permis,
+            'residences_principales': residences,
+            'parc': parc,
+            'logements_sociaux': residences * sociaux / 100,
+            'logements_vacants': parc * vacance / 100,
+            'nouveaux_menages': nouveaux_menages,
+            'solde_logements': permis - nouveaux_menages,
+        }
+
+    def rollup(self, indicateurs):
+        """Agrégats par micro-région puis pour l'île (indicateur -> scénario × (micro-régions + île))"""
+        sommes = {}
+        for nom, valeurs in indicateurs.items():
+            par_region = valeurs @ self._membership
+            sommes[nom] = np.concatenate([par_region, par_region.sum(axis=1, keepdims=True)], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Les taux sont recalculés sur les sommes (moyennes pondérées par le parc)
+            sommes['permis_pour_1000_hab'] = sommes['permis_construire'] / sommes['population'] * 1000
+            sommes['logements_sociaux_pourcentage'] = (sommes['logements_sociaux']
+                                                       / sommes['residences_principales'] * 100)
+            sommes['taux_vacance'] = sommes['logements_vacants'] / sommes['parc'] * 100
+        return {nom: sommes[nom] for nom in INDICATORS}
+
+    def evaluate(self, scenarios, reference=True):
+        """Agrégats de tous les scénarios, au format long (scenario, micro_region, indicateurs).
+
+        Avec reference=True, la situation actuelle est évaluée dans le même lot sous le nom 'Référence'.
+        """
+        if reference:
+            scenarios = [{'nom': 'Référence', 'chocs': []}] + list(scenarios)
+        agregats = self.rollup(self.indicators(self.apply(*self.shock_arrays(scenarios))))
+        lignes = self.regions + [ISLAND]
+        resultat = pd.DataFrame({nom: valeurs.ravel() for nom, valeurs in agregats.items()})
+        resultat.insert(0, 'micro_region', np.tile(lignes, len(scenarios)))
+        resultat.insert(0, 'scenario', np.repeat([scenario['nom'] for scenario in scenarios], len(lignes)))
+        return resultat
+
+
+def side_by_side(resultats, indicateur):
+    """Un indicateur côte à côte (micro-région × scénario), écarts à la référence compris"""
+    noms = list(dict.fromkeys(resultats['scenario']))
+    lignes = list(dict.fromkeys(resultats['micro_region']))
+    tableau = resultats.pivot(index='micro_region', columns='scenario', values=indicateur)
+    tableau = tableau.reindex(index=lignes, columns=noms)
+    if 'Référence' not in noms:
+        return tableau
+    autres = [nom for nom in noms if nom != 'Référence']
+    ecarts = tableau[autres].sub(tableau['Référence'], axis=0).add_prefix('Δ ')
+    return pd.concat([tableau, ecarts], axis=1)
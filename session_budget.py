@@ -0,0 +1,139 @@
+"""Budget mémoire des caches propres à chaque session Streamlit.
+
+Chaque session dispose d'un cache LRU (tables filtrées, grilles du simulateur...)
+dont la taille en octets est estimée à l'insertion. Au-delà du budget de la
+session, les entrées les moins récemment utilisées sont évincées ; un registre
+commun à tout le processus fait de même au-delà d'un budget global, en
+évinçant d'abord les entrées les plus anciennes toutes sessions confondues.
+La mémoire occupée reste ainsi bornée quel que soit le nombre de sessions.
+"""
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Budget d'une session (octets)
+SESSION_BUDGET_BYTES = 32 * 1024 ** 2
+# Budget de l'ensemble des sessions du processus (octets)
+TOTAL_BUDGET_BYTES = 512 * 1024 ** 2
+
+
+def estimate_size(obj):
+    """Taille approximative en mémoire d'un objet (octets)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        taille = obj.memory_usage(deep=True)
+        return int(taille.sum() if isinstance(taille, pd.Series) else taille)
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (bytes, str)):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_size(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+class SessionCache:
+    """Cache LRU d'une session, borné en octets"""
+
+    def __init__(self, registry, max_bytes=SESSION_BUDGET_BYTES):
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # clé -> (valeur, taille, dernier accès)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache, ou calculée avec compute() puis conservée dans la limite du budget"""
+        with self._lock:
+            if key in self._entries:
+                valeur, taille, _ = self._entries.pop(key)
+                self._entries[key] = (valeur, taille, time.monotonic())
+                self.hits += 1
+                return valeur
+            self.misses += 1
+        valeur = compute()
+        taille = estimate_size(valeur)
+        if taille > self.max_bytes:
+            # Trop volumineux pour être conservé : servi sans mise en cache
+            return valeur
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (valeur, taille, time.monotonic())
+            self.bytes += taille
+            while self.bytes > self.max_bytes:
+                self._evict_oldest()
+        self.registry.enforce()
+        return valeur
+
+    def oldest_access(self):
+        """Date du dernier accès de l'entrée la moins récemment utilisée (None si vide)"""
+        with self._lock:
+            return next(iter(self._entries.values()))[2] if self._entries else None
+
+    def evict_oldest(self):
+        """Évince l'entrée la moins récemment utilisée"""
+        with self._lock:
+            if self._entries:
+                self._evict_oldest()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _evict_oldest(self):
+        _, (_, taille, _) = self._entries.popitem(last=False)
+        self.bytes -= taille
+        self.evictions += 1
+
+
+class SessionBudgetRegistry:
+    """Caches de toutes les sessions du processus, soumis à un budget global"""
+
+    def __init__(self, total_bytes=TOTAL_BUDGET_BYTES, session_bytes=SESSION_BUDGET_BYTES):
+        self.total_budget = total_bytes
+        self.session_budget = session_bytes
+        # Les caches des sessions terminées disparaissent avec leur session_state
+        self._caches = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def create_cache(self):
+        """Nouveau cache de session enregistré dans le registre"""
+        cache = SessionCache(self, self.session_budget)
+        with self._lock:
+            self._caches.add(cache)
+        return cache
+
+    def sessions(self):
+        with self._lock:
+            return list(self._caches)
+
+    def total_bytes(self):
+        """Octets occupés par les caches de toutes les sessions"""
+        return sum(cache.bytes for cache in self.sessions())
+
+    def total_evictions(self):
+        return sum(cache.evictions for cache in self.sessions())
+
+    def enforce(self):
+        """Évince les entrées les plus anciennes, toutes sessions confondues, au-delà du budget global"""
+        while self.total_bytes() > self.total_budget:
+            candidats = [(cache.oldest_access(), id(cache), cache) for cache in self.sessions()]
+            candidats = [c for c in candidats if c[0] is not None]
+            if not candidats:
+                return
+            min(candidats)[2].evict_oldest()
@@ -0,0 +1,137 @@
+"""Instantané des données partagé entre plusieurs processus Streamlit.
+
+Un seul processus construit l'instantané et le publie sous forme de fichiers
+Arrow IPC non compressés dans un répertoire en mémoire partagée (``/dev/shm``).
+Les autres processus projettent ces fichiers en mémoire (``mmap``) au lieu de
+reconstruire les données : les colonnes numériques et dates sont lues sans
+copie, les chaînes sont encodées en dictionnaire (catégories pandas). La
+mémoire de l'hôte ne contient ainsi qu'une copie des grandes tables, quel que
+soit le nombre de processus.
+
+La publication est atomique : les fichiers sont écrits dans un répertoire
+temporaire renommé une fois complet, puis le pointeur ``CURRENT`` est remplacé
+par ``os.replace``. Un verrou (``flock``) désigne le processus qui reconstruit.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+# Répertoire partagé par défaut (mémoire vive sous Linux)
+SHARED_DIR = '/dev/shm/dashboard-logements'
+# Nombre de versions publiées conservées (les processus en retard peuvent encore les lire)
+KEEP_VERSIONS = 2
+# En dessous de ce nombre de lignes, les catégories sont reconverties en chaînes (copie négligeable)
+CATEGORICAL_MIN_ROWS = 10_000
+POINTER_FILE = 'CURRENT'
+
+
+def to_arrow_table(df):
+    """Table Arrow d'un DataFrame, colonnes texte encodées en dictionnaire"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, champ in enumerate(table.schema):
+        if pa.types.is_string(champ.type) or pa.types.is_large_string(champ.type):
+            table = table.set_column(i, champ.name, table.column(i).dictionary_encode())
+    return table.replace_schema_metadata(None)
+
+
+def map_frame(path):
+    """DataFrame adossé au fichier Arrow projeté en mémoire (sans copie des colonnes numériques)"""
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    df = table.to_pandas(split_blocks=True)
+    if len(df) < CATEGORICAL_MIN_ROWS:
+        categories = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+        df = df.astype({c: object for c in categories})
+    return df
+
+
+class SharedSnapshotDirectory:
+    """Répertoire où un processus publie l'instantané et où les autres le projettent"""
+
+    def __init__(self, path=SHARED_DIR, keep=KEEP_VERSIONS):
+        self.path = path
+        self.keep = keep
+        os.makedirs(path, exist_ok=True)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Verrou exclusif entre processus (un seul reconstruit à la fois)"""
+        with open(os.path.join(self.path, '.lock'), 'w') as verrou:
+            fcntl.flock(verrou, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(verrou, fcntl.LOCK_UN)
+
+    def published(self):
+        """Description de la dernière version publiée, None si aucune"""
+        try:
+            with open(os.path.join(self.path, POINTER_FILE)) as pointeur:
+                return json.load(pointeur)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def publish(self, version, fingerprint, frames, timings=None):
+        """Écrit les tables d'une version puis bascule atomiquement le pointeur"""
+        nom = f"v{version}-{fingerprint}"
+        temporaire = os.path.join(self.path, f".{nom}.{os.getpid()}")
+        os.makedirs(temporaire, exist_ok=True)
+        for name, df in frames.items():
+            table = to_arrow_table(df)
+            with pa.OSFile(os.path.join(temporaire, f"{name}.arrow"), 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        destination = os.path.join(self.path, nom)
+        shutil.rmtree(destination, ignore_errors=True)
+        os.rename(temporaire, destination)
+
+        description = {'version': version, 'fingerprint': fingerprint, 'directory': nom,
+                       'frames': list(frames), 'timings': timings or {}, 'published_at': time.time()}
+        pointeur = os.path.join(self.path, f".{POINTER_FILE}.{os.getpid()}")
+        with open(pointeur, 'w') as f:
+            json.dump(description, f)
+        os.replace(pointeur, os.path.join(self.path, POINTER_FILE))
+        self._prune(nom)
+        return description
+
+    def map(self, description):
+        """Projette en mémoire les tables d'une version publiée"""
+        dossier = os.path.join(self.path, description['directory'])
+        return {name: map_frame(os.path.join(dossier, f"{name}.arrow")) for name in description['frames']}
+
+    def _prune(self, courant):
+        # Les fichiers supprimés restent lisibles par les processus qui les ont déjà projetés
+        versions = sorted((e for e in os.scandir(self.path) if e.is_dir() and e.name.startswith('v')),
+                          key=lambda e: e.stat().st_mtime, reverse=True)
+        for entree in versions[self.keep:]:
+            if entree.name != courant:
+                shutil.rmtree(entree.path, ignore_errors=True)
+
+
+def shared_builder(directory, build, frames_of, restore, max_age=None):
+    """Constructeur d'instantanés pour SnapshotStore, partagé entre processus via directory.
+
+    build(version) construit un instantané complet, frames_of(snapshot) en extrait
+    les tables à publier et restore(version, frames, fingerprint, timings) reconstruit
+    un instantané à partir des tables projetées. Une version publiée est réutilisée
+    si elle est au moins aussi récente que celle demandée et date de moins de max_age secondes.
+    """
+    def builder(version):
+        with directory.lock():
+            publie = directory.published()
+            perimee = (publie is not None and max_age is not None
+                       and time.time() - publie['published_at'] > max_age)
+            if publie is None or publie['version'] < version or perimee:
+                snapshot = build(max(version, publie['version'] + 1) if publie else version)
+                publie = directory.publish(snapshot.version, snapshot.fingerprint, frames_of(snapshot),
+                                           snapshot.load_timings)
+        debut = time.perf_counter()
+        frames = directory.map(publie)
+        timings = dict(publie['timings'], projection=time.perf_counter() - debut)
+        return restore(publie['version'], frames, publie['fingerprint'], timings)
+    return builder
@@ -0,0 +1,70 @@
+"""Recherche de communes comparables sur des vecteurs d'indicateurs normalisés.
+
+Pour un petit nombre de communes, la matrice des distances deux à deux est
+précalculée une fois par version des données ; au-delà (IRIS, parcelles), un
+KD-tree sur les vecteurs normalisés évite tout recalcul en O(N²) par requête.
+"""
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import pdist, squareform
+
+# Indicateurs comparés (colonnes calculées à partir de current_data)
+SIMILARITY_FEATURES = [
+    'prix_m2_moyen',
+    'loyers_moyens_m2',
+    'taux_vacance',
+    'logements_sociaux_pourcentage',
+    'densite_hab_km2',
+    'permis_pour_1000_hab',
+]
+
+# Au-delà de ce nombre de lignes, on interroge un KD-tree plutôt qu'une matrice N × N
+PAIRWISE_MAX_ROWS = 2000
+
+
+def build_feature_matrix(current_data, features=SIMILARITY_FEATURES):
+    """Matrice des indicateurs par commune, centrée-réduite (z-scores)"""
+    donnees = current_data.set_index('nom')
+    brutes = pd.DataFrame({
+        'prix_m2_moyen': donnees['prix_m2_moyen'],
+        'loyers_moyens_m2': donnees['loyers_moyens_m2'],
+        'taux_vacance': donnees['taux_vacance'],
+        'logements_sociaux_pourcentage': donnees['logements_sociaux_pourcentage'],
+        'densite_hab_km2': donnees['population'] / donnees['superficie_km2'],
+        'permis_pour_1000_hab': donnees['permis_construire_2024'] / donnees['population'] * 1000,
+    })[list(features)].astype(float)
+    ecarts = brutes.std(ddof=0).replace(0, 1)
+    return (brutes - brutes.mean()) / ecarts
+
+
+class SimilarityIndex:
+    """Index des communes comparables (distance euclidienne entre z-scores)"""
+
+    def __init__(self, features, weights=None):
+        self.features = features
+        self.names = list(features.index)
+        self._positions = {nom: i for i, nom in enumerate(self.names)}
+        poids = np.ones(features.shape[1]) if weights is None else np.asarray(weights, dtype=float)
+        self._vectors = features.values * np.sqrt(poids)
+        self._pairwise = None
+        self._tree = None
+        if len(self.names) <= PAIRWISE_MAX_ROWS:
+            # Distances calculées paire par paire (sans tableau intermédiaire N × N × indicateurs)
+            self._pairwise = squareform(pdist(self._vectors))
+        else:
+            self._tree = cKDTree(self._vectors)
+
+    def most_similar(self, nom, k=5):
+        """Les k communes les plus proches de nom, avec leur distance"""
+        position = self._positions[nom]
+        k = min(k, len(self.names) - 1)
+        if self._pairwise is not None:
+            distances = self._pairwise[position]
+            voisins = np.argpartition(distances, k)[:k + 1]
+            voisins = voisins[np.argsort(distances[voisins])]
+            distances = distances[voisins]
+        else:
+            distances, voisins = self._tree.query(self._vectors[position], k=k + 1)
+        resultat = pd.DataFrame({'nom': [self.names[i] for i in voisins], 'distance': distances})
+        return resultat[resultat['nom'] != nom].head(k).reset_index(drop=True)
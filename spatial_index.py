@@ -0,0 +1,76 @@
+"""Index spatial pour les requêtes par rayon et de plus proches voisins.
+
+Les points (lat, lon) sont projetés sur la sphère unité et indexés dans un
+KD-tree : la distance euclidienne (corde) y est une fonction croissante de la
+distance haversine, ce qui permet des requêtes exactes en O(log n) au lieu
+d'un parcours linéaire.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+RAYON_TERRE_KM = 6371.0088
+
+
+def to_unit_vectors(lat, lon):
+    """Coordonnées cartésiennes sur la sphère unité"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(distance_km):
+    """Distance haversine (km) vers longueur de corde sur la sphère unité"""
+    return 2 * np.sin(np.asarray(distance_km, dtype=float) / (2 * RAYON_TERRE_KM))
+
+
+def chord_to_km(chord):
+    """Longueur de corde sur la sphère unité vers distance haversine (km)"""
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.clip(np.asarray(chord, dtype=float) / 2, 0, 1))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance haversine (km), vectorisée"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(a))
+
+
+class SpatialIndex:
+    """KD-tree sur la sphère unité pour des points (communes, transactions...)"""
+
+    def __init__(self, lat, lon):
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self._tree = cKDTree(to_unit_vectors(self.lat, self.lon))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def within_radius(self, lat, lon, radius_km):
+        """Indices et distances (km) des points situés à moins de radius_km, triés par distance"""
+        centre = to_unit_vectors(lat, lon)[0]
+        indices = np.asarray(self._tree.query_ball_point(centre, km_to_chord(radius_km)), dtype=int)
+        if len(indices) == 0:
+            return indices, np.empty(0)
+        distances = haversine_km(lat, lon, self.lat[indices], self.lon[indices])
+        ordre = np.argsort(distances)
+        return indices[ordre], distances[ordre]
+
+    def nearest(self, lat, lon, k=5):
+        """Indices et distances (km) des k points les plus proches"""
+        k = min(k, len(self))
+        chords, indices = self._tree.query(to_unit_vectors(lat, lon)[0], k=k)
+        return np.atleast_1d(indices), chord_to_km(np.atleast_1d(chords))
+
+    def radius_stats(self, lat, lon, radius_km, values, weights=None):
+        """Nombre de points, somme et moyenne (pondérée) d'une valeur dans un rayon"""
+        indices, _ = self.within_radius(lat, lon, radius_km)
+        values = np.asarray(values, dtype=float)[indices]
+        if len(indices) == 0:
+            return {'nombre': 0, 'somme': 0.0, 'moyenne': np.nan}
+        poids = None if weights is None else np.asarray(weights, dtype=float)[indices]
+        return {
+            'nombre': len(indices),
+            'somme': float(values.sum()),
+            'moyenne': float(np.average(values, weights=poids)),
+        }
@@ -0,0 +1,176 @@
+"""Vues déclaratives du dashboard et plan de requêtes compilé.
+
+Une vue décrit ce qu'elle affiche (jeu de données, filtres, regroupement,
+indicateur, type de graphique) sans code pandas :
+
+    'prix_microregions': {'dataset': 'micro_regions', 'metric': 'prix_m2_moyen',
+                          'dimension': 'micro_region', 'chart': 'bar', ...}
+
+Le plan réunit les vues dont la requête de base (jeu de données, filtres,
+regroupement) est la même. Chaque requête distincte parcourt ses données une
+seule fois et calcule d'un coup les indicateurs de toutes ses vues, puis chaque
+vue en reçoit sa part (tri, limite) et son rendu Plotly. Le nombre de parcours
+est celui des requêtes distinctes, pas celui des graphiques.
+"""
+import operator
+
+import plotly.express as px
+
+MICROREGION_COLORS = {
+    'Nord': '#FF6B35',
+    'Sud': '#2A9D8F',
+    'Ouest': '#E9C46A',
+    'Est': '#F4A261',
+    'Cirques': '#264653',
+}
+FILTER_OPERATORS = {
+    '==': operator.eq, '!=': operator.ne, '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+    'in': lambda colonne, valeurs: colonne.isin(valeurs),
+}
+# Clés de regroupement dérivées d'une colonne
+DERIVED_KEYS = {
+    'annee': lambda df: df['date'].dt.year.rename('annee'),
+}
+
+# Vues du dashboard. Champs : dataset (communes, micro_regions, historique), filters [(colonne, opérateur,
+# valeur)], group_by, metric, agg (avec group_by, 'mean' par défaut), order ('asc'/'desc') et limit,
+# chart (bar, barh, line, pie), dimension (axe des catégories ou des abscisses), color ('micro_region'
+# ou 'metric' pour une échelle continue), color_scale, title, axis_title, dimension_title.
+VIEWS = {
+    'evolution_prix_microregions': {
+        'dataset': 'historique', 'group_by': ['annee', 'micro_region'], 'metric': 'prix_m2',
+        'chart': 'line', 'dimension': 'annee', 'color': 'micro_region',
+        'title': 'Évolution des prix au m² par micro-région (2018-2024)', 'axis_title': "Prix moyen au m² (€)",
+        'dimension_title': 'Année',
+    },
+    'evolution_loyers_microregions': {
+        'dataset': 'historique', 'group_by': ['annee', 'micro_region'], 'metric': 'loyer_m2',
+        'chart': 'line', 'dimension': 'annee', 'color': 'micro_region',
+        'title': 'Évolution des loyers au m² par micro-région (2018-2024)', 'axis_title': "Loyer moyen au m² (€)",
+        'dimension_title': 'Année',
+    },
+    'communes_par_microregion': {
+        'dataset': 'micro_regions', 'metric': 'nombre_communes', 'chart': 'pie',
+        'dimension': 'micro_region', 'color': 'micro_region',
+        'title': 'Répartition des communes par micro-région',
+    },
+    'prix_microregions': {
+        'dataset': 'micro_regions', 'metric': 'prix_m2_moyen', 'chart': 'bar',
+        'dimension': 'micro_region', 'color': 'micro_region',
+        'title': 'Prix moyen au m² par micro-région', 'axis_title': "Prix moyen au m² (€)",
+    },
+    'evolution_prix_1an_microregions': {
+        'dataset': 'micro_regions', 'metric': 'evolution_prix_1an', 'chart': 'bar',
+        'dimension': 'micro_region', 'color': 'micro_region',
+        'title': 'Évolution des prix sur 1 an par micro-région', 'axis_title': "Évolution des prix (%)",
+    },
+    'vacance_microregions': {
+        'dataset': 'communes', 'group_by': ['micro_region'], 'metric': 'taux_vacance',
+        'chart': 'bar', 'dimension': 'micro_region', 'color': 'micro_region',
+        'title': 'Taux de vacance moyen par micro-région', 'axis_title': "Taux de vacance (%)",
+    },
+    'logements_sociaux_microregions': {
+        'dataset': 'communes', 'group_by': ['micro_region'], 'metric': 'logements_sociaux_pourcentage',
+        'chart': 'bar', 'dimension': 'micro_region', 'color': 'micro_region',
+        'title': 'Pourcentage de logements sociaux par micro-région', 'axis_title': "Logements sociaux (%)",
+    },
+    'top_hausse_prix': {
+        'dataset': 'communes', 'metric': 'evolution_prix_1an', 'order': 'desc', 'limit': 10,
+        'chart': 'barh', 'dimension': 'nom', 'color': 'metric', 'color_scale': 'Greens',
+        'title': 'Top 10 des communes avec la plus forte hausse des prix (%)',
+    },
+    'top_permis': {
+        'dataset': 'communes', 'metric': 'permis_construire_2024', 'order': 'desc', 'limit': 10,
+        'chart': 'barh', 'dimension': 'nom', 'color': 'metric', 'color_scale': 'Blues',
+        'title': 'Top 10 des communes avec le plus de permis de construire (2024)',
+    },
+}
+
+
+def query_key(vue):
+    """Requête de base d'une vue : jeu de données, filtres et regroupement"""
+    filtres = tuple((colonne, op, tuple(valeur) if isinstance(valeur, list) else valeur)
+                    for colonne, op, valeur in vue.get('filters', []))
+    return vue['dataset'], filtres, tuple(vue.get('group_by', []))
+
+
+def run_query(df, key, metriques, colonnes):
+    """Exécute une requête de base : filtres, puis agrégats de tous les indicateurs demandés en un parcours"""
+    _, filtres, regroupement = key
+    for colonne, op, valeur in filtres:
+        df = df[FILTER_OPERATORS[op](df[colonne], valeur)]
+    if not regroupement:
+        return df[list(dict.fromkeys(list(colonnes) + list(metriques)))]
+    cles = [DERIVED_KEYS[cle](df) if cle in DERIVED_KEYS else cle for cle in regroupement]
+    return (df.groupby(cles, observed=True)
+            .agg(**{metrique: (metrique, agg) for metrique, agg in metriques.items()})
+            .reset_index())
+
+
+class QueryPlan:
+    """Plan compilé d'un ensemble de vues : une requête par combinaison distincte (données, filtres, regroupement)"""
+
+    def __init__(self, views):
+        self.views = views
+        self.queries = {}
+        self._columns = {}
+        self._view_queries = {}
+        for nom, vue in views.items():
+            cle = query_key(vue)
+            metriques = self.queries.setdefault(cle, {})
+            agg = vue.get('agg', 'mean')
+            if metriques.get(vue['metric'], agg) != agg:
+                raise ValueError(f"Agrégations différentes de {vue['metric']} dans une même requête ({nom})")
+            metriques[vue['metric']] = agg
+            # Colonnes d'étiquettes conservées pour les vues sans regroupement
+            colonnes = self._columns.setdefault(cle, {})
+            for champ in ('dimension', 'color'):
+                if vue.get(champ) not in (None, 'metric'):
+                    colonnes[vue[champ]] = None
+            self._view_queries[nom] = cle
+
+    def execute(self, datasets):
+        """Résultat de chaque requête distincte, calculé une seule fois"""
+        return {cle: run_query(datasets[cle[0]], cle, metriques, self._columns[cle])
+                for cle, metriques in self.queries.items()}
+
+    def result(self, results, nom):
+        """Données d'une vue, extraites du résultat de sa requête"""
+        vue = self.views[nom]
+        donnees = results[self._view_queries[nom]]
+        if 'order' in vue:
+            donnees = donnees.sort_values(vue['metric'], ascending=vue['order'] == 'asc', kind='stable')
+        if 'limit' in vue:
+            donnees = donnees.head(vue['limit'])
+        return donnees
+
+
+def build_figure(vue, donnees):
+    """Graphique Plotly d'une vue"""
+    metrique, dimension = vue['metric'], vue.get('dimension')
+    if vue.get('color') == 'metric':
+        couleurs = {'color': metrique, 'color_continuous_scale': vue.get('color_scale')}
+    elif vue.get('color') == 'micro_region':
+        couleurs = {'color': 'micro_region', 'color_discrete_map': MICROREGION_COLORS}
+    else:
+        couleurs = {}
+
+    if vue['chart'] == 'pie':
+        return px.pie(donnees, values=metrique, names=dimension, title=vue['title'], **couleurs)
+    if vue['chart'] == 'barh':
+        fig = px.bar(donnees, x=metrique, y=dimension, orientation='h', title=vue['title'], **couleurs)
+    elif vue['chart'] == 'bar':
+        fig = px.bar(donnees, x=dimension, y=metrique, title=vue['title'], **couleurs)
+    elif vue['chart'] == 'line':
+        fig = px.line(donnees, x=dimension, y=metrique, title=vue['title'], **couleurs)
+    else:
+        raise ValueError(f"Type de graphique inconnu : {vue['chart']}")
+    if 'axis_title' in vue:
+        fig.update_layout(yaxis_title=vue['axis_title'])
+    if 'dimension_title' in vue:
+        fig.update_layout(xaxis_title=vue['dimension_title'])
+    return fig
+
+
+# Plan des vues du dashboard, compilé une fois au chargement du module
+DASHBOARD_PLAN = QueryPlan(VIEWS)